@@ -0,0 +1,100 @@
+"""
+Logs structurés et non bloquants (configurés par settings.LOGGING).
+
+- JsonFormatter : un objet JSON par ligne, champs `extra` inclus
+  (logger.info("...", extra={'event': ..., 'game_id': ...})).
+- SamplingFilter : les événements volumineux marqués extra={'sampled': True}
+  ne sont gardés qu'avec la probabilité LOG_SAMPLE_RATE (jamais WARNING et
+  au-delà) ; l'enregistrement porte sample_rate pour repondérer les comptes.
+- QueueStreamHandler : le thread de la requête ne fait que déposer
+  l'enregistrement dans une file bornée ; un QueueListener formate et écrit
+  sur stderr dans son propre thread. File pleine : l'enregistrement est
+  abandonné (et compté) plutôt que de bloquer la requête.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributs standards d'un LogRecord : tout le reste vient de `extra`
+RESERVED_ATTRS = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {
+    'message', 'asctime', 'sampled',
+}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = max(0.0, min(1.0, float(rate)))
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or record.levelno >= logging.WARNING:
+            return True
+        record.sample_rate = self.rate
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class QueueStreamHandler(QueueHandler):
+    """QueueHandler dont le QueueListener écrit sur un flux (stderr par défaut)."""
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.stop_listener)  # vide la file avant logging.shutdown()
+
+    def setFormatter(self, fmt):
+        # Formatage dans le thread du listener, pas dans celui de la requête
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Copie autonome : message résolu, exception mise en texte (le traceback ne traverse pas la file)."""
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop_listener(self):
+        if self.listener._thread is not None:
+            try:
+                self.listener.stop()
+            except queue.Full:
+                pass
+
+    def close(self):
+        self.stop_listener()
+        super().close()
@@ -1,68 +1,104 @@
+import threading
+import time
 import jwt
-import json
-from django.http import JsonResponse
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from supabase import create_client, Client
-from decouple import config
+from games import metrics
+from games.authentication import authenticate_token, claims_cache, decode_supabase_token
 
 class SupabaseJWTMiddleware:
+    """
+    Authentifie la requête à partir du JWT Supabase (en-tête Authorization).
+
+    - Aucun client Supabase à l'initialisation : la vérification est locale
+      (JWKS / secret) ; le client n'est construit qu'au premier accès à
+      self.supabase, pour une opération qui en a réellement besoin.
+    - Chemins ignorés et requêtes sans en-tête Bearer : sortie immédiate.
+    - Compatible sync et async (ASGI) : pas de bascule de thread par requête.
+    """
+    sync_capable = True
+    async_capable = True
+
+    # Routes qui ne nécessitent pas d'authentification
+    SKIP_PATHS = (
+        '/admin/',
+        '/api/auth/',  # Garder pour compatibilité temporaire
+        '/static/',
+        '/media/',
+    )
+
     def __init__(self, get_response):
         self.get_response = get_response
-        # Configuration Supabase
-        self.supabase_url = config('SUPABASE_URL')
-        self.supabase_anon_key = config('SUPABASE_ANON_KEY')
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_anon_key)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self._supabase = None
+        self._supabase_lock = threading.Lock()
+
+    @property
+    def supabase(self):
+        """Client Supabase, construit (et son import payé) au premier usage seulement."""
+        if self._supabase is None:
+            with self._supabase_lock:
+                if self._supabase is None:
+                    from supabase import create_client
+
+                    self._supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
+        return self._supabase
 
     def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
         # Traiter la requête avant la vue
         self.process_request(request)
-        response = self.get_response(request)
-        return response
+        return self.get_response(request)
 
-    def process_request(self, request):
-        # Ignorer certaines routes
+    async def __acall__(self, request):
+        token = self.bearer_token(request)
+        if token and claims_cache.get(token) is None:
+            # Première vue du jeton : le JWKS peut devoir être chargé (réseau), hors de la boucle
+            await sync_to_async(self.process_request)(request)
+        else:
+            self.process_request(request)
+        return await self.get_response(request)
+
+    def bearer_token(self, request):
+        """Jeton Bearer, ou None (route ignorée, en-tête absent) sans autre traitement."""
         if self.should_skip_auth(request.path):
-            request.user = AnonymousUser()
-            return
+            return None
+        auth_header = request.META.get('HTTP_AUTHORIZATION')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return None
+        return auth_header[7:].strip() or None
 
-        # Récupérer le token JWT de l'en-tête Authorization
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        
-        if not auth_header.startswith('Bearer '):
+    def process_request(self, request):
+        token = self.bearer_token(request)
+        if token is None:
             request.user = AnonymousUser()
             return
 
-        token = auth_header.split(' ')[1]
-
-        try:
-            # Vérifier le token avec Supabase
-            user_data = self.verify_supabase_token(token)
-            
-            if user_data:
-                # Créer un objet utilisateur personnalisé
-                request.user = SupabaseUser(user_data)
-                request.supabase_session = token
-            else:
-                request.user = AnonymousUser()
-                
-        except Exception as e:
+        # Vérifier le token (résultat réutilisé par SupabaseAuthentication côté DRF)
+        user_data = self.verify_supabase_token(token, request)
+        if user_data:
+            # Créer un objet utilisateur personnalisé
+            request.user = SupabaseUser(user_data)
+            request.supabase_session = token
+        else:
             request.user = AnonymousUser()
 
-    def verify_supabase_token(self, token):
+    def verify_supabase_token(self, token, request=None):
         """
-        Vérifie le token JWT Supabase et retourne les données utilisateur
+        Vérifie le token JWT Supabase et retourne les données utilisateur.
+        Signature vérifiée localement (JWKS en cache ou secret HS256) une fois
+        par jeton (cache des claims jusqu'à exp), claims partagés avec
+        SupabaseAuthentication via la requête.
         """
         try:
-            # Récupérer la clé publique JWT de Supabase (simplified version)
-            # En production, il faudrait récupérer les clés depuis /.well-known/jwks.json
-            
-            # Décoder le token sans vérifier la signature pour récupérer les données
-            # ATTENTION: En production, il faut vérifier la signature
-            decoded_token = jwt.decode(
-                token,
-                options={"verify_signature": False}  # TEMPORAIRE - à modifier en prod
-            )
+            if request is not None:
+                decoded_token = authenticate_token(request, token)
+            else:
+                decoded_token = decode_supabase_token(token)
             
             # Vérifier que le token contient les informations nécessaires
             if 'sub' in decoded_token and 'email' in decoded_token:
@@ -77,21 +113,15 @@ class SupabaseJWTMiddleware:
             
         except jwt.InvalidTokenError:
             return None
-        except Exception as e:
+        except Exception:
+            # JWKS indisponible... : SupabaseAuthentication rendra l'erreur côté API
             return None
 
     def should_skip_auth(self, path):
         """
         Définit les routes qui ne nécessitent pas d'authentification
         """
-        skip_paths = [
-            '/admin/',
-            '/api/auth/',  # Garder pour compatibilité temporaire
-            '/static/',
-            '/media/',
-        ]
-        
-        return any(path.startswith(skip_path) for skip_path in skip_paths)
+        return path.startswith(self.SKIP_PATHS)
 
 
 class SupabaseUser:
@@ -121,4 +151,59 @@ class SupabaseUser:
         return True
     
     def __str__(self):
-        return self.email or self.username or self.id
\ No newline at end of file
+        return self.email or self.username or self.id
+
+
+class MetricsMiddleware:
+    """
+    Instrumentation par route (games/metrics.py) : durée de la requête,
+    requêtes SQL (nombre et temps), lectures de cache et temps des appels
+    RAWG / LLM, agrégés en histogrammes exposés sur /metrics.
+    Pour une réponse streamée (SSE), la durée s'arrête à l'envoi des en-têtes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.enabled = metrics.metrics_enabled()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        token, started = metrics.start_request(), time.perf_counter()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self.finish(request, response, token, started)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        token, started = metrics.start_request(), time.perf_counter()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self.finish(request, response, token, started)
+
+    @staticmethod
+    def route(request):
+        """Motif d'URL (cardinalité bornée), jamais le chemin brut."""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return '/' + match.route if match.route else match.view_name or 'unmatched'
+
+    def finish(self, request, response, token, started):
+        status = response.status_code if response is not None else 500
+        metrics.finish_request(token, self.route(request), request.method, status, time.perf_counter() - started)
+
@@ -30,16 +30,25 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'GameSub.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Après AuthenticationMiddleware (request.user) ; vérifie le JWT une fois, DRF réutilise les claims
+    'GameSub.middleware.SupabaseJWTMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Instrumentation par route (durée, SQL, caches, RAWG / LLM) exposée sur /metrics
+# au format Prometheus ; METRICS_TOKEN : jeton Bearer exigé pour la lecture
+# (sans jeton, /metrics n'est accessible qu'en DEBUG)
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
 # =========================
 # Security Headers
 # =========================
@@ -176,6 +185,14 @@ CORS_ALLOWED_HEADERS = [
 SUPABASE_URL = config("SUPABASE_URL", default="")
 SUPABASE_ANON_KEY = config("SUPABASE_ANON_KEY", default="")
 SUPABASE_JWT_SECRET = config("SUPABASE_JWT_SECRET", default="")
+# Clés publiques (RS256 / ES256) : URL JWKS du projet, ou file:///chemin/jwks.json en test
+SUPABASE_JWKS_URL = config(
+    "SUPABASE_JWKS_URL",
+    default=f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else "",
+)
+JWKS_CACHE_TTL = config("JWKS_CACHE_TTL", default=60 * 60, cast=int)
+# Nombre de jetons dont les claims vérifiés restent en mémoire (jusqu'à leur exp)
+SUPABASE_JWT_CACHE_SIZE = config("SUPABASE_JWT_CACHE_SIZE", default=2048, cast=int)
 
 if not SUPABASE_URL and not DEBUG:
     raise ValueError("SUPABASE_URL environment variable is required in production")
@@ -238,3 +255,87 @@ else:
 # 🤖 IA Configuration - Hugging Face
 # =========================
 HUGGINGFACE_API_TOKEN = config("HUGGINGFACE_API_TOKEN", default="")
+
+# Modèles IA (sentence-transformers, SDK OpenAI) importés à la demande ; True pour les
+# charger au démarrage d'un serveur web (python start_django.py --preload)
+PRELOAD_AI_MODELS = config("PRELOAD_AI_MODELS", default=False, cast=bool)
+
+# Endpoint compatible OpenAI du chatbot / quiz (LLM_BASE_URL=http://127.0.0.1:8001/v1
+# pour le serveur de test : python manage.py stub_llm_server)
+LLM_BASE_URL = config("LLM_BASE_URL", default="https://router.huggingface.co/v1")
+LLM_API_KEY = config("LLM_API_KEY", default=HUGGINGFACE_API_TOKEN)
+LLM_MODEL = config("LLM_MODEL", default="deepseek-ai/DeepSeek-V3.1:fireworks-ai")
+LLM_TIMEOUT = config("LLM_TIMEOUT", default=60, cast=int)
+
+# Cache des réponses du LLM (quiz) : clé exacte sur le prompt canonicalisé, et
+# optionnellement réutilisation d'un prompt quasi identique (similarité d'embeddings)
+LLM_CACHE_TTL = config("LLM_CACHE_TTL", default=60 * 60 * 24, cast=int)
+LLM_CACHE_SEMANTIC = config("LLM_CACHE_SEMANTIC", default=False, cast=bool)
+LLM_CACHE_SIMILARITY = config("LLM_CACHE_SIMILARITY", default=0.97, cast=float)
+LLM_CACHE_SEMANTIC_MAX_ENTRIES = config("LLM_CACHE_SEMANTIC_MAX_ENTRIES", default=128, cast=int)
+
+# Historique du chatbot par utilisateur : "cache" (partagé entre workers) ou "memory" (LRU local)
+CONVERSATION_STORE = config("CONVERSATION_STORE", default="cache")
+CONVERSATION_TTL = config("CONVERSATION_TTL", default=60 * 60 * 24, cast=int)
+CONVERSATION_TOKEN_BUDGET = config("CONVERSATION_TOKEN_BUDGET", default=1500, cast=int)
+CONVERSATION_MAX_MESSAGES = config("CONVERSATION_MAX_MESSAGES", default=20, cast=int)
+CONVERSATION_MEMORY_MAX_ENTRIES = config("CONVERSATION_MEMORY_MAX_ENTRIES", default=1000, cast=int)
+CONVERSATION_MEMORY_MAX_BYTES = config("CONVERSATION_MEMORY_MAX_BYTES", default=16 * 1024 * 1024, cast=int)
+
+# =========================
+# 🧮 Embeddings - quantification
+# =========================
+# Représentation des vecteurs pour la recherche de candidats : float32 | float16 | int8.
+# float16 / int8 : index en mémoire 2x / 4x plus léger (et halfvec côté pgvector),
+# les meilleurs candidats étant re-scorés en pleine précision.
+EMBEDDING_QUANTIZATION = config("EMBEDDING_QUANTIZATION", default="float32")
+EMBEDDING_RESCORE_FACTOR = config("EMBEDDING_RESCORE_FACTOR", default=4, cast=int)
+
+# Moteur d'inférence du modèle : "torch" (sentence-transformers) ou "onnx" (ONNX Runtime,
+# poids int8, export : python manage.py export_onnx_embeddings ; pip install onnxruntime)
+EMBEDDING_BACKEND = config("EMBEDDING_BACKEND", default="torch")
+EMBEDDING_ONNX_PATH = config("EMBEDDING_ONNX_PATH", default=str(BASE_DIR / "models" / "all-MiniLM-L6-v2-onnx"))
+EMBEDDING_ONNX_QUANTIZED = config("EMBEDDING_ONNX_QUANTIZED", default=True, cast=bool)
+EMBEDDING_ONNX_THREADS = config("EMBEDDING_ONNX_THREADS", default=0, cast=int)  # 0 = tous les cœurs
+
+# Sidecar d'inférence (python manage.py inference_sidecar, lancé par start_django.py) :
+# un seul processus garde le modèle chargé et regroupe les encodages de tous les workers.
+# Vide = modèle chargé dans chaque processus. FALLBACK : modèle local si le sidecar ne répond pas.
+EMBEDDING_SIDECAR_SOCKET = config("EMBEDDING_SIDECAR_SOCKET", default="")
+EMBEDDING_SIDECAR_TIMEOUT = config("EMBEDDING_SIDECAR_TIMEOUT", default=10, cast=float)
+EMBEDDING_SIDECAR_FALLBACK = config("EMBEDDING_SIDECAR_FALLBACK", default=True, cast=bool)
+
+# =========================
+# 📜 Logs
+# =========================
+# Logs des apps GameSub : JSON (ou "text") écrits par un thread dédié via une file
+# bornée, jamais par le thread de la requête. Les événements volumineux
+# (extra={'sampled': True}) ne sont gardés qu'à LOG_SAMPLE_RATE.
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+LOG_FORMAT = config("LOG_FORMAT", default="json")
+LOG_SAMPLE_RATE = config("LOG_SAMPLE_RATE", default=0.1, cast=float)
+LOG_QUEUE_SIZE = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'GameSub.log_handlers.JsonFormatter'},
+        'text': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'filters': {
+        'sampling': {'()': 'GameSub.log_handlers.SamplingFilter', 'rate': LOG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'queue': {
+            'class': 'GameSub.log_handlers.QueueStreamHandler',
+            'formatter': LOG_FORMAT,
+            'filters': ['sampling'],
+            'maxsize': LOG_QUEUE_SIZE,
+        },
+    },
+    'loggers': {
+        'games': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        'GameSub': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
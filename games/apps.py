@@ -1,4 +1,9 @@
+import logging
+import time
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class GamesConfig(AppConfig):
@@ -7,3 +12,32 @@ class GamesConfig(AppConfig):
     
     def ready(self):
         import games.signals
+
+        # Requêtes SQL comptées par requête HTTP (games/metrics.py)
+        if getattr(settings, 'METRICS_ENABLED', True):
+            from django.db.backends.signals import connection_created
+            from .metrics import install_db_wrapper
+
+            connection_created.connect(install_db_wrapper, dispatch_uid='games_metrics_db_wrapper')
+
+        # Modèles IA chargés à la demande ; préchargement optionnel pour les serveurs web
+        if getattr(settings, 'PRELOAD_AI_MODELS', False):
+            preload_ai_models()
+
+
+def preload_ai_models():
+    """
+    Charge le modèle d'embeddings (+ une inférence de chauffe) et le client
+    LLM au démarrage, pour que la première requête IA n'en paie pas le coût.
+    Avec le sidecar d'inférence, la chauffe passe par lui (aucun poids chargé ici).
+    """
+    from .inference import encode_texts
+    from .services_llm import get_llm_client
+
+    started = time.monotonic()
+    try:
+        encode_texts(["warmup"])
+    except Exception as e:
+        logger.warning(f"Préchargement du modèle d'embeddings échoué: {e}")
+    get_llm_client()
+    logger.info("Modèles IA préchargés en %.1fs", time.monotonic() - started)
@@ -1,7 +1,12 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework import exceptions
+from collections import OrderedDict
+import hashlib
+import threading
+import time
 import jwt
 from django.conf import settings
+from .jwks import ASYMMETRIC_ALGORITHMS, decode_with_jwks
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,50 +22,151 @@ class SupabaseUser:
     def is_authenticated(self):
         return True
 
+
+# -------------------------------
+# Vérification des jetons (avec cache)
+# -------------------------------
+class MissingSubjectError(jwt.InvalidTokenError):
+    pass
+
+
+class ClaimsCache:
+    """
+    LRU borné : sha256(jeton) -> claims déjà vérifiés. Une entrée n'est
+    jamais servie après l'exp du jeton ; seul un décodage réussi est mis en cache.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def set(self, token, claims):
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (claims, claims['exp'])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+claims_cache = ClaimsCache(getattr(settings, 'SUPABASE_JWT_CACHE_SIZE', 2048))
+
+
+DECODE_OPTIONS = {
+    "verify_signature": True,  # Vérification complète activée
+    "verify_exp": True,
+    "require": ["exp"],  # Token sans date d'expiration refusé
+    "verify_aud": False,  # Supabase n'utilise pas toujours audience
+}
+
+
+def decode_supabase_token(token):
+    """
+    Claims vérifiés d'un JWT Supabase (signature, exp, sub) : décodage
+    complet au premier passage, puis lecture du cache jusqu'à l'expiration.
+    RS256 / ES256 : clé publique du JWKS (games/jwks.py), sans appel réseau
+    une fois le jeu de clés en cache ; HS256 : secret partagé (anciens projets).
+    Lève jwt.InvalidTokenError (ou ExpiredSignatureError).
+    """
+    claims = claims_cache.get(token)
+    if claims is not None:
+        return claims
+
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") in ASYMMETRIC_ALGORITHMS:
+        claims = decode_with_jwks(token, header, DECODE_OPTIONS)
+    elif header.get("alg") == "HS256" and settings.SUPABASE_JWT_SECRET:
+        # Vérification JWT sécurisée avec la vraie clé secrète Supabase
+        claims = jwt.decode(token, settings.SUPABASE_JWT_SECRET, algorithms=["HS256"], options=DECODE_OPTIONS)
+    else:
+        raise jwt.InvalidAlgorithmError(f"Algorithme non accepté: {header.get('alg')}")
+    if not claims.get("sub"):
+        raise MissingSubjectError("Token sans identifiant utilisateur")
+
+    claims_cache.set(token, claims)
+    return claims
+
+
+def bearer_token(request):
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split(" ")[1]
+
+
+def authenticate_token(request, token):
+    """
+    Claims du jeton pour cette requête : vérifiés une seule fois par requête
+    (résultat partagé entre SupabaseJWTMiddleware et SupabaseAuthentication
+    via request.supabase_claims). Un jeton refusé l'est aussi une seule fois :
+    l'erreur est mémorisée sur la requête et relevée telle quelle.
+    """
+    request = getattr(request, '_request', request)  # Request DRF -> HttpRequest
+    if getattr(request, 'supabase_token', None) == token:
+        if getattr(request, 'supabase_token_error', None) is not None:
+            raise request.supabase_token_error
+        if getattr(request, 'supabase_claims', None):
+            return request.supabase_claims
+
+    request.supabase_token = token
+    request.supabase_claims = None
+    try:
+        claims = decode_supabase_token(token)
+    except jwt.InvalidTokenError as e:
+        request.supabase_token_error = e
+        raise
+    request.supabase_token_error = None
+    request.supabase_claims = claims
+    return claims
+
+
 class SupabaseAuthentication(BaseAuthentication):
     """
-    Authentification JWT pour Supabase avec clés symétriques (HMAC)
-    Compatible avec les projets Supabase existants qui utilisent HS256
+    Authentification JWT pour Supabase : clés asymétriques (RS256 / ES256, JWKS)
+    ou clé symétrique HS256 pour les projets Supabase existants
     """
 
     def authenticate(self, request):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
+        token = bearer_token(request)
+        if not token:
             return None
 
-        token = auth_header.split(" ")[1]
-
         try:
-            # Vérification JWT sécurisée avec la vraie clé secrète Supabase
-            secret_key = settings.SUPABASE_JWT_SECRET
-            
-            payload = jwt.decode(
-                token,
-                secret_key,
-                algorithms=["HS256"],
-                options={
-                    "verify_signature": True,  # Vérification complète activée
-                    "verify_exp": True,
-                    "verify_aud": False,  # Supabase n'utilise pas toujours audience
-                }
-            )
-
-            user_id = payload.get("sub")
-            email = payload.get("email")
-            
-            if not user_id:
-                raise exceptions.AuthenticationFailed("Token sans identifiant utilisateur")
-
-            # Vérifie l'expiration
-            exp = payload.get("exp")
-            if not exp:
-                raise exceptions.AuthenticationFailed("Token sans date d'expiration")
-
-            user = SupabaseUser(user_id=user_id, email=email, payload=payload)
+            payload = authenticate_token(request, token)
+            user = SupabaseUser(user_id=payload["sub"], email=payload.get("email"), payload=payload)
             return (user, token)
 
         except jwt.ExpiredSignatureError:
             raise exceptions.AuthenticationFailed("Token expiré")
+        except jwt.MissingRequiredClaimError:
+            raise exceptions.AuthenticationFailed("Token sans date d'expiration")
+        except MissingSubjectError:
+            raise exceptions.AuthenticationFailed("Token sans identifiant utilisateur")
         except jwt.InvalidTokenError as e:
             logger.warning(f"Token invalide: {e}")
             raise exceptions.AuthenticationFailed("Token invalide")
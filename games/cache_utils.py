@@ -0,0 +1,102 @@
+"""
+Cache protégé contre les « stampedes » pour les calculs coûteux
+(recherche sémantique, recommandations).
+
+- Single-flight distribué : un seul worker recalcule une clé, via un verrou
+  cache.add (SET NX sur Redis) ; les autres servent la valeur périmée.
+- Expiration anticipée probabiliste (XFetch) : plus l'échéance approche et plus
+  le calcul est long, plus un worker a de chances de rafraîchir en avance.
+- Valeur périmée conservée stale_ttl secondes après l'échéance logique.
+
+Usage :
+    results = cached_call(key, lambda: compute(...), timeout=3600)
+"""
+
+import hashlib
+import math
+import random
+import time
+from django.core.cache import cache
+from .metrics import cache_family, record_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 30  # secondes : au-delà, un verrou orphelin (worker tué) expire
+WAIT_TIMEOUT = 5.0  # attente max d'un worker sans valeur pendant qu'un autre calcule
+WAIT_INTERVAL = 0.05
+XFETCH_BETA = 1.0  # > 1 : rafraîchissement plus précoce
+
+
+def stable_key(prefix, *parts):
+    """
+    Clé de cache identique dans tous les processus : hash() de Python est
+    randomisé par processus et ne peut pas servir de clé partagée.
+    """
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()[:16]
+    return f"{prefix}_{digest}"
+
+
+def _store(key, value, timeout, stale_ttl, compute_time):
+    entry = {
+        'value': value,
+        'expires': time.time() + timeout,  # échéance logique
+        'delta': compute_time,  # durée du dernier calcul (XFetch)
+    }
+    cache.set(key, entry, timeout + stale_ttl)
+
+
+def _should_refresh(entry, beta):
+    """XFetch : now - delta * beta * ln(rand) >= expires."""
+    delta = entry.get('delta') or 0.0
+    return time.time() - delta * beta * math.log(random.random() or 1e-12) >= entry['expires']
+
+
+def _compute_and_store(key, compute, timeout, stale_ttl):
+    started = time.monotonic()
+    value = compute()
+    _store(key, value, timeout, stale_ttl, time.monotonic() - started)
+    return value
+
+
+def cached_call(key, compute, timeout, stale_ttl=None, beta=XFETCH_BETA):
+    """
+    Retourne la valeur en cache de `key`, ou la calcule avec `compute()`.
+    Un seul worker recalcule à la fois ; pendant ce temps les autres
+    servent l'ancienne valeur (ou attendent brièvement s'il n'y en a pas).
+    """
+    if stale_ttl is None:
+        stale_ttl = timeout
+    lock_key = f"lock_{key}"
+
+    entry = cache.get(key)
+    record_cache(cache_family(key), isinstance(entry, dict) and 'expires' in entry)
+    if isinstance(entry, dict) and 'expires' in entry:
+        if not _should_refresh(entry, beta):
+            return entry['value']
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            return entry['value']  # un autre worker rafraîchit : valeur périmée servie
+        try:
+            return _compute_and_store(key, compute, timeout, stale_ttl)
+        except Exception as e:
+            logger.warning("Rafraîchissement de %s échoué, valeur périmée servie : %s", key, e)
+            return entry['value']
+        finally:
+            cache.delete(lock_key)
+
+    # Absente : un seul worker calcule, les autres attendent son résultat
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return _compute_and_store(key, compute, timeout, stale_ttl)
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if isinstance(entry, dict) and 'expires' in entry:
+            return entry['value']
+        if cache.get(lock_key) is None:
+            break  # le calcul a échoué ailleurs : on tente nous-mêmes
+    return _compute_and_store(key, compute, timeout, stale_ttl)
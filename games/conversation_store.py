@@ -0,0 +1,316 @@
+"""
+Historique du chatbot et réponses du quiz, par utilisateur authentifié.
+
+Deux backends (settings.CONVERSATION_STORE) :
+- "cache" (défaut) : cache Django (Redis en production), partagé entre
+  workers et processus, expiration CONVERSATION_TTL ; l'éviction globale
+  est celle du cache (maxmemory / MAX_ENTRIES).
+- "memory" : LRU en mémoire du processus, plafonné en nombre d'utilisateurs
+  et en octets (mono-processus, développement).
+
+Chaque conversation est bornée par un budget de tokens (estimé) et un nombre
+maximal de messages ; le prompt système n'est pas stocké (constant, ajouté à
+l'envoi). Sérialisation compacte : JSON [[rôle, texte], ...] avec rôle sur un
+caractère, compressé zlib au-delà de COMPRESS_MIN_BYTES.
+
+append() est une lecture-modification-écriture : elle s'exécute sous un verrou
+par conversation (cache.add, comme cache_utils) pour que deux messages
+simultanés du même utilisateur ne fassent pas disparaître un tour. Verrou non
+obtenu en LOCK_WAIT secondes : ConversationLockTimeout, rien n'est écrit.
+La variante async attend le verrou sur la boucle d'événements (asyncio.sleep),
+sans occuper le thread partagé de sync_to_async.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLE_CODES = {'user': 'u', 'assistant': 'a', 'system': 's'}
+CODE_ROLES = {code: role for role, code in ROLE_CODES.items()}
+COMPRESS_MIN_BYTES = 512
+RAW, ZLIB = b'j', b'z'  # premier octet : format du reste
+CHARS_PER_TOKEN = 4  # estimation sans tokenizer (texte FR/EN)
+LOCK_TIMEOUT = 5  # secondes : un append dure quelques ms, un verrou orphelin expire vite
+LOCK_WAIT = 2  # attente maximale du verrou avant d'abandonner l'écriture
+WAIT_INTERVAL = 0.01
+LOCK_STRIPES = 64
+
+
+# -------------------------------
+# Budget de tokens
+# -------------------------------
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 4  # + surcoût par message (rôle, séparateurs)
+
+
+def trim_messages(messages, token_budget=None, max_messages=None):
+    """
+    Garde les messages les plus récents tenant dans le budget ; le dernier
+    message est toujours conservé, et l'historique ne commence jamais par
+    une réponse orpheline de sa question.
+    """
+    token_budget = token_budget or settings.CONVERSATION_TOKEN_BUDGET
+    max_messages = max_messages or settings.CONVERSATION_MAX_MESSAGES
+
+    kept, used = [], 0
+    for message in reversed(messages[-max_messages:]):
+        cost = estimate_tokens(message['content'])
+        if kept and used + cost > token_budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    while len(kept) > 1 and kept[0]['role'] == 'assistant':
+        kept.pop(0)
+    return kept
+
+
+# -------------------------------
+# Sérialisation compacte
+# -------------------------------
+def encode_messages(messages):
+    payload = json.dumps(
+        [[ROLE_CODES.get(m['role'], m['role']), m['content']] for m in messages],
+        ensure_ascii=False, separators=(',', ':'),
+    ).encode()
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        return ZLIB + zlib.compress(payload)
+    return RAW + payload
+
+
+def decode_messages(data):
+    if not data:
+        return []
+    data = bytes(data)
+    payload = zlib.decompress(data[1:]) if data[:1] == ZLIB else data[1:]
+    return [{'role': CODE_ROLES.get(role, role), 'content': content} for role, content in json.loads(payload)]
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+class ConversationLockTimeout(Exception):
+    """Conversation verrouillée par une autre écriture au-delà de LOCK_WAIT."""
+
+
+class ConversationStore(ABC):
+    """Interface commune ; les vues async utilisent les variantes a*()."""
+
+    @abstractmethod
+    def get_raw(self, key):
+        """Valeur brute (bytes) de la clé, ou None."""
+
+    @abstractmethod
+    def set_raw(self, key, value):
+        """Écrit la valeur brute (bytes) de la clé."""
+
+    @abstractmethod
+    def delete_raw(self, key):
+        """Supprime la clé."""
+
+    @abstractmethod
+    def conversation_lock(self, user_id):
+        """
+        Context manager : verrou exclusif sur la conversation de l'utilisateur.
+        Lève ConversationLockTimeout s'il n'est pas obtenu en LOCK_WAIT secondes.
+        """
+
+    @staticmethod
+    def conversation_key(user_id):
+        return f"chat_conv_{user_id}"
+
+    @staticmethod
+    def quiz_key(user_id):
+        return f"chat_quiz_{user_id}"
+
+    @staticmethod
+    def decode_history(user_id, data):
+        try:
+            return decode_messages(data)
+        except (ValueError, zlib.error) as e:
+            logger.warning(f"Historique illisible pour {user_id}, réinitialisé: {e}")
+            return []
+
+    def load(self, user_id):
+        return self.decode_history(user_id, self.get_raw(self.conversation_key(user_id)))
+
+    def append(self, user_id, *messages):
+        """Ajoute des messages (question, réponse...) puis applique le budget."""
+        with self.conversation_lock(user_id):
+            conversation = trim_messages(self.load(user_id) + list(messages))
+            self.set_raw(self.conversation_key(user_id), encode_messages(conversation))
+        return conversation
+
+    def clear(self, user_id):
+        self.delete_raw(self.conversation_key(user_id))
+
+    def save_quiz_answers(self, user_id, answers):
+        self.set_raw(self.quiz_key(user_id), json.dumps(answers, ensure_ascii=False, separators=(',', ':')).encode())
+
+    def get_quiz_answers(self, user_id):
+        data = self.get_raw(self.quiz_key(user_id))
+        return json.loads(data) if data else None
+
+    async def aload(self, user_id):
+        return await sync_to_async(self.load)(user_id)
+
+    async def aappend(self, user_id, *messages):
+        # Attente éventuelle du verrou : hors du thread partagé des appels ORM
+        return await sync_to_async(self.append, thread_sensitive=False)(user_id, *messages)
+
+    async def asave_quiz_answers(self, user_id, answers):
+        await sync_to_async(self.save_quiz_answers)(user_id, answers)
+
+
+class CacheConversationStore(ConversationStore):
+    """Cache Django : historique partagé par tous les workers."""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or settings.CONVERSATION_TTL
+
+    def get_raw(self, key):
+        return cache.get(key)
+
+    def set_raw(self, key, value):
+        cache.set(key, value, self.timeout)
+
+    def delete_raw(self, key):
+        cache.delete(key)
+
+    def lock_key(self, user_id):
+        return f"lock_{self.conversation_key(user_id)}"
+
+    @contextmanager
+    def conversation_lock(self, user_id):
+        lock_key, owner = self.lock_key(user_id), uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_WAIT
+        while not cache.add(lock_key, owner, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise ConversationLockTimeout(f"Conversation de {user_id} verrouillée")
+            time.sleep(WAIT_INTERVAL)
+        try:
+            yield
+        finally:
+            # Verrou expiré puis repris par un autre worker : on ne libère pas le sien
+            if cache.get(lock_key) == owner:
+                cache.delete(lock_key)
+
+    @asynccontextmanager
+    async def aconversation_lock(self, user_id):
+        lock_key, owner = self.lock_key(user_id), uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_WAIT
+        while not await cache.aadd(lock_key, owner, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise ConversationLockTimeout(f"Conversation de {user_id} verrouillée")
+            await asyncio.sleep(WAIT_INTERVAL)
+        try:
+            yield
+        finally:
+            if await cache.aget(lock_key) == owner:
+                await cache.adelete(lock_key)
+
+    async def aload(self, user_id):
+        return self.decode_history(user_id, await cache.aget(self.conversation_key(user_id)))
+
+    async def aappend(self, user_id, *messages):
+        key = self.conversation_key(user_id)
+        async with self.aconversation_lock(user_id):
+            conversation = trim_messages(self.decode_history(user_id, await cache.aget(key)) + list(messages))
+            await cache.aset(key, encode_messages(conversation), self.timeout)
+        return conversation
+
+
+class MemoryConversationStore(ConversationStore):
+    """LRU en mémoire, borné en entrées et en octets (les plus anciennes sont évincées)."""
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries or settings.CONVERSATION_MEMORY_MAX_ENTRIES
+        self.max_bytes = max_bytes or settings.CONVERSATION_MEMORY_MAX_BYTES
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Verrous de conversation par tranches : mémoire fixe, quel que soit le nombre d'utilisateurs
+        self._conversation_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def get_raw(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set_raw(self, key, value):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def delete_raw(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._bytes -= len(value)
+
+    @contextmanager
+    def conversation_lock(self, user_id):
+        lock = self._conversation_locks[hash(str(user_id)) % LOCK_STRIPES]
+        if not lock.acquire(timeout=LOCK_WAIT):
+            raise ConversationLockTimeout(f"Conversation de {user_id} verrouillée")
+        try:
+            yield
+        finally:
+            lock.release()
+
+    # Aucune E/S : pas besoin de passer par un thread
+    async def aload(self, user_id):
+        return self.load(user_id)
+
+    async def aappend(self, user_id, *messages):
+        return self.append(user_id, *messages)
+
+    async def asave_quiz_answers(self, user_id, answers):
+        self.save_quiz_answers(user_id, answers)
+
+
+STORE_BACKENDS = {
+    'cache': CacheConversationStore,
+    'memory': MemoryConversationStore,
+}
+
+_store = None
+
+
+def get_conversation_store():
+    """Store configuré par settings.CONVERSATION_STORE (un par processus)."""
+    global _store
+    if _store is None:
+        backend = str(getattr(settings, 'CONVERSATION_STORE', 'cache')).lower()
+        if backend not in STORE_BACKENDS:
+            logger.warning("CONVERSATION_STORE=%s inconnu, cache utilisé", backend)
+            backend = 'cache'
+        _store = STORE_BACKENDS[backend]()
+    return _store
@@ -0,0 +1,87 @@
+"""
+Champ d'embedding portable.
+
+- PostgreSQL : colonne pgvector ``vector(n)`` (inchangé, opérateurs <=> et index HNSW).
+- Autres bases (SQLite...) : BLOB de float32 little-endian bruts, 4 octets par
+  dimension au lieu d'une liste JSON de décimaux, décodé par np.frombuffer sans
+  copie ni parsing de texte.
+"""
+
+import json
+from django.db import models
+import numpy as np
+
+try:
+    from pgvector import Vector
+except ImportError:  # pgvector optionnel hors PostgreSQL
+    Vector = None
+
+PACKED_DTYPE = np.dtype('<f4')
+
+
+def pack_vector(value):
+    """list / ndarray -> octets float32 little-endian."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    return np.asarray(value, dtype=PACKED_DTYPE).tobytes()
+
+
+def unpack_vector(value):
+    """Octets -> ndarray float32 (lecture seule, partage le buffer)."""
+    return np.frombuffer(value, dtype=PACKED_DTYPE)
+
+
+def parse_vector_text(value):
+    """Texte '[0.1,0.2,...]' (pgvector ou JSON) -> ndarray float32."""
+    return np.asarray(json.loads(value), dtype=np.float32)
+
+
+class PackedVectorField(models.Field):
+    description = 'Embedding (pgvector sur PostgreSQL, float32 binaire ailleurs)'
+    empty_strings_allowed = False
+
+    def __init__(self, *args, dimensions=None, **kwargs):
+        self.dimensions = dimensions
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dimensions is not None:
+            kwargs['dimensions'] = self.dimensions
+        return name, path, args, kwargs
+
+    @staticmethod
+    def _is_pgvector(connection):
+        return connection.vendor == 'postgresql'
+
+    def db_type(self, connection):
+        if self._is_pgvector(connection):
+            return 'vector(%d)' % self.dimensions if self.dimensions else 'vector'
+        return connection.data_types.get('BinaryField', 'BLOB')
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        if self._is_pgvector(connection):
+            if Vector is not None:
+                return Vector._to_db(value)
+            return '[' + ','.join(str(float(v)) for v in value) + ']'
+        return connection.Database.Binary(pack_vector(value))
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, (list, np.ndarray)):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return unpack_vector(value)
+        if isinstance(value, str):
+            return parse_vector_text(value)
+        if Vector is not None and isinstance(value, Vector):
+            return value.to_numpy()
+        return value
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return '' if value is None else json.dumps([float(v) for v in value])
@@ -0,0 +1,128 @@
+"""
+Filtres catalogue sur les attributs JSON de Game (genres, platforms, tags).
+
+PostgreSQL : prédicats de containment jsonb (@>) servis par les index GIN
+jsonb_path_ops (migration 0009). Autres bases : repli sur les tables de
+liaison relationnelles.
+
+Syntaxe des paramètres :
+    ?genre=action                       un genre
+    ?genre=action,rpg  (ou répété)      au moins un des genres (OR, défaut)
+    ?genre=action,rpg&genre_match=all   tous les genres (AND)
+"""
+
+from django.db import connection
+from django.db.models import Q
+from .models import Game
+from .services_taxonomy import TAXONOMIES, resolve_items
+
+# paramètre de requête -> champ JSON de Game
+ATTRIBUTE_PARAMS = {
+    'genre': 'genres',
+    'platform': 'platforms',
+    'tag': 'tags',
+}
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def parse_multi_value(params, name):
+    """Valeurs d'un paramètre multi-valué (virgules et/ou paramètre répété)."""
+    if hasattr(params, 'getlist'):
+        raw_values = params.getlist(name)
+    else:
+        raw_values = [params.get(name)] if params.get(name) else []
+
+    values = []
+    for raw in raw_values:
+        for value in str(raw).split(','):
+            value = value.strip()
+            if value and value not in values:
+                values.append(value)
+    return values
+
+
+def parse_match_mode(params, name):
+    mode = (params.get(f'{name}_match') or MATCH_ANY).lower()
+    return MATCH_ALL if mode in (MATCH_ALL, 'and') else MATCH_ANY
+
+
+def attribute_filter(field, values, mode=MATCH_ANY):
+    """
+    Construit le prédicat pour un attribut JSON.
+    Les valeurs sont d'abord résolues en IDs RAWG via la petite table de taxonomie,
+    ce qui rend le containment exact (casse, slug) et indexable.
+    """
+    _, through, fk = TAXONOMIES[field]
+
+    resolved = []
+    for value in values:
+        ids = list(resolve_items(field, value).values_list('id', 'external_id'))
+        if ids:
+            resolved.append(ids)
+        elif mode == MATCH_ALL:
+            # Une valeur inconnue ne peut pas être contenue par un jeu
+            return Q(pk__in=[])
+
+    if not resolved:
+        return Q(pk__in=[])
+
+    if 'postgresql' in connection.vendor:
+        if mode == MATCH_ALL:
+            # AND de prédicats @> : genres @> '[{"id": 4}]' AND genres @> '[{"id": 5}]'
+            q = Q()
+            for ids in resolved:
+                q &= _contains_any(field, [ext_id for _, ext_id in ids])
+            return q
+        return _contains_any(field, [ext_id for ids in resolved for _, ext_id in ids])
+
+    # Repli relationnel (SQLite...) : sous-requêtes sur l'index (item, game)
+    if mode == MATCH_ALL:
+        q = Q()
+        for ids in resolved:
+            q &= Q(pk__in=through.objects.filter(**{f'{fk}_id__in': [pk for pk, _ in ids]}).values('game_id'))
+        return q
+    pks = [pk for ids in resolved for pk, _ in ids]
+    return Q(pk__in=through.objects.filter(**{f'{fk}_id__in': pks}).values('game_id'))
+
+
+def _contains_any(field, external_ids):
+    """OR de prédicats @> (un par ID) ; chacun utilise l'index GIN."""
+    q = Q()
+    for ext_id in dict.fromkeys(external_ids):
+        q |= Q(**{f'{field}__contains': [{'id': ext_id}]})
+    return q
+
+
+def apply_attribute_filters(queryset, params):
+    """Applique ?genre= / ?platform= / ?tag= (et leurs *_match) à un queryset de Game."""
+    for name, field in ATTRIBUTE_PARAMS.items():
+        values = parse_multi_value(params, name)
+        if values:
+            queryset = queryset.filter(attribute_filter(field, values, parse_match_mode(params, name)))
+    return queryset
+
+
+def filter_catalog(params, queryset=None):
+    """Queryset du catalogue filtré par ?search= et les attributs JSON."""
+    if queryset is None:
+        queryset = Game.objects.all()
+    search = params.get('search')
+    if search:
+        queryset = queryset.filter(Q(name__icontains=search) | Q(description__icontains=search))
+    return apply_attribute_filters(queryset, params)
+
+
+def has_catalog_filters(params):
+    return bool(params.get('search')) or any(parse_multi_value(params, name) for name in ATTRIBUTE_PARAMS)
+
+
+def attribute_filters_cache_key(params):
+    """Fragment de clé de cache stable pour les filtres d'attributs."""
+    parts = []
+    for name in ATTRIBUTE_PARAMS:
+        values = parse_multi_value(params, name)
+        if values:
+            parts.append(f"{name}={','.join(sorted(v.lower() for v in values))}:{parse_match_mode(params, name)}")
+    return '|'.join(parts)
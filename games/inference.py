@@ -0,0 +1,259 @@
+"""
+Calcul des embeddings : point d'entrée unique encode_texts().
+
+Si settings.EMBEDDING_SIDECAR_SOCKET est défini, les textes sont envoyés au
+sidecar d'inférence (python manage.py inference_sidecar) : un seul processus
+charge all-MiniLM-L6-v2, le chauffe au démarrage et regroupe en lots les
+requêtes de tous les workers. Sinon (ou si le sidecar ne répond pas et que
+EMBEDDING_SIDECAR_FALLBACK est actif), le modèle est chargé localement.
+
+Protocole (socket Unix, connexion persistante par thread) :
+    requête  : [u32 longueur][JSON {"texts": [...], "normalize": bool}]
+    réponse  : [u32 longueur][JSON {"shape": [n, d]} ou {"error": "..."}]
+               puis n * d float32 little-endian si shape.
+Les sockets Unix n'existent pas partout (Windows) : sans AF_UNIX, pas de sidecar.
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+HAS_UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')
+HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+DTYPE = np.dtype('<f4')
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'gamesub-embeddings.sock')
+
+
+# -------------------------------
+# Trames
+# -------------------------------
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connexion fermée par le pair")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_frame(sock, payload, body=b''):
+    data = json.dumps(payload, ensure_ascii=False).encode()
+    sock.sendall(HEADER.pack(len(data)) + data + body)
+
+
+def recv_frame(sock):
+    (size,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ConnectionError(f"Trame trop grande ({size} octets)")
+    return json.loads(_recv_exact(sock, size))
+
+
+# -------------------------------
+# Client (workers Django)
+# -------------------------------
+class SidecarUnavailable(Exception):
+    pass
+
+
+class SidecarClient:
+    """Une connexion persistante par thread, rouverte après une erreur."""
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def encode(self, texts, normalize=True):
+        try:
+            sock = self._connection()
+            send_frame(sock, {'texts': texts, 'normalize': normalize})
+            reply = recv_frame(sock)
+            if 'error' in reply:
+                raise SidecarUnavailable(reply['error'])
+            n, d = reply['shape']
+            return np.frombuffer(_recv_exact(sock, n * d * DTYPE.itemsize), dtype=DTYPE).reshape(n, d)
+        except (OSError, ConnectionError, ValueError) as e:
+            self._reset()
+            raise SidecarUnavailable(str(e))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def sidecar_socket():
+    return getattr(settings, 'EMBEDDING_SIDECAR_SOCKET', '') if HAS_UNIX_SOCKETS else ''
+
+
+def get_sidecar_client():
+    global _client
+    path = sidecar_socket()
+    if not path:
+        return None
+    if _client is None or _client.path != path:
+        with _client_lock:
+            if _client is None or _client.path != path:
+                _client = SidecarClient(path, settings.EMBEDDING_SIDECAR_TIMEOUT)
+    return _client
+
+
+def encode_local(texts, normalize=True):
+    from .services_embeddings import get_model
+
+    return np.asarray(get_model().encode(texts, normalize_embeddings=normalize), dtype=np.float32)
+
+
+def encode_texts(texts, normalize=True):
+    """
+    Embeddings (n x d, float32) d'une liste de textes, ou (d,) pour un texte seul.
+    """
+    single = isinstance(texts, str)
+    batch = [texts] if single else list(texts)
+    if not batch:
+        return np.empty((0, 0), dtype=np.float32)
+
+    client = get_sidecar_client()
+    vectors = None
+    if client is not None:
+        try:
+            vectors = client.encode(batch, normalize)
+        except SidecarUnavailable as e:
+            if not settings.EMBEDDING_SIDECAR_FALLBACK:
+                raise
+            logger.warning(f"Sidecar d'inférence indisponible ({e}), modèle local utilisé")
+    if vectors is None:
+        vectors = encode_local(batch, normalize)
+    return vectors[0] if single else vectors
+
+
+# -------------------------------
+# Serveur (sidecar)
+# -------------------------------
+class BatchingEncoder:
+    """
+    File de requêtes servie par un thread unique : les textes reçus pendant
+    `window` secondes (jusqu'à `max_batch`) partent dans un seul encode().
+    """
+
+    def __init__(self, model, max_batch=64, window=0.005):
+        self.model = model
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts, normalize=True):
+        future = Future()
+        self._queue.put((texts, normalize, future))
+        return future
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.window
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            for normalize in {item[1] for item in pending}:
+                group = [item for item in pending if item[1] == normalize]
+                texts = [text for item in group for text in item[0]]
+                try:
+                    vectors = np.asarray(
+                        self.model.encode(texts, batch_size=self.max_batch, normalize_embeddings=normalize),
+                        dtype=DTYPE,
+                    )
+                except Exception as e:
+                    for _, _, future in group:
+                        future.set_exception(e)
+                    continue
+                start = 0
+                for item_texts, _, future in group:
+                    future.set_result(vectors[start:start + len(item_texts)])
+                    start += len(item_texts)
+
+
+class SidecarRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = recv_frame(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            texts = request.get('texts')
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                send_frame(self.request, {'error': 'texts doit être une liste de chaînes'})
+                continue
+            try:
+                vectors = self.server.encoder.submit(texts, bool(request.get('normalize', True))).result()
+            except Exception as e:
+                send_frame(self.request, {'error': str(e)})
+                continue
+            send_frame(self.request, {'shape': list(vectors.shape)}, vectors.tobytes())
+
+
+if HAS_UNIX_SOCKETS:
+    class InferenceServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 128  # connexions simultanées de tous les workers
+
+        def __init__(self, path, encoder):
+            if os.path.exists(path):
+                os.unlink(path)  # socket d'un sidecar précédent
+            self.encoder = encoder
+            super().__init__(path, SidecarRequestHandler)
+            os.chmod(path, 0o660)
+else:
+    InferenceServer = None
+
+
+def warmup(model):
+    """Première inférence (allocation, noyaux) faite avant d'accepter des requêtes."""
+    started = time.monotonic()
+    model.encode(["warmup"] * 8, normalize_embeddings=True)
+    return time.monotonic() - started
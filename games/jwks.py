@@ -0,0 +1,157 @@
+"""
+Vérification des JWT Supabase signés par clé asymétrique (RS256 / ES256).
+
+Le jeu de clés publiques (JWKS) est récupéré une fois puis gardé :
+- en mémoire du processus (JWKS_CACHE_TTL secondes) ;
+- dans le cache Django / Redis, partagé par les workers (même TTL).
+Un `kid` inconnu (rotation des clés) déclenche un rechargement depuis la
+source. Les tentatives, réussies ou non, sont limitées à une par
+JWKS_MIN_REFRESH_INTERVAL : ni un jeton forgé ni une panne de l'endpoint
+ne provoquent un appel réseau à chaque requête. Pendant une panne, les
+clés déjà chargées restent utilisées.
+
+settings.SUPABASE_JWKS_URL accepte une URL https:// ou un fichier local
+file:///chemin/jwks.json (tests, voir la commande jwks_fixture).
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+import jwt
+import requests
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ('RS256', 'ES256')
+JWKS_CACHE_KEY = 'jwks_supabase'
+JWKS_FETCH_TIMEOUT = 5  # secondes
+JWKS_MIN_REFRESH_INTERVAL = 30  # secondes entre deux rechargements forcés
+
+
+class JWKSError(jwt.InvalidTokenError):
+    pass
+
+
+def jwks_url():
+    return getattr(settings, 'SUPABASE_JWKS_URL', '')
+
+
+def fetch_jwks(url):
+    """Jeu de clés brut depuis une URL http(s) ou file://."""
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return json.loads(Path(unquote(parsed.path)).read_text())
+    try:
+        response = requests.get(url, timeout=JWKS_FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        raise JWKSError(f"JWKS indisponible: {e}")
+
+
+class JWKSKeySet:
+    """Clés publiques indexées par kid, avec cache mémoire + cache Django."""
+
+    def __init__(self, url=None, ttl=None):
+        self.url = url
+        self.ttl = ttl
+        self._keys = {}
+        self._loaded_at = 0.0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def source(self):
+        return self.url or jwks_url()
+
+    @property
+    def cache_ttl(self):
+        return self.ttl or settings.JWKS_CACHE_TTL
+
+    @staticmethod
+    def parse(jwks):
+        keys = {}
+        for data in (jwks or {}).get('keys', []):
+            if data.get('use', 'sig') != 'sig':
+                continue
+            try:
+                key = jwt.PyJWK(data)
+            except jwt.PyJWKError as e:
+                logger.warning(f"Clé JWKS ignorée ({data.get('kid')}): {e}")
+                continue
+            if key.algorithm_name in ASYMMETRIC_ALGORITHMS:
+                keys[data.get('kid')] = key
+        return keys
+
+    def _fetch(self):
+        """Jeu de clés depuis la source : au plus une tentative par JWKS_MIN_REFRESH_INTERVAL."""
+        if not self.source:
+            raise JWKSError("SUPABASE_JWKS_URL non configuré")
+        if time.monotonic() - self._last_refresh < JWKS_MIN_REFRESH_INTERVAL:
+            raise JWKSError("JWKS indisponible (dernière tentative trop récente)")
+        self._last_refresh = time.monotonic()  # échecs compris
+        try:
+            return fetch_jwks(self.source)
+        except (OSError, ValueError) as e:
+            raise JWKSError(f"JWKS indisponible: {e}")
+
+    def _load(self, force=False):
+        """Cache Django puis source ; force=True ignore le cache Django."""
+        jwks = None if force else cache.get(JWKS_CACHE_KEY)
+        if jwks is None:
+            jwks = self._fetch()
+            cache.set(JWKS_CACHE_KEY, jwks, self.cache_ttl)
+            logger.info("JWKS rechargé depuis %s (%d clés)", self.source, len(jwks.get('keys', [])))
+        self._keys = self.parse(jwks)
+        self._loaded_at = time.monotonic()
+
+    def get_key(self, kid):
+        now = time.monotonic()
+        if not self._keys or now - self._loaded_at >= self.cache_ttl:
+            with self._lock:
+                if not self._keys or time.monotonic() - self._loaded_at >= self.cache_ttl:
+                    try:
+                        self._load()
+                    except JWKSError as e:
+                        if not self._keys:
+                            raise
+                        logger.warning(f"JWKS non rechargé, clés précédentes conservées: {e}")
+                        # Prochain essai après l'intervalle minimal, pas à chaque requête
+                        self._loaded_at = time.monotonic() - self.cache_ttl + JWKS_MIN_REFRESH_INTERVAL
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_refresh >= JWKS_MIN_REFRESH_INTERVAL:
+            # kid inconnu : rotation probable des clés côté Supabase
+            with self._lock:
+                key = self._keys.get(kid)
+                if key is None and time.monotonic() - self._last_refresh >= JWKS_MIN_REFRESH_INTERVAL:
+                    self._load(force=True)
+                    key = self._keys.get(kid)
+        if key is None:
+            raise JWKSError(f"Clé de signature inconnue (kid={kid})")
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._loaded_at = self._last_refresh = 0.0
+        cache.delete(JWKS_CACHE_KEY)
+
+
+key_set = JWKSKeySet()
+
+
+def decode_with_jwks(token, header, options):
+    """Décode un JWT asymétrique avec la clé publique désignée par son kid."""
+    algorithm = header.get('alg')
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        raise JWKSError(f"Algorithme non supporté: {algorithm}")
+    key = key_set.get_key(header.get('kid'))
+    if key.algorithm_name != algorithm:
+        raise JWKSError("Algorithme du jeton différent de celui de la clé")
+    return jwt.decode(token, key.key, algorithms=[algorithm], options=options)
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from games.models import Game
+from games.services_taxonomy import top_taxonomy_counts
 from django.db.models import Count, Avg, Q
-import json
 
 class Command(BaseCommand):
     help = 'Display database statistics'
@@ -37,24 +37,8 @@ class Command(BaseCommand):
         
         # Top genres
         self.stdout.write(f"\n[GENRES] Top 10 genres:")
-        genre_counts = {}
-        
-        for game in Game.objects.exclude(genres__isnull=True).exclude(genres=''):
-            if game.genres:
-                try:
-                    if isinstance(game.genres, str):
-                        genres = json.loads(game.genres)
-                    else:
-                        genres = game.genres
-                    
-                    for genre in genres:
-                        if isinstance(genre, dict) and 'name' in genre:
-                            genre_name = genre['name']
-                            genre_counts[genre_name] = genre_counts.get(genre_name, 0) + 1
-                except:
-                    continue
-        
-        for genre, count in sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
+        # Agrégat sur la table de liaison game_genres (plus de parcours Python du JSON)
+        for genre, count in top_taxonomy_counts('genres', limit=10):
             self.stdout.write(f"   {genre}: {count} games")
         
         # Recent games
@@ -0,0 +1,85 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from games.models import Game
+from games.services_embeddings import MODEL_NAME, load_torch_model, text_for_game
+from games.services_onnx import (
+    MODEL_FILE, ONNXRUNTIME_AVAILABLE, PARITY_TEXTS, QUANTIZED_MODEL_FILE,
+    OnnxEncoder, export_onnx, parity_report, quantize_onnx,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte le modèle d'embeddings en ONNX, le quantifie en int8 et vérifie "
+        "la parité avec PyTorch (backend EMBEDDING_BACKEND=onnx)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--out',
+            default=settings.EMBEDDING_ONNX_PATH,
+            help='Dossier du modèle exporté (défaut: EMBEDDING_ONNX_PATH)'
+        )
+        parser.add_argument(
+            '--no-quantize',
+            action='store_true',
+            help='Exporte seulement le modèle float32'
+        )
+        parser.add_argument(
+            '--min-cosine',
+            type=float,
+            default=0.99,
+            help='Cosinus minimal exigé entre embeddings PyTorch et ONNX (défaut: 0.99)'
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=200,
+            help='Nombre de jeux du catalogue ajoutés aux textes de contrôle (défaut: 200)'
+        )
+
+    def handle(self, *args, **options):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise CommandError("onnxruntime non installé (pip install onnxruntime onnx)")
+
+        out = options['out']
+        reference = load_torch_model()
+        self.stdout.write(f"Export de {MODEL_NAME} vers {out}...")
+        model_path = export_onnx(reference, out)
+
+        texts = PARITY_TEXTS + [
+            text_for_game(game) for game in Game.objects.order_by('-rating')[:options['samples']]
+        ]
+        candidates = [(MODEL_FILE, False)]
+        if not options['no_quantize']:
+            quantize_onnx(model_path, model_path.with_name(QUANTIZED_MODEL_FILE))
+            candidates.append((QUANTIZED_MODEL_FILE, True))
+
+        reference_time = self.timed(reference, texts)
+        self.stdout.write(f"   PyTorch : {reference_time * 1000:.0f} ms pour {len(texts)} textes")
+
+        for name, quantized in candidates:
+            encoder = OnnxEncoder(out, quantized=quantized)
+            report = parity_report(reference, encoder, texts)
+            elapsed = self.timed(encoder, texts)
+            size_mb = (model_path.parent / name).stat().st_size / 1024 / 1024
+            self.stdout.write(
+                f"   {name} ({size_mb:.1f} Mo) : {elapsed * 1000:.0f} ms "
+                f"(x{reference_time / max(elapsed, 1e-9):.1f}), cosinus min {report['min_cosine']:.4f} / "
+                f"moyen {report['mean_cosine']:.4f}, écart max {report['max_abs_diff']:.4f}"
+            )
+            if report['min_cosine'] < options['min_cosine']:
+                (model_path.parent / name).unlink()
+                raise CommandError(
+                    f"Parité insuffisante pour {name} ({report['min_cosine']:.4f} < {options['min_cosine']}) : fichier supprimé"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"[OK] Modèle ONNX prêt dans {out} (EMBEDDING_BACKEND=onnx)"))
+
+    @staticmethod
+    def timed(encoder, texts):
+        encoder.encode(texts[:8], normalize_embeddings=True)  # chauffe
+        started = time.perf_counter()
+        encoder.encode(texts, batch_size=32, normalize_embeddings=True)
+        return time.perf_counter() - started
@@ -0,0 +1,52 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from games.inference import DEFAULT_SOCKET, HAS_UNIX_SOCKETS, BatchingEncoder, InferenceServer, warmup
+from games.services_embeddings import MODEL_NAME, get_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Sidecar d'inférence : charge le modèle d'embeddings une fois et sert les "
+        "workers Django via un socket Unix (EMBEDDING_SIDECAR_SOCKET)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=settings.EMBEDDING_SIDECAR_SOCKET or DEFAULT_SOCKET,
+            help=f'Chemin du socket Unix (défaut: EMBEDDING_SIDECAR_SOCKET ou {DEFAULT_SOCKET})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=64,
+            help='Nombre maximum de textes encodés ensemble (défaut: 64)'
+        )
+        parser.add_argument(
+            '--batch-window-ms',
+            type=float,
+            default=5,
+            help='Attente maximale pour compléter un lot, en millisecondes (défaut: 5)'
+        )
+
+    def handle(self, *args, **options):
+        if not HAS_UNIX_SOCKETS:
+            raise CommandError("Sockets Unix indisponibles sur ce système : sidecar désactivé")
+
+        path = options['socket']
+        model = get_model()
+        elapsed = warmup(model)
+        self.stdout.write(f"   Modèle {MODEL_NAME} chargé, chauffe en {elapsed * 1000:.0f} ms")
+
+        encoder = BatchingEncoder(model, max_batch=options['batch_size'], window=options['batch_window_ms'] / 1000)
+        server = InferenceServer(path, encoder)
+        self.stdout.write(self.style.SUCCESS(f"[OK] Sidecar d'inférence sur {path} (Ctrl+C pour arrêter)"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("\nArret du sidecar d'inférence")
+        finally:
+            server.server_close()
+            if os.path.exists(path):
+                os.unlink(path)
@@ -0,0 +1,97 @@
+import json
+import time
+import uuid
+from pathlib import Path
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from django.core.management.base import BaseCommand, CommandError
+
+PRIVATE_KEY_FILE = 'private_key.pem'
+JWKS_FILE = 'jwks.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'JWKS local pour les tests : génère une paire de clés et jwks.json '
+        '(SUPABASE_JWKS_URL=file:///.../jwks.json), ou signe un jeton de test (--token)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--out',
+            default='jwks_fixture',
+            help='Dossier de la fixture (défaut: ./jwks_fixture)'
+        )
+        parser.add_argument(
+            '--alg',
+            choices=['RS256', 'ES256'],
+            default='ES256',
+            help='Algorithme de la clé générée (défaut: ES256, comme Supabase)'
+        )
+        parser.add_argument(
+            '--token',
+            metavar='USER_ID',
+            help='Signe un jeton pour cet utilisateur avec la clé existante au lieu de générer'
+        )
+        parser.add_argument(
+            '--email',
+            default='test@gamesub.local',
+            help='Email du jeton signé (défaut: test@gamesub.local)'
+        )
+        parser.add_argument(
+            '--ttl',
+            type=int,
+            default=3600,
+            help='Durée de validité du jeton signé en secondes (défaut: 3600)'
+        )
+
+    def handle(self, *args, **options):
+        out = Path(options['out']).resolve()
+        if options['token']:
+            self.sign_token(out, options)
+        else:
+            self.generate(out, options['alg'])
+
+    def generate(self, out, algorithm):
+        if algorithm == 'RS256':
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            private_key = ec.generate_private_key(ec.SECP256R1())
+
+        kid = uuid.uuid4().hex[:16]
+        public_jwk = json.loads(jwt.algorithms.get_default_algorithms()[algorithm].to_jwk(private_key.public_key()))
+        public_jwk.update({'kid': kid, 'alg': algorithm, 'use': 'sig'})
+
+        out.mkdir(parents=True, exist_ok=True)
+        (out / PRIVATE_KEY_FILE).write_bytes(private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+        (out / JWKS_FILE).write_text(json.dumps({'keys': [public_jwk]}, indent=2))
+
+        self.stdout.write(self.style.SUCCESS(f"[OK] Fixture JWKS {algorithm} (kid={kid}) dans {out}"))
+        self.stdout.write(f"   SUPABASE_JWKS_URL={(out / JWKS_FILE).as_uri()}")
+
+    def sign_token(self, out, options):
+        try:
+            private_key = serialization.load_pem_private_key((out / PRIVATE_KEY_FILE).read_bytes(), password=None)
+            public_jwk = json.loads((out / JWKS_FILE).read_text())['keys'][0]
+        except (OSError, KeyError, IndexError, ValueError) as e:
+            raise CommandError(f"Fixture introuvable dans {out} (lancer d'abord sans --token): {e}")
+
+        now = int(time.time())
+        token = jwt.encode(
+            {
+                'sub': options['token'],
+                'email': options['email'],
+                'role': 'authenticated',
+                'iat': now,
+                'exp': now + options['ttl'],
+            },
+            private_key,
+            algorithm=public_jwk['alg'],
+            headers={'kid': public_jwk['kid']},
+        )
+        self.stdout.write(token)
@@ -0,0 +1,41 @@
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from games.services_recommendations import active_user_ids, precompute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Pré-calcule les recommandations des utilisateurs actifs (à planifier, ex. cron toutes les heures)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Fenêtre d\'activité en jours (défaut: 7)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Nombre de recommandations stockées par utilisateur (défaut: 20)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=256,
+            help='Utilisateurs par produit matriciel (défaut: 256)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        user_ids = active_user_ids(days=options['days'])
+        self.stdout.write(f'Pre-calcul des recommandations pour {len(user_ids)} utilisateurs actifs...')
+
+        total = precompute_recommendations(user_ids, limit=options['limit'], batch_size=options['batch_size'])
+
+        # Les réponses en cache de /recommendations/ doivent relire les nouvelles lignes
+        cache.delete_many([f"recommendations_{user_id}" for user_id in user_ids])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'[OK] {total} utilisateurs traites en {elapsed:.1f}s'))
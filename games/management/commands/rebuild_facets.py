@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from games.services_facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = 'Recalcule entièrement la table facet_counts (après un import massif ou pour réparer une dérive)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recalcul des facettes du catalogue...')
+        total = rebuild_facet_counts()
+        self.stdout.write(self.style.SUCCESS(f'[OK] {total} compteurs de facettes recalcules'))
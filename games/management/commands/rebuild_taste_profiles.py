@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from games.models import UserGame
+from games.services_profiles import rebuild_user_profile
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les profils de goût utilisateur (après une régénération des embeddings de jeux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='UUID d\'un seul utilisateur à recalculer')
+
+    def handle(self, *args, **options):
+        if options.get('user'):
+            user_ids = [options['user']]
+        else:
+            user_ids = UserGame.objects.values_list('user_id', flat=True).distinct()
+
+        self.stdout.write('Recalcul des profils de goût...')
+        total = 0
+        for user_id in user_ids:
+            rebuild_user_profile(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'[OK] {total} profils recalcules'))
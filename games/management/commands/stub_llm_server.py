@@ -0,0 +1,117 @@
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """POST /v1/chat/completions au format OpenAI, avec ou sans stream=True."""
+
+    reply = ''
+    delay = 0.0
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _chunk(self, completion_id, delta, finish_reason=None):
+        return {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': 'stub',
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        question = next((m['content'] for m in reversed(body.get('messages', [])) if m.get('role') == 'user'), '')
+        answer = self.reply or f"Réponse de test à : {question}"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if not body.get('stream'):
+            payload = json.dumps({
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': 'stub',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': answer},
+                    'finish_reason': 'stop',
+                }],
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        chunks = [self._chunk(completion_id, {'role': 'assistant', 'content': ''})]
+        chunks += [
+            self._chunk(completion_id, {'content': word if i == 0 else ' ' + word})
+            for i, word in enumerate(answer.split(' '))
+        ]
+        chunks.append(self._chunk(completion_id, {}, finish_reason='stop'))
+        for chunk in chunks:
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+            if self.delay:
+                time.sleep(self.delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class Command(BaseCommand):
+    help = (
+        'Serveur LLM local compatible OpenAI pour les tests du chatbot '
+        '(LLM_BASE_URL=http://127.0.0.1:8001/v1)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8001,
+            help='Port d\'écoute (défaut: 8001)'
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.05,
+            help='Pause entre deux fragments streamés, en secondes (défaut: 0.05)'
+        )
+        parser.add_argument(
+            '--reply',
+            default='',
+            help='Réponse fixe (défaut: écho de la question)'
+        )
+
+    def handle(self, *args, **options):
+        handler = type('Handler', (StubLLMHandler,), {
+            'reply': options['reply'],
+            'delay': options['delay'],
+        })
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] Stub LLM sur http://127.0.0.1:{options['port']}/v1 (Ctrl+C pour arrêter)"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('\nArret du stub LLM')
+        finally:
+            server.server_close()
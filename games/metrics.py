@@ -0,0 +1,308 @@
+"""
+Métriques en mémoire du processus, exposées au format texte Prometheus
+(GET /metrics, voir metrics_view).
+
+- Par route (motif d'URL, pas le chemin) : durée de la requête, nombre de
+  requêtes SQL et temps SQL cumulé par requête HTTP (histogrammes).
+- Appels amont : durée des appels RAWG et LLM (histogrammes).
+- Caches applicatifs : compteurs hit / miss par famille de clés.
+
+Chaque worker a ses propres compteurs : Prometheus scrape chaque processus
+(ou agrège par instance). Le contexte de la requête en cours est porté par
+un contextvars.ContextVar, propagé par asgiref dans sync_to_async : les
+requêtes SQL exécutées dans un thread de la vue async sont bien comptées.
+"""
+
+import contextvars
+import hmac
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+import logging
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# -------------------------------
+# Types de métriques
+# -------------------------------
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (buckets Prometheus + _sum / _count)."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [compteurs par bucket (+Inf en dernier), somme, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def sum(self, *labels):
+        series = self._series.get(labels)
+        return series[1] if series else 0.0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, [('le', _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'gamesub_request_duration_seconds', 'Durée des requêtes HTTP par route',
+    ('route', 'method', 'status'),
+))
+REQUEST_DB_QUERIES = registry.register(Histogram(
+    'gamesub_request_db_queries', 'Nombre de requêtes SQL par requête HTTP',
+    ('route',), buckets=QUERY_COUNT_BUCKETS,
+))
+REQUEST_DB_DURATION = registry.register(Histogram(
+    'gamesub_request_db_duration_seconds', 'Temps SQL cumulé par requête HTTP',
+    ('route',), buckets=DB_TIME_BUCKETS,
+))
+UPSTREAM_DURATION = registry.register(Histogram(
+    'gamesub_upstream_duration_seconds', 'Durée des appels aux services amont (RAWG, LLM)',
+    ('service', 'operation', 'outcome'),
+))
+REQUEST_UPSTREAM_DURATION = registry.register(Histogram(
+    'gamesub_request_upstream_duration_seconds', 'Temps cumulé des appels amont par requête HTTP',
+    ('route',),
+))
+REQUEST_CACHE = registry.register(Counter(
+    'gamesub_request_cache_total', 'Lectures de cache applicatif par route et résultat',
+    ('route', 'result'),
+))
+CACHE_REQUESTS = registry.register(Counter(
+    'gamesub_cache_requests_total', 'Lectures des caches applicatifs par résultat',
+    ('cache', 'result'),
+))
+
+
+# -------------------------------
+# Contexte de la requête en cours
+# -------------------------------
+class RequestStats:
+    __slots__ = ('db_queries', 'db_time', 'cache_hits', 'cache_misses', 'upstream_time')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.upstream_time = 0.0
+
+
+_current = contextvars.ContextVar('gamesub_request_stats', default=None)
+
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def start_request():
+    """Nouvelles statistiques pour la requête ; retourne le jeton de reset."""
+    return _current.set(RequestStats())
+
+
+def finish_request(token, route, method, status, duration):
+    stats = _current.get()
+    _current.reset(token)
+    REQUEST_DURATION.observe(duration, route, method, str(status))
+    if stats is not None:
+        REQUEST_DB_QUERIES.observe(stats.db_queries, route)
+        REQUEST_DB_DURATION.observe(stats.db_time, route)
+        REQUEST_UPSTREAM_DURATION.observe(stats.upstream_time, route)
+        if stats.cache_hits:
+            REQUEST_CACHE.inc(route, 'hit', amount=stats.cache_hits)
+        if stats.cache_misses:
+            REQUEST_CACHE.inc(route, 'miss', amount=stats.cache_misses)
+    return stats
+
+
+def current_stats():
+    return _current.get()
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper : compte et chronomètre les requêtes SQL de la requête HTTP."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def install_db_wrapper(sender=None, connection=None, **kwargs):
+    """Récepteur de connection_created : chaque nouvelle connexion est instrumentée."""
+    if connection is not None and db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+# -------------------------------
+# Caches et services amont
+# -------------------------------
+_KEY_SUFFIX = re.compile(r'(_[0-9a-fA-F-]+)+$')
+
+
+def cache_family(key):
+    """'game_rec_12_5' -> 'game_rec', 'semantic_search_3fa2c1...' -> 'semantic_search'."""
+    return _KEY_SUFFIX.sub('', key) or key
+
+
+def record_cache(cache_name, hit):
+    CACHE_REQUESTS.inc(cache_name, 'hit' if hit else 'miss')
+    stats = _current.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def observe_upstream(service, operation, outcome, duration):
+    UPSTREAM_DURATION.observe(duration, service, operation, outcome)
+    stats = _current.get()
+    if stats is not None:
+        stats.upstream_time += duration
+
+
+@contextmanager
+def upstream_timer(service, operation):
+    """Chronomètre un appel amont (utilisable dans du code sync comme async)."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        observe_upstream(service, operation, outcome, time.perf_counter() - started)
+
+
+# -------------------------------
+# Endpoint
+# -------------------------------
+def metrics_authorized(request):
+    """
+    Jeton Bearer METRICS_TOKEN exigé (comparaison à temps constant).
+    Sans jeton configuré, l'endpoint n'est ouvert qu'en DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return settings.DEBUG
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode())
+
+
+def metrics_view(request):
+    """Métriques du processus au format texte Prometheus (voir metrics_authorized)."""
+    if not metrics_authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,213 @@
+# Normalisation des genres / plateformes / tags / stores en tables relationnelles indexées
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+TAXONOMIES = [
+    # (champ JSON de Game, modèle taxonomie, table de liaison, nom du FK)
+    ('genres', 'Genre', 'GameGenre', 'genre'),
+    ('platforms', 'Platform', 'GamePlatform', 'platform'),
+    ('tags', 'Tag', 'GameTag', 'tag'),
+    ('stores', 'Store', 'GameStore', 'store'),
+]
+
+
+def backfill_taxonomy(apps, schema_editor):
+    """Remplit les tables à partir des listes JSON existantes, par lots."""
+    Game = apps.get_model('games', 'Game')
+
+    for field, model_name, through_name, fk in TAXONOMIES:
+        Model = apps.get_model('games', model_name)
+        Through = apps.get_model('games', through_name)
+
+        # 1. Entrées de taxonomie distinctes
+        items = {}
+        for values in Game.objects.values_list(field, flat=True).iterator(chunk_size=2000):
+            for item in values or []:
+                if isinstance(item, dict) and item.get('id') is not None and item.get('name'):
+                    items.setdefault(item['id'], item['name'])
+
+        Model.objects.bulk_create(
+            [Model(external_id=ext_id, name=name[:100], slug=slugify(name)[:100]) for ext_id, name in items.items()],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        pk_by_external = dict(Model.objects.values_list('external_id', 'id'))
+
+        # 2. Liaisons jeu <-> entrée
+        links = []
+        for game_id, values in Game.objects.values_list('id', field).iterator(chunk_size=2000):
+            seen = set()
+            for item in values or []:
+                if not isinstance(item, dict):
+                    continue
+                pk = pk_by_external.get(item.get('id'))
+                if pk is None or pk in seen:
+                    continue
+                seen.add(pk)
+                link = Through(game_id=game_id, **{f'{fk}_id': pk})
+                if field == 'stores':
+                    link.url = item.get('url')
+                links.append(link)
+            if len(links) >= 5000:
+                Through.objects.bulk_create(links, ignore_conflicts=True)
+                links = []
+        if links:
+            Through.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0007_alter_substitution_unique_together_substitution_mode_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.IntegerField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+            ],
+            options={
+                'db_table': 'genres',
+                'indexes': [
+                    models.Index(fields=['name'], name='genres_name_idx'),
+                    models.Index(fields=['slug'], name='genres_slug_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='GameGenre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_genres', to='games.game')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_genres', to='games.genre')),
+            ],
+            options={
+                'db_table': 'game_genres',
+                'unique_together': {('game', 'genre')},
+                'indexes': [
+                    models.Index(fields=['genre', 'game'], name='game_genres_genre_game_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='games',
+            field=models.ManyToManyField(related_name='genre_set', through='games.GameGenre', to='games.game'),
+        ),
+        migrations.CreateModel(
+            name='Platform',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.IntegerField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+            ],
+            options={
+                'db_table': 'platforms',
+                'indexes': [
+                    models.Index(fields=['name'], name='platforms_name_idx'),
+                    models.Index(fields=['slug'], name='platforms_slug_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='GamePlatform',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_platforms', to='games.game')),
+                ('platform', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_platforms', to='games.platform')),
+            ],
+            options={
+                'db_table': 'game_platforms',
+                'unique_together': {('game', 'platform')},
+                'indexes': [
+                    models.Index(fields=['platform', 'game'], name='game_platforms_plat_game_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='platform',
+            name='games',
+            field=models.ManyToManyField(related_name='platform_set', through='games.GamePlatform', to='games.game'),
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.IntegerField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+            ],
+            options={
+                'db_table': 'tags',
+                'indexes': [
+                    models.Index(fields=['name'], name='tags_name_idx'),
+                    models.Index(fields=['slug'], name='tags_slug_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='GameTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_tags', to='games.game')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_tags', to='games.tag')),
+            ],
+            options={
+                'db_table': 'game_tags',
+                'unique_together': {('game', 'tag')},
+                'indexes': [
+                    models.Index(fields=['tag', 'game'], name='game_tags_tag_game_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='games',
+            field=models.ManyToManyField(related_name='tag_set', through='games.GameTag', to='games.game'),
+        ),
+        migrations.CreateModel(
+            name='Store',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.IntegerField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+            ],
+            options={
+                'db_table': 'stores',
+                'indexes': [
+                    models.Index(fields=['name'], name='stores_name_idx'),
+                    models.Index(fields=['slug'], name='stores_slug_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='GameStore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(blank=True, null=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_stores', to='games.game')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_stores', to='games.store')),
+            ],
+            options={
+                'db_table': 'game_stores',
+                'unique_together': {('game', 'store')},
+                'indexes': [
+                    models.Index(fields=['store', 'game'], name='game_stores_store_game_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='games',
+            field=models.ManyToManyField(related_name='store_set', through='games.GameStore', to='games.game'),
+        ),
+        migrations.RunPython(backfill_taxonomy, migrations.RunPython.noop),
+    ]
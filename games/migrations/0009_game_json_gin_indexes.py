@@ -0,0 +1,36 @@
+# Index GIN jsonb_path_ops sur les attributs JSON de Game (PostgreSQL uniquement)
+from django.db import migrations
+
+GIN_INDEXES = [
+    ('games_genres_gin_idx', 'genres'),
+    ('games_platforms_gin_idx', 'platforms'),
+    ('games_tags_gin_idx', 'tags'),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    # jsonb_path_ops : index plus compact, dédié aux requêtes de containment @>
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in GIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON games USING gin ({column} jsonb_path_ops)'
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0008_taxonomy_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:03
+
+from collections import Counter
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+# Dérivation des clés figée à la date de la migration (copie de services_facets.facet_keys_for)
+UNKNOWN_KEY = 'unknown'
+
+
+def _names(items, nested=None):
+    names = []
+    for item in items or []:
+        if nested and isinstance(item, dict) and isinstance(item.get(nested), dict):
+            item = item[nested]
+        if isinstance(item, dict) and item.get('name'):
+            names.append(item['name'])
+        elif isinstance(item, str) and item:
+            names.append(item)
+    return names
+
+
+def facet_keys_for(genres, platforms, released, rating):
+    keys = set()
+    for name in _names(genres):
+        keys.add(('genre', slugify(name)[:100], name[:100]))
+    for name in _names(platforms, nested='platform'):
+        keys.add(('platform', slugify(name)[:100], name[:100]))
+
+    year = released.year if hasattr(released, 'year') else (str(released)[:4] if released else None)
+    if year:
+        decade = (int(year) // 10) * 10
+        keys.add(('year', str(decade), f"{decade}-{decade + 9}"))
+    else:
+        keys.add(('year', UNKNOWN_KEY, 'Inconnue'))
+
+    if rating is None or rating <= 0:
+        keys.add(('rating', UNKNOWN_KEY, 'Non noté'))
+    else:
+        band = min(int(rating), 4)
+        keys.add(('rating', str(band), f"{band}-{band + 1}"))
+    return keys
+
+
+def populate_facet_counts(apps, schema_editor):
+    """Amorce facet_counts ; les signals prennent ensuite le relais."""
+    Game = apps.get_model('games', 'Game')
+    FacetCount = apps.get_model('games', 'FacetCount')
+
+    totals = Counter()
+    rows = Game.objects.values_list('genres', 'platforms', 'released', 'rating')
+    for genres, platforms, released, rating in rows.iterator(chunk_size=2000):
+        for key in facet_keys_for(genres, platforms, released, rating):
+            totals[key] += 1
+
+    FacetCount.objects.bulk_create(
+        [FacetCount(facet=f, key=k, label=l, count=n) for (f, k, l), n in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0009_game_json_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('genre', 'Genre'), ('platform', 'Plateforme'), ('year', 'Année de sortie'), ('rating', 'Note')], max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('label', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'facet_counts',
+                'unique_together': {('facet', 'key')},
+            },
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Index composites de la pagination keyset (games/pagination.py)
+from django.db import migrations, models
+
+
+def create_rating_index(apps, schema_editor):
+    # NULLS LAST : aligné sur l'ORDER BY du catalogue (non supporté par SQLite)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS games_rating_id_idx ON games (rating DESC NULLS LAST, id DESC)'
+    )
+
+
+def drop_rating_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS games_rating_id_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_facet_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rating_index, drop_rating_index),
+        migrations.AddIndex(
+            model_name='substitution',
+            index=models.Index(fields=['user_id', '-created_at', '-id'], name='substitutions_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usergame',
+            index=models.Index(fields=['user_id', '-created_at', '-id'], name='user_games_user_created_idx'),
+        ),
+    ]
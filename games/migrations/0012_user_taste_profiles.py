@@ -0,0 +1,92 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:10
+
+from django.db import migrations, models
+import numpy as np
+
+
+# Pondération figée à la date de la migration (copie de services_profiles)
+STATUS_WEIGHTS = {
+    'favorite': 2.0,
+    'library': 1.0,
+    'played': 1.0,
+    'wishlist': 0.5,
+}
+
+
+def user_game_weight(status, rating=None):
+    weight = STATUS_WEIGHTS.get(status, 0.0)
+    if rating:
+        weight *= 0.5 + rating / 10
+    return weight
+
+
+def as_vector(embedding):
+    if embedding is None:
+        return None
+    vector = np.asarray(embedding, dtype=np.float64)
+    return vector if vector.size else None
+
+
+def populate_taste_profiles(apps, schema_editor):
+    """Amorce user_taste_profiles ; les signals de UserGame prennent ensuite le relais."""
+    UserGame = apps.get_model('games', 'UserGame')
+    UserTasteProfile = apps.get_model('games', 'UserTasteProfile')
+
+    profiles = {}
+    rows = UserGame.objects.values_list('user_id', 'status', 'rating', 'game__embedding')
+    for user_id, status, rating, embedding in rows.iterator(chunk_size=2000):
+        vector = as_vector(embedding)
+        weight = user_game_weight(status, rating)
+        if vector is None or not weight:
+            continue
+        total, weight_total, count = profiles.get(user_id, (0, 0.0, 0))
+        profiles[user_id] = (total + weight * vector, weight_total + weight, count + 1)
+
+    UserTasteProfile.objects.bulk_create(
+        [
+            UserTasteProfile(user_id=user_id, vector_sum=total.tolist(), weight_total=weight_total, games_count=count)
+            for user_id, (total, weight_total, count) in profiles.items()
+        ],
+        batch_size=500,
+    )
+
+
+def create_embedding_ann_index(apps, schema_editor):
+    # Index HNSW (pgvector) : ORDER BY embedding <=> profil LIMIT n sans parcours complet
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS games_embedding_hnsw_idx ON games USING hnsw (embedding vector_cosine_ops)'
+    )
+
+
+def drop_embedding_ann_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS games_embedding_hnsw_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0011_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTasteProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.UUIDField(unique=True)),
+                ('vector_sum', models.JSONField(blank=True, default=list)),
+                ('weight_total', models.FloatField(default=0.0)),
+                ('games_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'user_taste_profiles',
+            },
+        ),
+        migrations.RunPython(populate_taste_profiles, migrations.RunPython.noop),
+        migrations.RunPython(create_embedding_ann_index, drop_embedding_ann_index),
+    ]
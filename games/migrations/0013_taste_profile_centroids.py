@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0012_user_taste_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertasteprofile',
+            name='centroid_weights',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='usertasteprofile',
+            name='centroids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='usertasteprofile',
+            name='centroids_stale',
+            field=models.BooleanField(default=True),
+        ),
+    ]
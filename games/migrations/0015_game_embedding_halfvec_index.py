@@ -0,0 +1,42 @@
+# Index HNSW sur embedding::halfvec(384) (PostgreSQL, pgvector >= 0.7)
+# Utilisé quand EMBEDDING_QUANTIZATION = float16 / int8 : recherche de candidats
+# sur demi-précision (index 2x plus petit), puis re-score sur la colonne float32.
+from django.db import migrations
+
+INDEX_NAME = 'games_embedding_halfvec_idx'
+
+
+def _supports_halfvec(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+    if not row:
+        return False
+    major, minor = (int(part) for part in row[0].split('.')[:2])
+    return (major, minor) >= (0, 7)
+
+
+def create_halfvec_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql' or not _supports_halfvec(schema_editor):
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON games '
+        f'USING hnsw ((embedding::halfvec(384)) halfvec_cosine_ops)'
+    )
+
+
+def drop_halfvec_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0014_user_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_halfvec_index, drop_halfvec_index),
+    ]
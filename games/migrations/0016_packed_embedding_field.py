@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:23
+
+import games.fields
+from django.db import migrations
+
+
+def pack_embeddings(apps, schema_editor):
+    """
+    Hors PostgreSQL : convertit les embeddings texte ('[0.1, ...]', JSON ou
+    pgvector) en BLOB float32 little-endian. PostgreSQL garde sa colonne vector.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    from games.fields import pack_vector, parse_vector_text
+
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT id, embedding FROM games WHERE embedding IS NOT NULL')
+        rows = [(game_id, value) for game_id, value in cursor.fetchall() if isinstance(value, str)]
+        for start in range(0, len(rows), 1000):
+            cursor.executemany(
+                'UPDATE games SET embedding = %s WHERE id = %s',
+                [
+                    (connection.Database.Binary(pack_vector(parse_vector_text(value))), game_id)
+                    for game_id, value in rows[start:start + 1000]
+                ],
+            )
+
+
+def unpack_embeddings(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    from games.fields import unpack_vector
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT id, embedding FROM games WHERE embedding IS NOT NULL')
+        rows = [(game_id, value) for game_id, value in cursor.fetchall() if isinstance(value, (bytes, memoryview))]
+        cursor.executemany(
+            'UPDATE games SET embedding = %s WHERE id = %s',
+            [('[' + ','.join(str(float(v)) for v in unpack_vector(value)) + ']', game_id) for game_id, value in rows],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0015_game_embedding_halfvec_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='embedding',
+            field=games.fields.PackedVectorField(blank=True, dimensions=384, null=True),
+        ),
+        migrations.RunPython(pack_embeddings, unpack_embeddings),
+    ]
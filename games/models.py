@@ -1,12 +1,10 @@
+import importlib.util
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
-try:
-    from pgvector.django import VectorField  # PostgreSQL uniquement
-    HAS_PGVECTOR = True
-except ImportError:
-    HAS_PGVECTOR = False
-    # Fallback pour SQLite - utiliser JSONField
-    VectorField = models.JSONField
+from .fields import PackedVectorField
+
+# pgvector : PostgreSQL uniquement (opérateurs, index) ; importé là où il sert
+HAS_PGVECTOR = importlib.util.find_spec('pgvector') is not None
 
 
 class QualityGameManager(models.Manager):
@@ -32,8 +30,8 @@ class Game(models.Model):
     tags = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    # Embedding vector - utilise pgvector si disponible, sinon JSONField
-    embedding = VectorField(dimensions=384, null=True) if HAS_PGVECTOR else models.JSONField(null=True, blank=True)
+    # Embedding vector - pgvector sur PostgreSQL, float32 binaire (BLOB) sur les autres bases
+    embedding = PackedVectorField(dimensions=384, null=True, blank=True)
 
     # Managers
     objects = models.Manager()  # Manager par défaut (inclut tous les jeux)
@@ -45,11 +43,153 @@ class Game(models.Model):
             models.Index(fields=['rating'], name='games_rating_idx'),
             models.Index(fields=['external_id'], name='games_external_id_idx'),
         ]
+        # games_rating_id_idx (rating DESC NULLS LAST, id DESC) : pagination keyset,
+        # créé en SQL par la migration 0011 (PostgreSQL uniquement)
 
     def __str__(self):
         return self.name
 
 
+# -------------------------------
+# Taxonomie normalisée (genres, plateformes, tags, stores)
+# -------------------------------
+# Les listes JSON de Game restent la source d'affichage ; ces tables
+# relationnelles indexées servent au filtrage et aux comptages.
+
+class TaxonomyItem(models.Model):
+    external_id = models.IntegerField(unique=True)  # ID RAWG
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+
+class Genre(TaxonomyItem):
+    games = models.ManyToManyField(Game, through='GameGenre', related_name='genre_set')
+
+    class Meta:
+        db_table = 'genres'
+        indexes = [
+            models.Index(fields=['name'], name='genres_name_idx'),
+            models.Index(fields=['slug'], name='genres_slug_idx'),
+        ]
+
+
+class Platform(TaxonomyItem):
+    games = models.ManyToManyField(Game, through='GamePlatform', related_name='platform_set')
+
+    class Meta:
+        db_table = 'platforms'
+        indexes = [
+            models.Index(fields=['name'], name='platforms_name_idx'),
+            models.Index(fields=['slug'], name='platforms_slug_idx'),
+        ]
+
+
+class Tag(TaxonomyItem):
+    games = models.ManyToManyField(Game, through='GameTag', related_name='tag_set')
+
+    class Meta:
+        db_table = 'tags'
+        indexes = [
+            models.Index(fields=['name'], name='tags_name_idx'),
+            models.Index(fields=['slug'], name='tags_slug_idx'),
+        ]
+
+
+class Store(TaxonomyItem):
+    games = models.ManyToManyField(Game, through='GameStore', related_name='store_set')
+
+    class Meta:
+        db_table = 'stores'
+        indexes = [
+            models.Index(fields=['name'], name='stores_name_idx'),
+            models.Index(fields=['slug'], name='stores_slug_idx'),
+        ]
+
+
+class GameGenre(models.Model):
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='game_genres')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='game_genres')
+
+    class Meta:
+        db_table = 'game_genres'
+        unique_together = ('game', 'genre')
+        # (genre, game) : filtrage par genre et comptages en index-only scan
+        indexes = [
+            models.Index(fields=['genre', 'game'], name='game_genres_genre_game_idx'),
+        ]
+
+
+class GamePlatform(models.Model):
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='game_platforms')
+    platform = models.ForeignKey(Platform, on_delete=models.CASCADE, related_name='game_platforms')
+
+    class Meta:
+        db_table = 'game_platforms'
+        unique_together = ('game', 'platform')
+        indexes = [
+            models.Index(fields=['platform', 'game'], name='game_platforms_plat_game_idx'),
+        ]
+
+
+class GameTag(models.Model):
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='game_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='game_tags')
+
+    class Meta:
+        db_table = 'game_tags'
+        unique_together = ('game', 'tag')
+        indexes = [
+            models.Index(fields=['tag', 'game'], name='game_tags_tag_game_idx'),
+        ]
+
+
+class GameStore(models.Model):
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='game_stores')
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='game_stores')
+    url = models.URLField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'game_stores'
+        unique_together = ('game', 'store')
+        indexes = [
+            models.Index(fields=['store', 'game'], name='game_stores_store_game_idx'),
+        ]
+
+
+class FacetCount(models.Model):
+    """Compteurs de facettes du catalogue, maintenus incrémentalement (signals)."""
+    GENRE = 'genre'
+    PLATFORM = 'platform'
+    YEAR = 'year'
+    RATING = 'rating'
+
+    FACET_CHOICES = [
+        (GENRE, 'Genre'),
+        (PLATFORM, 'Plateforme'),
+        (YEAR, 'Année de sortie'),
+        (RATING, 'Note'),
+    ]
+
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES)
+    key = models.CharField(max_length=100)  # slug ou borne du bucket
+    label = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'facet_counts'
+        unique_together = ('facet', 'key')
+
+    def __str__(self):
+        return f"{self.facet}:{self.label} ({self.count})"
+
+
 class Substitution(models.Model):
     MODE_CHOICES = [
         ("user", "Basée sur l’utilisateur"),
@@ -76,6 +216,10 @@ class Substitution(models.Model):
     class Meta:
         db_table = 'substitutions'
         unique_together = ('user_id', 'source_game', 'substitute_game', 'mode') 
+        indexes = [
+            # Pagination keyset de "Mes substituts"
+            models.Index(fields=['user_id', '-created_at', '-id'], name='substitutions_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.mode}] {self.source_game.name} -> {self.substitute_game.name} ({self.status})"
@@ -109,11 +253,54 @@ class UserGame(models.Model):
     class Meta:
         db_table = 'user_games'
         unique_together = ('user_id', 'game')
+        indexes = [
+            # Pagination keyset de la bibliothèque
+            models.Index(fields=['user_id', '-created_at', '-id'], name='user_games_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"User {self.user_id} - {self.game.name} ({self.status})"
 
 
+class UserTasteProfile(models.Model):
+    """
+    Profil de goût d'un utilisateur : somme pondérée des embeddings de ses jeux,
+    maintenue incrémentalement à chaque écriture de UserGame (voir signals.py).
+    Le vecteur du profil est vector_sum / weight_total ; les centroïdes (k-means
+    sur la bibliothèque) représentent chacun un « goût » distinct de l'utilisateur.
+    """
+    user_id = models.UUIDField(unique=True)  # UUID de l'utilisateur Supabase
+    vector_sum = models.JSONField(default=list, blank=True)
+    weight_total = models.FloatField(default=0.0)
+    games_count = models.IntegerField(default=0)
+    centroids = models.JSONField(default=list, blank=True)  # [[...], ...] vecteurs normalisés
+    centroid_weights = models.JSONField(default=list, blank=True)  # poids cumulé de chaque cluster
+    centroids_stale = models.BooleanField(default=True)  # à recalculer à la prochaine lecture
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_taste_profiles'
+
+    def __str__(self):
+        return f"Taste profile {self.user_id} ({self.games_count} jeux)"
+
+
+class UserRecommendation(models.Model):
+    """Recommandations pré-calculées par le job precompute_recommendations."""
+    user_id = models.UUIDField()  # UUID de l'utilisateur Supabase
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='precomputed_recommendations')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'user_recommendations'
+        unique_together = ('user_id', 'rank')
+
+    def __str__(self):
+        return f"User {self.user_id} #{self.rank} {self.game_id} ({self.score:.3f})"
+
+
 class SearchHistory(models.Model):
     user_id = models.UUIDField()  # UUID de l'utilisateur Supabase
     query = models.CharField(max_length=255)
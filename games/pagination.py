@@ -0,0 +1,180 @@
+"""
+Pagination par curseur (keyset) sur des clés composites stables.
+
+Chaque page est une requête « WHERE (clé) après le curseur ORDER BY clé
+LIMIT n » servie par un index composite : la page 500 coûte autant que la
+page 1, sans COUNT(*) ni OFFSET. Le total renvoyé est approximatif : un
+COUNT(*) mis en cache séparément.
+
+Opt-in par vue via ``pagination_class``. Les clients qui envoient encore
+``?page=N`` retombent sur la pagination par numéro de page.
+"""
+
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from decouple import config
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError as InvalidParameter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # Champs de tri ; le dernier doit être unique (ex. id) pour un ordre total
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    count_cache_timeout = config('CACHE_TTL_COUNTS', default=300, cast=int)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy = None
+        if request.query_params.get(PageNumberPagination.page_query_param):
+            # Compatibilité ?page=N
+            self.legacy = PageNumberPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        self.fields = [self._parse_field(queryset.model, f) for f in self.ordering]
+        self.model_fields = [queryset.model._meta.get_field(name) for name, _, _ in self.fields]
+        self.count = self.get_approximate_count(queryset)
+
+        queryset = queryset.order_by(*self._order_by())
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self._after(cursor))
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', None),  # défilement infini : avance uniquement
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # -------------------------------
+    # Curseur
+    # -------------------------------
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        values = [self._serialize(getattr(last, name)) for name, _, _ in self.fields]
+        token = base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        except (TypeError, ValueError):
+            raise self.invalid_cursor()
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise self.invalid_cursor()
+        # Valeurs typées par les champs de tri : un curseur forgé donne 400, pas 500
+        try:
+            return [
+                None if value is None else field.to_python(value)
+                for field, value in zip(self.model_fields, values)
+            ]
+        except (ValidationError, ValueError, TypeError):
+            raise self.invalid_cursor()
+
+    def invalid_cursor(self):
+        return InvalidParameter({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    @staticmethod
+    def _serialize(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    # -------------------------------
+    # Clé composite
+    # -------------------------------
+    @staticmethod
+    def _parse_field(model, field):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        return name, descending, model._meta.get_field(name).null
+
+    def _order_by(self):
+        # NULLS LAST explicite : même ordre sur PostgreSQL et SQLite, et aligné sur les index
+        return [
+            F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+            for name, descending, _ in self.fields
+        ]
+
+    def _after(self, cursor):
+        """
+        Prédicat « strictement après le curseur » pour un tri lexicographique :
+        (a < va) OR (a = va AND b < vb) OR ... avec les NULL en fin de tri.
+        """
+        condition = Q()
+        prefix = Q()
+        for (name, descending, nullable), value in zip(self.fields, cursor):
+            if value is None:
+                # Rien ne suit NULL sur ce champ : on ne peut qu'égaler le préfixe
+                prefix &= Q(**{f'{name}__isnull': True})
+                continue
+            after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            if nullable:
+                after |= Q(**{f'{name}__isnull': True})
+            condition |= prefix & after
+            prefix &= Q(**{name: value})
+        return condition if condition else Q(pk__in=[])
+
+    # -------------------------------
+    # Total approximatif
+    # -------------------------------
+    def get_approximate_count(self, queryset):
+        """COUNT(*) mis en cache par requête : au plus un comptage par TTL."""
+        sql = str(queryset.order_by().query)
+        cache_key = f"cnt_{hashlib.md5(sql.encode()).hexdigest()[:16]}"
+        count = cache.get(cache_key)
+        if count is None:
+            count = queryset.order_by().count()
+            cache.set(cache_key, count, self.count_cache_timeout)
+        return count
+
+
+class GameKeysetPagination(KeysetPagination):
+    """Catalogue trié par note : index games_rating_id_idx."""
+    ordering = ('-rating', '-id')
+
+
+class CreatedKeysetPagination(KeysetPagination):
+    """Listes utilisateur triées par date : index (user_id, created_at, id)."""
+    ordering = ('-created_at', '-id')
@@ -1,6 +1,23 @@
+import logging
 import numpy as np
-from django.db.models import F
-from .models import Game, UserGame
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Cast
+from .models import Game, UserGame, HAS_PGVECTOR
+from .services_profiles import get_profile_centroids
+from .services_vectors import (
+    EMBEDDING_DIM, FLOAT32, get_catalog_matrix, normalize_rows, quantization_mode, rescore, rescore_factor,
+    score_top_k,
+)
+
+if HAS_PGVECTOR:
+    from pgvector import HalfVector
+    from pgvector.django import CosineDistance, HalfVectorField
+
+logger = logging.getLogger(__name__)
+
+# Sur-échantillonnage par centroïde avant fusion (doublons entre clusters)
+CANDIDATES_FACTOR = 2
 
 
 def recommend_games_for_game(game_id, top_n=5):
@@ -8,93 +25,148 @@ def recommend_games_for_game(game_id, top_n=5):
     try:
         source_game = Game.objects.get(id=game_id)
     except Game.DoesNotExist:
-        print(f"[ERROR] Jeu avec ID {game_id} non trouvé")
+        logger.warning("Jeu introuvable pour les recommandations", extra={'game_id': game_id})
         return []
 
     if source_game.embedding is None:
-        print(f"[WARNING] Pas d'embedding pour le jeu {source_game.name}")
+        logger.warning("Pas d'embedding pour le jeu source", extra={'game_id': game_id})
         return []
 
-    print(f"[INFO] Generation de recommandations basees sur {source_game.name}")
-    
-    source_emb = np.array(source_game.embedding)
-
-    # Récupère tous les autres jeux qui ont un embedding
-    candidates = Game.objects.exclude(id=source_game.id).exclude(embedding=None)
-    print(f"[INFO] {candidates.count()} jeux candidats trouves")
-
-    def cosine_similarity(a, b):
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-    # Calcul des similarités
-    similarities = [
-        (g, cosine_similarity(source_emb, np.array(g.embedding)))
-        for g in candidates
-    ]
-
-    # Trie par score de similarité décroissant
-    similarities.sort(key=lambda x: x[1], reverse=True)
+    # Score vectorisé sur la matrice du catalogue, puis seuls les top_n jeux sont chargés
+    catalog = get_catalog_matrix()
+    winners = score_top_k(source_game.embedding, top_n, exclude_ids=[source_game.id], catalog=catalog)[0]
 
     # Retourne les jeux
-    recommended_games = [g for g, sim in similarities[:top_n]]
-    
-    print(f"[SUCCESS] {len(recommended_games)} recommandations generees pour {source_game.name}")
-    for i, game in enumerate(recommended_games, 1):
-        print(f"  {i}. {game.name}")
-
+    recommended_games = hydrate_games(game_id for game_id, _ in winners)
+
+    logger.info("Recommandations par jeu générées", extra={
+        'event': 'recommendations.game',
+        'source_game_id': source_game.id,
+        'candidates': len(catalog),
+        'game_ids': [game.id for game in recommended_games],
+        'sampled': True,
+    })
     return recommended_games
 
 
-def recommend_by_library_and_fav(user, top_n=8):
+def recommend_by_library_and_fav(user, top_n=8, library=None):
     """
     👤 RECOMMANDATIONS BASÉES SUR LA BIBLIOTHÈQUE UTILISATEUR
     
     Utilisé par: GET /api/substitutes_library_fav/
-    Recommande des jeux basés sur TOUTE la bibliothèque de l'utilisateur.
+    Recommande des jeux basés sur TOUTE la bibliothèque de l'utilisateur, via son
+    profil de goût pré-calculé (UserTasteProfile) : une lecture de vecteur + une requête ANN.
+    `library` : UserGame déjà chargés (select_related('game')) pour éviter une seconde requête.
     """
-    favorites = UserGame.objects.filter(user_id=user, status__in=['library', 'favorite']).select_related('game')
+    # Profil utilisateur : k centroïdes (un par « goût »), maintenus par signals
+    centroids = get_profile_centroids(user)
 
-    # Filter valid embeddings
-    fav_embeddings = [
-        f.game.embedding
-        for f in favorites
-        if f.game.embedding is not None and hasattr(f.game.embedding, 'size') and f.game.embedding.size > 0
-    ]
-
-    if not fav_embeddings:
-        print(f"[WARNING] Aucun jeu avec embedding trouve dans la bibliotheque de l'utilisateur {user}")
+    if not centroids:
+        logger.info("Aucun jeu avec embedding dans la bibliothèque", extra={'user_id': user, 'sampled': True})
         return []
 
-    print(f"[INFO] {len(fav_embeddings)} jeux trouves dans la bibliotheque avec embeddings")
-    
-    # Afficher les jeux de la bibliothèque
-    for fav in favorites[:5]:  # Affiche les 5 premiers
-        print(f"  [LIB] {fav.game.name}")
-
-    # Convert to NumPy array
-    fav_embeddings = np.array(fav_embeddings)
-
-    # Compute mean embedding (profil utilisateur)
-    user_profile = np.mean(fav_embeddings, axis=0)
-
-    # Get all games (sauf ceux déjà dans la bibliothèque)
-    excluded_ids = [f.game.id for f in favorites]
-    games = Game.objects.exclude(id__in=excluded_ids).exclude(embedding=None)
+    if library is not None:
+        excluded_ids = [f.game_id for f in library]
+    else:
+        # Sous-requête : l'exclusion reste dans la requête ANN
+        excluded_ids = UserGame.objects.filter(
+            user_id=user, status__in=['library', 'favorite']
+        ).values('game_id')
+
+    # Get all games (sauf ceux déjà dans la bibliothèque) : une requête ANN par centroïde, fusionnées
+    recommended_games = nearest_games_multi(centroids, excluded_ids, top_n)
+
+    logger.info("Recommandations par profil générées", extra={
+        'event': 'recommendations.library',
+        'user_id': user,
+        'centroids': len(centroids),
+        'game_ids': [game.id for game in recommended_games],
+        'sampled': True,
+    })
+    return recommended_games
 
-    def cosine_similarity(a, b):
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
-    similarities = [
-        (g, cosine_similarity(user_profile, np.array(g.embedding)))
-        for g in games if g.embedding is not None
-    ]
+def cluster_quotas(weights, top_n):
+    """Répartit top_n entre les centroïdes au prorata de leur poids (au moins 1 chacun)."""
+    weights = np.asarray(weights, dtype=np.float64)
+    shares = weights / weights.sum() * top_n
+    quotas = np.maximum(np.floor(shares).astype(int), 1)
+    # Plus forts restes pour compléter jusqu'à top_n
+    for i in np.argsort(-(shares - np.floor(shares))):
+        if quotas.sum() >= top_n:
+            break
+        quotas[i] += 1
+    return quotas.tolist()
 
-    # Sort by similarity descending and take top_n
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    recommended_games = [g for g, sim in similarities[:top_n]]
 
-    print(f"[SUCCESS] {len(recommended_games)} recommandations generees basees sur le profil utilisateur")
-    for i, game in enumerate(recommended_games, 1):
-        print(f"  {i}. {game.name}")
-    
-    return recommended_games
\ No newline at end of file
+def nearest_games_multi(centroids, excluded_ids, top_n):
+    """
+    Recherche ANN multi-centroïdes : chaque centroïde récupère un petit lot de
+    voisins, puis les listes sont fusionnées au prorata du poids des clusters.
+    PostgreSQL : un seul aller-retour (UNION ALL de k requêtes ORDER BY <=> LIMIT m).
+    Autres bases : un produit matriciel catalogue (en mémoire) x centroïdes.
+    """
+    vectors = [vector for vector, _ in centroids]
+    quotas = cluster_quotas([weight for _, weight in centroids], top_n)
+    per_cluster = max(quotas) * CANDIDATES_FACTOR
+
+    if HAS_PGVECTOR and 'postgresql' in connection.vendor:
+        games = Game.objects.exclude(id__in=excluded_ids).exclude(embedding=None)
+        quantized = quantization_mode() != FLOAT32
+        pool = per_cluster * rescore_factor() if quantized else per_cluster
+        branches = [
+            games.annotate(cluster=Value(i), distance=_cosine_distance(vector, quantized))
+            .order_by('distance')
+            .values_list('id', 'cluster', 'distance')[:pool]
+            for i, vector in enumerate(vectors)
+        ]
+        rows = branches[0].union(*branches[1:], all=True) if len(branches) > 1 else branches[0]
+        ranked = [[] for _ in vectors]
+        for game_id, cluster, distance in sorted(rows, key=lambda r: r[2]):
+            ranked[cluster].append((game_id, 1.0 - distance))
+        if quantized:
+            # Candidats trouvés sur halfvec : re-score en pleine précision
+            ranked = rescore(normalize_rows(np.vstack(vectors)), ranked, per_cluster)
+    else:
+        # Un produit matriciel catalogue x centroïdes, top-k par centroïde
+        if not isinstance(excluded_ids, (list, tuple, set)):
+            excluded_ids = list(excluded_ids.values_list('game_id', flat=True))
+        ranked = score_top_k(np.vstack(vectors), per_cluster, exclude_ids=excluded_ids)
+
+    # Fusion : chaque cluster place ses meilleurs jeux selon son quota, sans doublons
+    chosen = []
+    for cluster, quota in enumerate(quotas):
+        taken = 0
+        for game_id, _ in ranked[cluster]:
+            if taken >= quota:
+                break
+            if game_id not in chosen:
+                chosen.append(game_id)
+                taken += 1
+    # Complète avec les meilleurs restants (cluster trop petit, doublons)
+    leftovers = sorted(
+        (item for cluster in ranked for item in cluster if item[0] not in chosen),
+        key=lambda item: -item[1],
+    )
+    for game_id, _ in leftovers:
+        if len(chosen) >= top_n:
+            break
+        if game_id not in chosen:
+            chosen.append(game_id)
+
+    return hydrate_games(chosen[:top_n])
+
+
+def _cosine_distance(vector, quantized):
+    """embedding <=> vecteur ; sur halfvec (index games_embedding_halfvec_idx) si quantifié."""
+    vector = list(map(float, vector))
+    if quantized:
+        return CosineDistance(Cast('embedding', HalfVectorField(dimensions=EMBEDDING_DIM)), HalfVector(vector))
+    return CosineDistance('embedding', vector)
+
+
+def hydrate_games(game_ids):
+    """Charge uniquement les jeux gagnants (un in_bulk) en conservant l'ordre du classement."""
+    game_ids = list(game_ids)
+    by_id = Game.objects.in_bulk(game_ids)
+    return [by_id[game_id] for game_id in game_ids if game_id in by_id]
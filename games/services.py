@@ -1,12 +1,66 @@
+import asyncio
+import re
+import weakref
+import httpx
 import requests
 from django.conf import settings
 from django.utils.text import slugify
+from .metrics import upstream_timer
 from .models import Game
 import logging
 
 
 logger = logging.getLogger(__name__)
 
+RAWG_TIMEOUT = 10  # secondes
+
+
+def rawg_operation(endpoint):
+    """Endpoint RAWG sans identifiants, pour les métriques : 'games/3498/suggested' -> 'games/{id}/suggested'."""
+    return re.sub(r'/[^/]*\d[^/]*', '/{id}', endpoint)
+
+
+def search_params(query, page=1, page_size=20, genres=None, platforms=None, dates=None, rating=None, ordering=None):
+    params = {
+        'search': query,
+        'page': page,
+        'page_size': page_size,
+    }
+    
+    if genres:
+        params['genres'] = genres
+    if platforms:
+        params['platforms'] = platforms
+    if dates:
+        params['dates'] = dates
+    if rating:
+        # RAWG API utilise "rating" pour filtrer par note minimale
+        params['rating'] = rating
+    if ordering:
+        # RAWG API utilise "ordering" pour trier les résultats
+        params['ordering'] = ordering
+    return params
+
+
+def game_defaults(game_data):
+    """Champs d'un Game à partir d'un résultat RAWG."""
+    return {
+        'name': game_data.get('name', ''),
+        'slug': game_data.get('slug', slugify(game_data.get('name', ''))),
+        'description': game_data.get('description_raw', ''),
+        'released': game_data.get('released'),
+        'rating': game_data.get('rating'),
+        'metacritic': game_data.get('metacritic'),
+        'playtime': game_data.get('playtime'),
+        'esrb_rating': game_data.get('esrb_rating', {}).get('name') if game_data.get('esrb_rating') else None,
+        'background_image': game_data.get('background_image'),
+        'website': game_data.get('website'),
+        'genres': [{'id': g['id'], 'name': g['name']} for g in game_data.get('genres', []) if g and 'id' in g and 'name' in g],
+        'platforms': [{'id': p['platform']['id'], 'name': p['platform']['name']} for p in game_data.get('platforms', []) if p and 'platform' in p],
+        'stores': [{'id': s['store']['id'], 'name': s['store']['name'], 'url': s.get('url')} for s in game_data.get('stores', []) if s and 'store' in s],
+        'tags': [{'id': t['id'], 'name': t['name']} for t in game_data.get('tags', []) if t and 'id' in t and 'name' in t]
+    }
+
 
 class RAWGAPIService:
     def __init__(self):
@@ -21,33 +75,16 @@ class RAWGAPIService:
         params['key'] = self.api_key
         
         try:
-            response = requests.get(f"{self.base_url}/{endpoint}", params=params)
-            response.raise_for_status()
+            with upstream_timer('rawg', rawg_operation(endpoint)):
+                response = requests.get(f"{self.base_url}/{endpoint}", params=params)
+                response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"RAWG API error: {e}")
             return None
 
     def search_games(self, query, page=1, page_size=20, genres=None, platforms=None, dates=None, rating=None, ordering=None):
-        params = {
-            'search': query,
-            'page': page,
-            'page_size': page_size,
-        }
-        
-        if genres:
-            params['genres'] = genres
-        if platforms:
-            params['platforms'] = platforms
-        if dates:
-            params['dates'] = dates
-        if rating:
-            # RAWG API utilise "rating" pour filtrer par note minimale
-            params['rating'] = rating
-        if ordering:
-            # RAWG API utilise "ordering" pour trier les résultats
-            params['ordering'] = ordering
-            
+        params = search_params(query, page, page_size, genres, platforms, dates, rating, ordering)
         return self._make_request('games', params)
 
     def search_games_raw(self, params):
@@ -75,22 +112,7 @@ class RAWGAPIService:
                 
             game, created = Game.objects.get_or_create(
                 external_id=game_data['id'],
-                defaults={
-                    'name': game_data.get('name', ''),
-                    'slug': game_data.get('slug', slugify(game_data.get('name', ''))),
-                    'description': game_data.get('description_raw', ''),
-                    'released': game_data.get('released'),
-                    'rating': game_data.get('rating'),
-                    'metacritic': game_data.get('metacritic'),
-                    'playtime': game_data.get('playtime'),
-                    'esrb_rating': game_data.get('esrb_rating', {}).get('name') if game_data.get('esrb_rating') else None,
-                    'background_image': game_data.get('background_image'),
-                    'website': game_data.get('website'),
-                    'genres': [{'id': g['id'], 'name': g['name']} for g in game_data.get('genres', []) if g and 'id' in g and 'name' in g],
-                    'platforms': [{'id': p['platform']['id'], 'name': p['platform']['name']} for p in game_data.get('platforms', []) if p and 'platform' in p],
-                    'stores': [{'id': s['store']['id'], 'name': s['store']['name'], 'url': s.get('url')} for s in game_data.get('stores', []) if s and 'store' in s],
-                    'tags': [{'id': t['id'], 'name': t['name']} for t in game_data.get('tags', []) if t and 'id' in t and 'name' in t]
-                }
+                defaults=game_defaults(game_data)
             )
             return game
         except Exception as e:
@@ -134,4 +156,66 @@ class RAWGAPIService:
             playtime_similarity = max(0, 1 - (playtime_diff / max(source_game.playtime, substitute_game.playtime)))
             score += playtime_similarity * 0.1
         
-        return min(1.0, score)
\ No newline at end of file
+        return min(1.0, score)
+
+
+# Un client httpx (pool de connexions keep-alive) par boucle d'événements :
+# sous ASGI une seule boucle, donc un seul pool partagé par toutes les requêtes.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=RAWG_TIMEOUT,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+class AsyncRAWGAPIService:
+    """
+    Équivalent asynchrone de RAWGAPIService pour les vues ASGI (views_async.py) :
+    l'attente de RAWG ne bloque aucun thread.
+    """
+
+    def __init__(self):
+        self.api_key = settings.RAWG_API_KEY
+        self.base_url = settings.RAWG_BASE_URL
+
+    async def _make_request(self, endpoint, params=None):
+        params = dict(params or {})
+        params['key'] = self.api_key
+        
+        try:
+            with upstream_timer('rawg', rawg_operation(endpoint)):
+                response = await get_async_http_client().get(f"{self.base_url}/{endpoint}", params=params)
+                response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"RAWG API error: {e}")
+            return None
+
+    async def search_games(self, query, page=1, page_size=20, genres=None, platforms=None, dates=None, rating=None, ordering=None):
+        params = search_params(query, page, page_size, genres, platforms, dates, rating, ordering)
+        return await self._make_request('games', params)
+
+    async def get_game_details(self, game_id):
+        return await self._make_request(f'games/{game_id}')
+
+    async def save_game_to_db(self, game_data):
+        try:
+            if not game_data or 'id' not in game_data:
+                logger.error("Invalid game data: missing id")
+                return None
+            game, created = await Game.objects.aget_or_create(
+                external_id=game_data['id'],
+                defaults=game_defaults(game_data)
+            )
+            return game
+        except Exception as e:
+            logger.error(f"Error saving game to database: {e}")
+            return None
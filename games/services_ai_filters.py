@@ -169,7 +169,7 @@ def enhance_query_with_ai_filters(query: str, ai_filters: Dict[str, str]) -> str
         # Ajouter les termes de boost à la requête
         enhanced_query += f" {' '.join(set(boost_terms))}"
     
-    logger.info(f"[AI FILTERS] Requête enrichie: '{enhanced_query}'")
+    logger.debug("[AI FILTERS] Requête enrichie", extra={'query': enhanced_query, 'sampled': True})
     return enhanced_query
 
 
@@ -265,7 +265,6 @@ def ai_search_with_adaptive_filters(
     Returns:
         Liste de jeux avec scores ajustés
     """
-    logger.info(f"[AI SEARCH] Requête: '{query}' avec filtres: {ai_filters}")
     
     # 1. Enrichir la requête avec les mots-clés des filtres
     enhanced_query = enhance_query_with_ai_filters(query, ai_filters)
@@ -310,7 +309,9 @@ def ai_search_with_adaptive_filters(
     filtered_results.sort(key=lambda x: x['ai_filtered_score'], reverse=True)
     final_results = filtered_results[:limit]
     
-    logger.info(f"[AI SEARCH] {len(final_results)} résultats après filtrage IA")
+    logger.info("[AI SEARCH] Recherche effectuée", extra={
+        'event': 'search.ai', 'query': query, 'filters': ai_filters, 'count': len(final_results), 'sampled': True,
+    })
     
     return final_results
 
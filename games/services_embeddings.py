@@ -1,16 +1,43 @@
-from sentence_transformers import SentenceTransformer
 from .models import Game
+from django.conf import settings
 from django.db import transaction
+from .inference import encode_texts
 import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 _model = None
 
+def load_torch_model():
+    """
+    SentenceTransformer PyTorch. sentence_transformers (et torch) ne sont
+    importés qu'ici : plusieurs secondes épargnées aux processus qui ne
+    calculent aucun embedding.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(MODEL_NAME)
+
 def get_model():
-    """Charge le modèle une seule fois (singleton)."""
+    """
+    Charge le modèle une seule fois (singleton), selon settings.EMBEDDING_BACKEND :
+    "torch" (SentenceTransformer) ou "onnx" (ONNX Runtime int8, voir
+    services_onnx.py ; repli sur torch si onnxruntime ou l'export manque).
+    """
     global _model
     if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
+        if getattr(settings, 'EMBEDDING_BACKEND', 'torch') == 'onnx':
+            from .services_onnx import load_onnx_encoder
+
+            _model = load_onnx_encoder(
+                settings.EMBEDDING_ONNX_PATH,
+                quantized=settings.EMBEDDING_ONNX_QUANTIZED,
+                threads=settings.EMBEDDING_ONNX_THREADS,
+            )
+        if _model is None:
+            _model = load_torch_model()
     return _model
 
 def extract_name(item):
@@ -37,16 +64,15 @@ def text_for_game(game: Game) -> str:
 
 def generate_embedding_for_game(game: Game):
     try:
-        model = get_model()
         text = text_for_game(game)
-        emb = model.encode(text, normalize_embeddings=True)
+        emb = encode_texts(text)
 
-        # Mettre à jour directement sans passer par save()
-        Game.objects.filter(pk=game.pk).update(embedding=emb.tolist())
+        # Mettre à jour directement sans passer par save() (float32 tel quel, sans liste Python)
+        Game.objects.filter(pk=game.pk).update(embedding=emb)
 
         return emb
     except Exception as e:
-        print(f"Erreur lors de la génération d'embedding pour {game.name}: {e}")
+        logger.error(f"Erreur lors de la génération d'embedding: {e}", extra={'game_id': game.pk})
         return None
 
 def embed_games(game_ids=None, batch_size=128):
@@ -55,25 +81,24 @@ def embed_games(game_ids=None, batch_size=128):
     if game_ids:
         qs = qs.filter(id__in=game_ids)
 
-    model = get_model()
     buffer = []
     to_update = []
 
     for g in qs.iterator():
         buffer.append((g, text_for_game(g)))
         if len(buffer) >= batch_size:
-            _flush(buffer, model, to_update)
+            _flush(buffer, to_update)
             buffer = []
 
     if buffer:
-        _flush(buffer, model, to_update)
+        _flush(buffer, to_update)
 
-def _flush(buffer, model, to_update):
+def _flush(buffer, to_update):
     """Calcule embeddings pour un lot et les sauvegarde en base."""
     texts = [t for _, t in buffer]
-    embs = model.encode(texts, normalize_embeddings=True)
+    embs = encode_texts(texts)
     for (game, _), emb in zip(buffer, embs):
-        game.embedding = emb.tolist()
+        game.embedding = emb
         to_update.append(game)
     with transaction.atomic():
         Game.objects.bulk_update(to_update, ["embedding"])
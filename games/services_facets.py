@@ -0,0 +1,188 @@
+"""
+Facettes du catalogue : comptages par genre, plateforme, décennie de sortie
+et tranche de note.
+
+- Catalogue complet : lecture de la table facet_counts, maintenue
+  incrémentalement à chaque écriture de Game (voir signals.py).
+- Résultat filtré : agrégats GROUP BY sur les tables de liaison indexées,
+  sans jamais charger les jeux en Python.
+"""
+
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Floor
+from django.utils.text import slugify
+from .models import FacetCount, Game, Genre, Platform
+import logging
+
+logger = logging.getLogger(__name__)
+
+FACETS = [FacetCount.GENRE, FacetCount.PLATFORM, FacetCount.YEAR, FacetCount.RATING]
+UNKNOWN_KEY = 'unknown'
+
+
+def year_bucket(year):
+    """Décennie de sortie : (clé, libellé), ex. ('2010', '2010-2019')."""
+    if not year:
+        return UNKNOWN_KEY, 'Inconnue'
+    decade = (int(year) // 10) * 10
+    return str(decade), f"{decade}-{decade + 9}"
+
+
+def rating_band(rating):
+    """Tranche de note RAWG (0-5) : (clé, libellé), ex. ('4', '4-5')."""
+    if rating is None or rating <= 0:
+        return UNKNOWN_KEY, 'Non noté'
+    band = min(int(rating), 4)
+    return str(band), f"{band}-{band + 1}"
+
+
+def _names(items, nested=None):
+    names = []
+    for item in items or []:
+        if nested and isinstance(item, dict) and isinstance(item.get(nested), dict):
+            item = item[nested]
+        if isinstance(item, dict) and item.get('name'):
+            names.append(item['name'])
+        elif isinstance(item, str) and item:
+            names.append(item)
+    return names
+
+
+def facet_keys_for(genres, platforms, released, rating):
+    """Liste des (facette, clé, libellé) auxquels un jeu contribue."""
+    keys = set()
+    for name in _names(genres):
+        keys.add((FacetCount.GENRE, slugify(name)[:100], name[:100]))
+    for name in _names(platforms, nested='platform'):
+        keys.add((FacetCount.PLATFORM, slugify(name)[:100], name[:100]))
+
+    year = released.year if hasattr(released, 'year') else (str(released)[:4] if released else None)
+    keys.add((FacetCount.YEAR, *year_bucket(year)))
+    keys.add((FacetCount.RATING, *rating_band(rating)))
+    return keys
+
+
+def game_facet_keys(game):
+    return facet_keys_for(game.genres, game.platforms, game.released, game.rating)
+
+
+# -------------------------------
+# Maintenance incrémentale
+# -------------------------------
+def apply_facet_deltas(deltas):
+    """Applique un Counter {(facette, clé, libellé): delta} à facet_counts."""
+    deltas = {k: n for k, n in deltas.items() if n}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        FacetCount.objects.bulk_create(
+            [FacetCount(facet=facet, key=key, label=label, count=0) for facet, key, label in deltas],
+            ignore_conflicts=True,
+        )
+        for (facet, key, _), delta in deltas.items():
+            FacetCount.objects.filter(facet=facet, key=key).update(count=F('count') + delta)
+
+
+def update_facets_for_change(old_keys, new_keys):
+    """Delta entre l'ancienne et la nouvelle contribution d'un jeu."""
+    deltas = Counter()
+    for k in set(new_keys) - set(old_keys):
+        deltas[k] += 1
+    for k in set(old_keys) - set(new_keys):
+        deltas[k] -= 1
+    apply_facet_deltas(deltas)
+
+
+def rebuild_facet_counts():
+    """Recalcul complet (réparation, import massif via bulk_create/update)."""
+    totals = Counter()
+    rows = Game.objects.values_list('genres', 'platforms', 'released', 'rating')
+    for genres, platforms, released, rating in rows.iterator(chunk_size=2000):
+        for k in facet_keys_for(genres, platforms, released, rating):
+            totals[k] += 1
+
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(
+            [FacetCount(facet=f, key=k, label=l, count=n) for (f, k, l), n in totals.items()],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+# -------------------------------
+# Lecture
+# -------------------------------
+def _format(rows, facet, limit):
+    if facet in (FacetCount.YEAR, FacetCount.RATING):
+        # Buckets ordonnés (plus récent / mieux noté d'abord), inconnu en dernier
+        known = sorted((r for r in rows if r['key'] != UNKNOWN_KEY), key=lambda r: int(r['key']), reverse=True)
+        return known + [r for r in rows if r['key'] == UNKNOWN_KEY]
+    rows = sorted(rows, key=lambda r: (-r['count'], r['label']))
+    return rows[:limit] if limit else rows
+
+
+def catalog_facets(limit=20):
+    """Facettes du catalogue complet, lues dans la table pré-calculée."""
+    grouped = {facet: [] for facet in FACETS}
+    for facet, key, label, count in FacetCount.objects.filter(count__gt=0).values_list(
+        'facet', 'key', 'label', 'count'
+    ):
+        grouped.setdefault(facet, []).append({'key': key, 'label': label, 'count': count})
+    return {facet: _format(rows, facet, limit) for facet, rows in grouped.items()}
+
+
+def queryset_facets(queryset, limit=20):
+    """Facettes d'un résultat filtré : un GROUP BY indexé par facette."""
+    game_ids = queryset.order_by().values('pk')
+    facets = {}
+
+    for facet, model, link in ((FacetCount.GENRE, Genre, 'game_genres'),
+                               (FacetCount.PLATFORM, Platform, 'game_platforms')):
+        rows = (
+            model.objects.filter(**{f'{link}__game__in': game_ids})
+            .annotate(games_count=Count(link))
+            .values_list('slug', 'name', 'games_count')
+        )
+        facets[facet] = _format(
+            [{'key': slug, 'label': name, 'count': n} for slug, name, n in rows], facet, limit
+        )
+
+    years = Counter()
+    for year, n in queryset.order_by().values_list('released__year').annotate(n=Count('pk')):
+        years[year_bucket(year)] += n
+    facets[FacetCount.YEAR] = _format(
+        [{'key': k, 'label': l, 'count': n} for (k, l), n in years.items()], FacetCount.YEAR, limit
+    )
+
+    bands = Counter()
+    band_expr = Case(
+        When(Q(rating__isnull=True) | Q(rating__lte=0), then=Value(-1.0)),
+        default=Floor('rating'),
+        output_field=FloatField(),
+    )
+    for band, n in queryset.order_by().annotate(band=band_expr).values_list('band').annotate(n=Count('pk')):
+        # band = floor(rating) ; -1 pour les jeux non notés
+        bands[rating_band(band + 0.5 if band >= 0 else None)] += n
+    facets[FacetCount.RATING] = _format(
+        [{'key': k, 'label': l, 'count': n} for (k, l), n in bands.items()], FacetCount.RATING, limit
+    )
+    return facets
+
+
+def facets_from_items(items, limit=20):
+    """
+    Facettes d'une liste de résultats déjà en mémoire (page RAWG, recherche
+    sémantique) : pas de requête SQL supplémentaire.
+    """
+    totals = Counter()
+    for item in items:
+        for k in facet_keys_for(item.get('genres'), item.get('platforms'), item.get('released'), item.get('rating')):
+            totals[k] += 1
+    grouped = {facet: [] for facet in FACETS}
+    for (facet, key, label), n in totals.items():
+        grouped[facet].append({'key': key, 'label': label, 'count': n})
+    return {facet: _format(rows, facet, limit) for facet, rows in grouped.items()}
@@ -0,0 +1,137 @@
+"""
+Accès au LLM (API compatible OpenAI : routeur Hugging Face, ou serveur local
+de test via settings.LLM_BASE_URL).
+
+- get_llm_client() : client synchrone partagé (vues et scripts synchrones).
+- chat_completion() : réponse complète, asynchrone (vues ASGI).
+- stream_chat_completion() : générateur asynchrone des fragments de texte,
+  pour relayer la réponse en Server-Sent Events pendant la génération.
+"""
+
+import importlib.util
+import json
+from django.conf import settings
+from .metrics import upstream_timer
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Import conditionnel et différé d'OpenAI : le SDK n'est chargé qu'à la création d'un client
+OPENAI_AVAILABLE = importlib.util.find_spec('openai') is not None
+
+CHATBOT_SYSTEM_PROMPT = (
+    "Tu es un assistant spécialisé dans les jeux vidéo pour GameSub. "
+    "Réponds de manière concise et pertinente aux questions sur les jeux, "
+    "les recommandations, les astuces. Privilégie des jeux populaires et accessibles."
+)
+CHATBOT_MAX_TOKENS = 400
+CHATBOT_TEMPERATURE = 0.8
+
+_client = None
+
+
+def llm_configured():
+    return OPENAI_AVAILABLE and bool(getattr(settings, 'LLM_API_KEY', ''))
+
+
+def llm_model():
+    return settings.LLM_MODEL
+
+
+def _client_options():
+    return {
+        'base_url': settings.LLM_BASE_URL,
+        'api_key': settings.LLM_API_KEY,
+        'timeout': settings.LLM_TIMEOUT,
+    }
+
+
+def get_llm_client():
+    """Client OpenAI synchrone (créé une fois par processus), ou None si indisponible."""
+    global _client
+    if _client is not None:
+        return _client
+    if not OPENAI_AVAILABLE:
+        logger.warning("OpenAI non installé - fonctionnalités IA désactivées")
+        return None
+    if not llm_configured():
+        logger.warning("LLM_API_KEY / HUGGINGFACE_API_TOKEN non configuré - fonctionnalités IA désactivées")
+        return None
+    try:
+        from openai import OpenAI
+
+        _client = OpenAI(**_client_options())
+    except Exception as e:
+        logger.warning(f"Erreur configuration client IA: {e}")
+    return _client
+
+
+def get_async_llm_client():
+    """
+    Client asynchrone : un par appel, fermé par l'appelant (son pool httpx est
+    lié à la boucle d'événements qui l'a créé).
+    """
+    if not llm_configured():
+        return None
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(**_client_options())
+
+
+def chat_messages(history, question):
+    """Prompt système GameSub + historique (sans prompt système) + question."""
+    return [
+        {"role": "system", "content": CHATBOT_SYSTEM_PROMPT},
+        *(message for message in history if message["role"] != "system"),
+        {"role": "user", "content": question},
+    ]
+
+
+async def chat_completion(messages, max_tokens=CHATBOT_MAX_TOKENS, temperature=CHATBOT_TEMPERATURE):
+    """Réponse complète, sans bloquer la boucle d'événements pendant la génération."""
+    client = get_async_llm_client()
+    if client is None:
+        raise RuntimeError("Service IA non disponible")
+    try:
+        with upstream_timer('llm', 'chat'):
+            completion = await client.chat.completions.create(
+                model=llm_model(),
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+        return completion.choices[0].message.content.strip()
+    finally:
+        await client.close()
+
+
+async def stream_chat_completion(messages, max_tokens=CHATBOT_MAX_TOKENS, temperature=CHATBOT_TEMPERATURE):
+    """Fragments de texte de la réponse, au fil de la génération."""
+    client = get_async_llm_client()
+    if client is None:
+        raise RuntimeError("Service IA non disponible")
+    try:
+        with upstream_timer('llm', 'chat_stream'):  # jusqu'au dernier fragment
+            stream = await client.chat.completions.create(
+                model=llm_model(),
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    finally:
+        await client.close()
+
+
+def sse_event(data, event=None):
+    """Un message Server-Sent Events (data JSON sur une seule ligne)."""
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
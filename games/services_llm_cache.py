@@ -0,0 +1,150 @@
+"""
+Cache des réponses du LLM (suggestions du quiz) et de leur enrichissement RAWG.
+
+- Clé exacte : hash du prompt canonicalisé (espaces et casse normalisés)
+  et des paramètres du modèle (modèle, max_tokens, temperature).
+- Option sémantique (settings.LLM_CACHE_SEMANTIC) : si la clé exacte est
+  absente, un prompt dont l'embedding est quasi identique à celui d'une
+  réponse en cache (cosinus >= LLM_CACHE_SIMILARITY) réutilise cette réponse.
+  L'index (hash, embedding float16) des derniers prompts est lui-même en
+  cache, borné à LLM_CACHE_SEMANTIC_MAX_ENTRIES par jeu de paramètres.
+- Le premier résultat RAWG de chaque nom de jeu suggéré est mis en cache :
+  des quiz différents suggèrent souvent les mêmes jeux.
+"""
+
+import hashlib
+import json
+import re
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from .metrics import record_cache
+from .services_llm import chat_completion, llm_model
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+RAWG_MATCH_TTL = 60 * 60 * 24
+RAWG_MATCH_FIELDS = ('id', 'name', 'background_image', 'rating', 'released', 'genres', 'platforms', 'metacritic')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def canonical_text(text):
+    return _WHITESPACE.sub(' ', str(text)).strip().casefold()
+
+
+def params_fingerprint(max_tokens, temperature):
+    return {'model': llm_model(), 'max_tokens': max_tokens, 'temperature': round(float(temperature), 3)}
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:32]
+
+
+def prompt_key(messages, params):
+    canonical = [[m['role'], canonical_text(m['content'])] for m in messages]
+    return f"llm_resp_{_digest({'messages': canonical, 'params': params})}"
+
+
+def semantic_index_key(params):
+    return f"llm_sem_index_{_digest(params)[:16]}"
+
+
+# -------------------------------
+# Index sémantique des prompts en cache
+# -------------------------------
+def embed_prompt(messages):
+    """Embedding normalisé du texte utilisateur du prompt."""
+    from .inference import encode_texts
+
+    text = ' '.join(canonical_text(m['content']) for m in messages if m['role'] == 'user')
+    return encode_texts(text).astype(np.float32)
+
+
+def find_near_duplicate(index, vector, threshold):
+    """Clé de la réponse dont le prompt est le plus proche, si au-dessus du seuil."""
+    if not index:
+        return None
+    keys = [key for key, _ in index]
+    matrix = np.vstack([np.frombuffer(data, dtype=np.float16) for _, data in index]).astype(np.float32)
+    if matrix.shape[1] != vector.shape[0]:
+        return None
+    scores = matrix @ vector
+    best = int(np.argmax(scores))
+    return keys[best] if scores[best] >= threshold else None
+
+
+def remember_prompt(index, key, vector, max_entries):
+    entries = [(k, data) for k, data in index or [] if k != key]
+    entries.append((key, vector.astype(np.float16).tobytes()))
+    return entries[-max_entries:]
+
+
+# -------------------------------
+# Complétion avec cache
+# -------------------------------
+async def cached_chat_completion(messages, max_tokens, temperature, semantic=None):
+    """
+    chat_completion() derrière le cache : (texte, source) avec source
+    'exact', 'semantic' ou 'llm'.
+    """
+    params = params_fingerprint(max_tokens, temperature)
+    key = prompt_key(messages, params)
+    timeout = settings.LLM_CACHE_TTL
+
+    cached = await cache.aget(key)
+    if cached is not None:
+        record_cache('llm_response', True)
+        return cached, 'exact'
+
+    semantic = settings.LLM_CACHE_SEMANTIC if semantic is None else semantic
+    vector = None
+    if semantic:
+        try:
+            vector = await sync_to_async(embed_prompt)(messages)
+            index = await cache.aget(semantic_index_key(params))
+            match = find_near_duplicate(index, vector, settings.LLM_CACHE_SIMILARITY)
+            if match:
+                cached = await cache.aget(match)
+                if cached is not None:
+                    record_cache('llm_response', True)
+                    return cached, 'semantic'
+        except Exception as e:
+            logger.warning(f"Cache sémantique LLM indisponible: {e}")
+            vector = None
+
+    record_cache('llm_response', False)
+    answer = await chat_completion(messages, max_tokens=max_tokens, temperature=temperature)
+    await cache.aset(key, answer, timeout)
+
+    if vector is not None:
+        index_key = semantic_index_key(params)
+        index = remember_prompt(await cache.aget(index_key), key, vector, settings.LLM_CACHE_SEMANTIC_MAX_ENTRIES)
+        await cache.aset(index_key, index, timeout)
+    return answer, 'llm'
+
+
+# -------------------------------
+# Enrichissement RAWG
+# -------------------------------
+def rawg_match_key(game_name):
+    return f"rawg_match_{hashlib.md5(canonical_text(game_name).encode()).hexdigest()[:16]}"
+
+
+async def cached_rawg_match(rawg_service, game_name):
+    """Premier résultat RAWG pour un nom de jeu ({} si aucun), mis en cache."""
+    key = rawg_match_key(game_name)
+    match = await cache.aget(key)
+    record_cache('rawg_match', match is not None)
+    if match is not None:
+        return match
+
+    rawg_results = await rawg_service.search_games(game_name, page_size=1)
+    if rawg_results is None:
+        return None  # erreur RAWG : rien en cache, nouvel essai au prochain appel
+    first = rawg_results['results'][0] if rawg_results.get('results') else {}
+    match = {field: first.get(field) for field in RAWG_MATCH_FIELDS} if first else {}
+    await cache.aset(key, match, RAWG_MATCH_TTL)
+    return match
@@ -0,0 +1,194 @@
+"""
+Backend ONNX Runtime du modèle d'embeddings (EMBEDDING_BACKEND = "onnx").
+
+Le transformeur de all-MiniLM-L6-v2 est exporté en ONNX puis quantifié en
+int8 (quantification dynamique des poids) par la commande
+export_onnx_embeddings, qui vérifie la parité avec PyTorch avant d'écrire
+le modèle. À l'exécution, seuls onnxruntime et tokenizers sont nécessaires :
+pas de torch chargé, encodage CPU plus rapide et empreinte mémoire réduite.
+
+OnnxEncoder expose le même encode() que SentenceTransformer (mean pooling
+sur le masque d'attention puis normalisation L2), si bien que le sidecar
+d'inférence et services_embeddings l'utilisent sans distinction.
+"""
+
+import importlib.util
+import json
+from pathlib import Path
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Dépendance optionnelle : pip install onnxruntime (onnx en plus pour l'export)
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec('onnxruntime') is not None
+
+MODEL_FILE = 'model.onnx'
+QUANTIZED_MODEL_FILE = 'model_int8.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+CONFIG_FILE = 'encoder.json'
+ONNX_OPSET = 17
+
+PARITY_TEXTS = [
+    "jeux comme Zelda",
+    "RPG sombre avec une histoire profonde",
+    "jeu de course arcade en multijoueur local",
+    "Hollow Knight | Metroidvania exigeant | Genres: Action, Platformer | Platforms: PC, Switch",
+    "cozy farming game with crafting and relationships",
+    "shooter tactique en équipe, compétitif",
+    "puzzle game",
+    "Grand Theft Auto V | Open world | Genres: Action | Tags: Singleplayer, Multiplayer, Open World",
+]
+
+
+class OnnxEncoder:
+    """Encodeur all-MiniLM-L6-v2 servi par ONNX Runtime."""
+
+    def __init__(self, path, quantized=True, threads=0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = Path(path)
+        config = json.loads((path / CONFIG_FILE).read_text())
+        self.max_seq_length = config['max_seq_length']
+        self.dimension = config['dimension']
+        self.model_file = path / (QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+
+        self.tokenizer = Tokenizer.from_file(str(path / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config['pad_token_id'], pad_token=config['pad_token'])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(self.model_file), options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling sur les tokens réels (comme le module Pooling de sentence-transformers)
+        weights = mask[..., None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        # Lots de longueurs voisines : moins de padding
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            indices = order[start:start + batch_size]
+            vectors[indices] = self._encode_batch([texts[i] for i in indices])
+
+        if normalize_embeddings:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors[0] if single else vectors
+
+
+def onnx_model_ready(path, quantized=True):
+    path = Path(path)
+    model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+    return all((path / name).exists() for name in (model_file, TOKENIZER_FILE, CONFIG_FILE))
+
+
+def load_onnx_encoder(path, quantized=True, threads=0):
+    """OnnxEncoder, ou None (avec un avertissement) si onnxruntime ou l'export manque."""
+    if not ONNXRUNTIME_AVAILABLE:
+        logger.warning("onnxruntime non installé - backend d'embeddings PyTorch utilisé")
+        return None
+    if not onnx_model_ready(path, quantized):
+        logger.warning(
+            f"Modèle ONNX absent de {path} (python manage.py export_onnx_embeddings) "
+            "- backend d'embeddings PyTorch utilisé"
+        )
+        return None
+    return OnnxEncoder(path, quantized=quantized, threads=threads)
+
+
+# -------------------------------
+# Export + quantification
+# -------------------------------
+def export_onnx(st_model, out_dir, opset=ONNX_OPSET):
+    """
+    Exporte le transformeur d'un SentenceTransformer (sortie : last_hidden_state,
+    axes batch / séquence dynamiques) avec son tokenizer. Retourne le chemin du modèle.
+    """
+    import torch
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    transformer = st_model[0]
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+
+    sample = tokenizer(["exemple d'export"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    model_path = out_dir / MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(auto_model),
+            tuple(sample[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+
+    tokenizer.backend_tokenizer.save(str(out_dir / TOKENIZER_FILE))
+    (out_dir / CONFIG_FILE).write_text(json.dumps({
+        'max_seq_length': transformer.max_seq_length,
+        'dimension': auto_model.config.hidden_size,  # mean pooling : même dimension
+        'pad_token': tokenizer.pad_token,
+        'pad_token_id': tokenizer.pad_token_id,
+    }, indent=2))
+    return model_path
+
+
+def quantize_onnx(model_path, out_path):
+    """Quantification dynamique int8 des poids (MatMul / Gemm), activations en float."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(model_path), str(out_path), weight_type=QuantType.QInt8)
+    return out_path
+
+
+def parity_report(reference, candidate, texts):
+    """
+    Compare deux encodeurs sur les mêmes textes (embeddings normalisés) :
+    cosinus minimal / moyen et écart absolu maximal.
+    """
+    expected = np.asarray(reference.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    actual = np.asarray(candidate.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    cosines = np.sum(expected * actual, axis=1)
+    return {
+        'min_cosine': float(cosines.min()),
+        'mean_cosine': float(cosines.mean()),
+        'max_abs_diff': float(np.abs(expected - actual).max()),
+    }
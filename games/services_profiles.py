@@ -0,0 +1,250 @@
+"""
+Profils de goût utilisateur (UserTasteProfile).
+
+Le profil conserve la somme pondérée des embeddings des jeux de l'utilisateur
+et le total des poids : chaque ajout, modification ou suppression d'un
+UserGame applique un simple delta (voir signals.py). Une recommandation
+personnalisée ne coûte donc qu'une lecture de vecteur et une requête ANN,
+quelle que soit la taille de la bibliothèque.
+
+Le profil porte aussi k centroïdes (k-means sur la bibliothèque), mis à jour
+en ligne à l'ajout d'un jeu et recalculés paresseusement après un retrait.
+"""
+
+from django.db import transaction
+from .models import Game, UserGame, UserTasteProfile
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Poids de base d'un jeu selon son statut dans la bibliothèque
+STATUS_WEIGHTS = {
+    UserGame.FAVORITE: 2.0,
+    UserGame.LIBRARY: 1.0,
+    UserGame.PLAYED: 1.0,
+    UserGame.WISHLIST: 0.5,
+}
+
+
+def user_game_weight(status, rating=None):
+    """Poids d'un jeu : statut, modulé par la note utilisateur (1-10 -> x0.6 à x1.5)."""
+    weight = STATUS_WEIGHTS.get(status, 0.0)
+    if rating:
+        weight *= 0.5 + rating / 10
+    return weight
+
+
+def as_vector(embedding):
+    """Embedding (liste JSON ou vecteur pgvector) -> np.ndarray, ou None."""
+    if embedding is None:
+        return None
+    vector = np.asarray(embedding, dtype=np.float64)
+    return vector if vector.size else None
+
+
+# -------------------------------
+# Maintenance incrémentale
+# -------------------------------
+def apply_profile_delta(user_id, embedding, weight):
+    """
+    Ajoute (weight > 0) ou retire (weight < 0) la contribution d'un jeu au profil.
+    Verrou de ligne pour que deux écritures concurrentes ne se perdent pas.
+    """
+    vector = as_vector(embedding)
+    if vector is None or not weight:
+        return
+
+    with transaction.atomic():
+        profile, _ = UserTasteProfile.objects.select_for_update().get_or_create(user_id=user_id)
+        total = as_vector(profile.vector_sum)
+        if total is None or total.shape != vector.shape:
+            total = np.zeros_like(vector)
+
+        profile.games_count = max(profile.games_count + (1 if weight > 0 else -1), 0)
+        profile.weight_total = profile.weight_total + weight
+        if profile.games_count == 0 or profile.weight_total <= 1e-9:
+            # Profil vide : on repart de zéro plutôt que de garder l'erreur d'arrondi
+            profile.games_count = 0
+            profile.weight_total = 0.0
+            total = np.zeros_like(vector)
+        else:
+            total = total + weight * vector
+
+        if weight > 0 and not profile.centroids_stale and profile.centroids:
+            _assign_to_centroid(profile, vector, weight)
+        else:
+            # Un retrait ne peut pas être défait proprement : reclustering à la prochaine lecture
+            profile.centroids_stale = True
+
+        profile.vector_sum = total.tolist()
+        profile.save(update_fields=[
+            'vector_sum', 'weight_total', 'games_count',
+            'centroids', 'centroid_weights', 'centroids_stale', 'updated_at',
+        ])
+
+
+def update_profile_for_change(user_id, old, new):
+    """
+    Delta entre l'ancienne et la nouvelle contribution d'un UserGame.
+    `old` / `new` : (game_id, status, rating) ou None.
+    """
+    if old == new:
+        return
+    game_ids = {entry[0] for entry in (old, new) if entry}
+    embeddings = dict(Game.objects.filter(id__in=game_ids).values_list('id', 'embedding'))
+
+    if old:
+        apply_profile_delta(user_id, embeddings.get(old[0]), -user_game_weight(old[1], old[2]))
+    if new:
+        apply_profile_delta(user_id, embeddings.get(new[0]), user_game_weight(new[1], new[2]))
+
+
+def _library_vectors(user_id):
+    """(matrice des embeddings, poids) de la bibliothèque : une seule requête."""
+    vectors, weights = [], []
+    rows = UserGame.objects.filter(user_id=user_id).values_list('status', 'rating', 'game__embedding')
+    for status, rating, embedding in rows:
+        vector = as_vector(embedding)
+        weight = user_game_weight(status, rating)
+        if vector is None or not weight:
+            continue
+        vectors.append(vector)
+        weights.append(weight)
+    if not vectors:
+        return None, None
+    return np.vstack(vectors), np.asarray(weights)
+
+
+def rebuild_user_profile(user_id):
+    """Recalcul complet (réparation, embeddings de jeux régénérés depuis)."""
+    vectors, weights = _library_vectors(user_id)
+    defaults = {'vector_sum': [], 'weight_total': 0.0, 'games_count': 0,
+                'centroids': [], 'centroid_weights': [], 'centroids_stale': False}
+    if vectors is not None:
+        centroids, centroid_weights = kmeans(vectors, weights, cluster_count(len(vectors)))
+        defaults.update(
+            vector_sum=(weights @ vectors).tolist(),
+            weight_total=float(weights.sum()),
+            games_count=len(vectors),
+            centroids=centroids.tolist(),
+            centroid_weights=centroid_weights.tolist(),
+        )
+
+    UserTasteProfile.objects.update_or_create(user_id=user_id, defaults=defaults)
+    return defaults['games_count']
+
+
+# -------------------------------
+# Profil multi-vecteurs (k-means)
+# -------------------------------
+# Une bibliothèque RPG + course n'a pas de « moyenne » pertinente : on la découpe
+# en quelques centroïdes et chacun alimente sa propre requête ANN.
+MAX_CLUSTERS = 4
+GAMES_PER_CLUSTER = 4  # en dessous, un cluster de plus n'apporte que du bruit
+KMEANS_ITERATIONS = 15
+
+
+def cluster_count(n_games):
+    return max(1, min(MAX_CLUSTERS, n_games // GAMES_PER_CLUSTER))
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def kmeans(vectors, weights, k, iterations=KMEANS_ITERATIONS):
+    """
+    K-means sphérique pondéré, entièrement vectorisé (similarité cosinus).
+    Initialisation déterministe type k-means++ (point le plus éloigné).
+    Retourne (centroïdes normalisés k x d, poids de chaque cluster).
+    """
+    points = _normalize(np.asarray(vectors, dtype=np.float64))
+    weights = np.asarray(weights, dtype=np.float64)
+    k = max(1, min(k, len(points)))
+
+    centroids = [points[int(np.argmax(weights))]]
+    for _ in range(1, k):
+        nearest = (points @ np.vstack(centroids).T).max(axis=1)
+        centroids.append(points[int(np.argmin(nearest))])
+    centroids = np.vstack(centroids)
+
+    labels = None
+    for _ in range(iterations):
+        new_labels = np.argmax(points @ centroids.T, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        # Somme pondérée par cluster en une opération (matrice d'appartenance k x n)
+        membership = (labels[None, :] == np.arange(k)[:, None]) * weights[None, :]
+        sums = membership @ points
+        empty = membership.sum(axis=1) == 0
+        sums[empty] = centroids[empty]  # cluster vide : on garde l'ancien centroïde
+        centroids = _normalize(sums)
+
+    labels = np.argmax(points @ centroids.T, axis=1)
+    cluster_weights = np.bincount(labels, weights=weights, minlength=k)
+    keep = cluster_weights > 0
+    return centroids[keep], cluster_weights[keep]
+
+
+def _assign_to_centroid(profile, vector, weight):
+    """Mise à jour en ligne : le jeu ajouté rejoint le centroïde le plus proche."""
+    centroids = np.asarray(profile.centroids, dtype=np.float64)
+    if centroids.ndim != 2 or centroids.shape[1] != vector.shape[0]:
+        profile.centroids_stale = True
+        return
+    cluster_weights = np.asarray(profile.centroid_weights, dtype=np.float64)
+    point = _normalize(vector)
+    i = int(np.argmax(centroids @ point))
+    centroids[i] = _normalize(centroids[i] * cluster_weights[i] + point * weight)
+    cluster_weights[i] += weight
+    profile.centroids = centroids.tolist()
+    profile.centroid_weights = cluster_weights.tolist()
+    # Assez de jeux pour un cluster de plus : reclustering à la prochaine lecture
+    if cluster_count(profile.games_count) > len(centroids):
+        profile.centroids_stale = True
+
+
+# -------------------------------
+# Lecture
+# -------------------------------
+def get_profile_vector(user_id):
+    """Vecteur moyen pondéré du profil (une seule requête), ou None si profil vide."""
+    row = UserTasteProfile.objects.filter(user_id=user_id).values_list('vector_sum', 'weight_total').first()
+    if not row:
+        return None
+    total, weight_total = as_vector(row[0]), row[1]
+    if total is None or weight_total <= 0:
+        return None
+    return total / weight_total
+
+
+def get_profile_centroids(user_id):
+    """
+    Centroïdes du profil [(vecteur, poids), ...] ; recalculés (une requête +
+    un k-means) seulement si le profil a été marqué comme périmé.
+    """
+    profile = UserTasteProfile.objects.filter(user_id=user_id).only(
+        'centroids', 'centroid_weights', 'centroids_stale', 'games_count'
+    ).first()
+    if profile is None or (profile.centroids_stale and profile.games_count):
+        rebuild_user_centroids(user_id)
+        profile = UserTasteProfile.objects.filter(user_id=user_id).first()
+    if profile is None or not profile.centroids:
+        return []
+    return [(np.asarray(c, dtype=np.float64), w) for c, w in zip(profile.centroids, profile.centroid_weights)]
+
+
+def rebuild_user_centroids(user_id):
+    """Reclustering de la bibliothèque (la somme pondérée n'est pas touchée)."""
+    vectors, weights = _library_vectors(user_id)
+    if vectors is None:
+        centroids, centroid_weights = [], []
+    else:
+        centroids, centroid_weights = kmeans(vectors, weights, cluster_count(len(vectors)))
+        centroids, centroid_weights = centroids.tolist(), centroid_weights.tolist()
+    UserTasteProfile.objects.filter(user_id=user_id).update(
+        centroids=centroids, centroid_weights=centroid_weights, centroids_stale=False
+    )
@@ -1,72 +1,58 @@
-from django.db import connection
-from .models import Game, UserGame
+from collections import defaultdict
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Game, UserGame, UserRecommendation, UserTasteProfile, SearchHistory
+from .services_profiles import get_profile_vector
+from .services_vectors import get_catalog_matrix, score_top_k
+from .fields import Vector
 import numpy as np
 from typing import List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def cosine_similarity_sql(target_embedding: List[float], limit: int = 10) -> str:
     """
     Génère une requête SQL pour calculer la similarité cosinus avec pgvector.
-    Pour SQLite, on utilise une approximation moins efficace.
-    """
-    # Pour PostgreSQL avec pgvector (idéal)
-    if 'postgresql' in connection.vendor:
-        return f"""
-            SELECT id, name, background_image, rating, 
-                   (embedding <=> %s::vector) as distance
-            FROM games 
-            WHERE embedding IS NOT NULL
-              AND rating > 0
-            ORDER BY distance ASC
-            LIMIT %s
-        """
-    
-    # Pour SQLite (fallback moins efficace)
+    Les autres bases passent par la matrice du catalogue en mémoire (find_similar_games).
+    """
     return f"""
-        SELECT id, name, background_image, rating,
-               json_array_length(embedding) as emb_length
+        SELECT id, name, background_image, rating, 
+               (embedding <=> %s::vector) as distance
         FROM games 
         WHERE embedding IS NOT NULL
           AND rating > 0
-        ORDER BY RANDOM()
+        ORDER BY distance ASC
         LIMIT %s
     """
 
 
 def get_recommendations_for_user(user_id: str, limit: int = 10) -> List[dict]:
     """
-    Recommande des jeux basés sur les favoris de l'utilisateur.
+    Recommande des jeux aux utilisateurs qui ont au moins un favori.
+    Le vecteur de requête est le profil de goût pondéré de toute la bibliothèque
+    (favoris x2, bibliothèque / joués x1, wishlist x0.5) et non plus la seule
+    moyenne des favoris ; seuls les favoris sont exclus des résultats.
     """
-    # Récupérer les jeux favoris de l'utilisateur
-    user_favorites = UserGame.objects.filter(
+    # Récupérer les jeux favoris de l'utilisateur (exclus des résultats)
+    user_favorites = list(UserGame.objects.filter(
         user_id=user_id, 
         status='favorite'
-    ).select_related('game').values_list('game__id', flat=True)
+    ).values_list('game_id', flat=True))
     
     if not user_favorites:
         # Si pas de favoris, recommander les jeux les mieux notés
         return get_top_rated_games(limit)
     
-    # Récupérer les embeddings des favoris (uniquement ceux avec rating > 0)
-    favorite_games = Game.objects.filter(
-        id__in=user_favorites, 
-        embedding__isnull=False,
-        rating__gt=0
-    )
-    
-    if not favorite_games:
-        return get_top_rated_games(limit)
-    
-    # Calculer l'embedding moyen des favoris
-    embeddings = []
-    for game in favorite_games:
-        if game.embedding:
-            embeddings.append(np.array(game.embedding))
+    # Profil de goût pré-calculé (somme pondérée maintenue par signals) : une seule lecture
+    avg_embedding = get_profile_vector(user_id)
     
-    if not embeddings:
+    if avg_embedding is None:
         return get_top_rated_games(limit)
     
-    avg_embedding = np.mean(embeddings, axis=0).tolist()
+    avg_embedding = avg_embedding.tolist()
     
     # Trouver les jeux similaires
     recommendations = find_similar_games(
@@ -84,7 +70,7 @@ def get_recommendations_for_game(game_id: int, limit: int = 5) -> List[dict]:
     """
     try:
         game = Game.objects.get(id=game_id)
-        if not game.embedding:
+        if game.embedding is None or len(game.embedding) == 0:
             return get_top_rated_games(limit)
         
         return find_similar_games(
@@ -106,19 +92,24 @@ def find_similar_games(target_embedding: List[float], exclude_ids: List[int] = N
     recommendations = []
     
     try:
+        if 'postgresql' not in connection.vendor:
+            # SQLite fallback - similarité exacte sur la matrice du catalogue (embeddings binaires)
+            ranked = score_top_k(target_embedding, limit, exclude_ids=exclude_ids, rated_only=True)[0]
+            games = Game.objects.in_bulk([game_id for game_id, _ in ranked])
+            return [{
+                'id': game_id,
+                'name': games[game_id].name,
+                'background_image': games[game_id].background_image,
+                'rating': games[game_id].rating,
+                'similarity_score': score,
+            } for game_id, score in ranked if game_id in games]
+
         with connection.cursor() as cursor:
-            if 'postgresql' in connection.vendor:
-                # PostgreSQL avec pgvector
-                cursor.execute(
-                    cosine_similarity_sql(target_embedding, limit + len(exclude_ids)),
-                    [target_embedding, limit + len(exclude_ids)]
-                )
-            else:
-                # SQLite fallback - recommandations aléatoires pour l'instant
-                cursor.execute(
-                    cosine_similarity_sql(target_embedding, limit * 2),
-                    [limit * 2]
-                )
+            # PostgreSQL avec pgvector
+            cursor.execute(
+                cosine_similarity_sql(target_embedding, limit + len(exclude_ids)),
+                [Vector._to_db(target_embedding), limit + len(exclude_ids)]
+            )
             
             for row in cursor.fetchall():
                 game_id = row[0]
@@ -135,7 +126,7 @@ def find_similar_games(target_embedding: List[float], exclude_ids: List[int] = N
                         break
     
     except Exception as e:
-        print(f"Erreur lors de la recherche de similarité: {e}")
+        logger.warning(f"Erreur lors de la recherche de similarité: {e}")
         return get_top_rated_games(limit)
     
     return recommendations
@@ -179,4 +170,86 @@ def get_trending_recommendations(limit: int = 10) -> List[dict]:
         'rating': game.rating,
         'similarity_score': 0.6,  # Score pour trending
         'is_trending': True
-    } for game in games]
\ No newline at end of file
+    } for game in games]
+
+
+# -------------------------------
+# Pré-calcul par lots (job precompute_recommendations)
+# -------------------------------
+def active_user_ids(days: int = 7) -> List:
+    """Utilisateurs actifs récemment : bibliothèque modifiée ou recherche effectuée."""
+    since = timezone.now() - timedelta(days=days)
+    users = set(UserGame.objects.filter(updated_at__gte=since).values_list('user_id', flat=True).distinct())
+    users.update(SearchHistory.objects.filter(created_at__gte=since).values_list('user_id', flat=True).distinct())
+    return list(users)
+
+
+def precompute_recommendations(user_ids, limit: int = 20, batch_size: int = 256) -> int:
+    """
+    Pré-calcule les recommandations d'un ensemble d'utilisateurs.
+    Par lot : profils empilés (b x d) @ catalogue.T (d x n) en un seul produit
+    matriciel, favoris masqués, top-k par argpartition (re-scoré si la matrice
+    est quantifiée), puis remplacement des lignes de user_recommendations.
+    """
+    catalog = get_catalog_matrix(refresh=True)
+    if not len(catalog):
+        return 0
+
+    user_ids = list(user_ids)
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+
+        profiles = [
+            (user_id, np.asarray(vector_sum, dtype=np.float32) / weight_total)
+            for user_id, vector_sum, weight_total in UserTasteProfile.objects.filter(
+                user_id__in=batch, weight_total__gt=0
+            ).values_list('user_id', 'vector_sum', 'weight_total')
+            if vector_sum and len(vector_sum) == catalog.dim
+        ]
+        if not profiles:
+            UserRecommendation.objects.filter(user_id__in=batch).delete()
+            continue
+
+        favorites = defaultdict(list)
+        for user_id, game_id in UserGame.objects.filter(
+            user_id__in=[user_id for user_id, _ in profiles], status=UserGame.FAVORITE
+        ).values_list('user_id', 'game_id'):
+            favorites[user_id].append(game_id)
+
+        winners = score_top_k(
+            np.vstack([vector for _, vector in profiles]), limit, rated_only=True, catalog=catalog,
+            exclude_per_query=[favorites[user_id] for user_id, _ in profiles],
+        )
+
+        rows = [
+            UserRecommendation(user_id=user_id, game_id=game_id, rank=rank, score=score)
+            for (user_id, _), ranked in zip(profiles, winners)
+            for rank, (game_id, score) in enumerate(ranked)
+        ]
+
+        with transaction.atomic():
+            UserRecommendation.objects.filter(user_id__in=batch).delete()
+            UserRecommendation.objects.bulk_create(rows, batch_size=1000)
+        written += len(profiles)
+    return written
+
+
+def get_precomputed_recommendations(user_id: str, limit: int = 10) -> List[dict]:
+    """
+    Recommandations pré-calculées (une requête indexée sur (user_id, rank)).
+    Les jeux mis en favoris depuis le dernier calcul sont écartés à la lecture.
+    """
+    rows = (
+        UserRecommendation.objects.filter(user_id=user_id)
+        .exclude(game_id__in=UserGame.objects.filter(user_id=user_id, status=UserGame.FAVORITE).values('game_id'))
+        .select_related('game')
+        .order_by('rank')[:limit]
+    )
+    return [{
+        'id': rec.game.id,
+        'name': rec.game.name,
+        'background_image': rec.game.background_image,
+        'rating': rec.game.rating,
+        'similarity_score': rec.score,
+    } for rec in rows]
@@ -1,6 +1,7 @@
 from django.db import connection
 from .models import Game
-from .services_embeddings import get_model
+from .inference import encode_texts
+from .services_vectors import EMBEDDING_DIM, FLOAT32, quantization_mode, rescore_factor, score_top_k
 import numpy as np
 from typing import List, Dict, Tuple
 import logging
@@ -24,10 +25,7 @@ def semantic_search_games(query: str, limit: int = 20, min_similarity: float = 0
     
     try:
         # 1. Générer l'embedding de la requête
-        model = get_model()
-        query_embedding = model.encode(query, normalize_embeddings=True)
-        
-        logger.info(f"[SEMANTIC SEARCH] Recherche pour: '{query}'")
+        query_embedding = encode_texts(query)
         
         # 2. Recherche optimisée selon la base de données
         if 'postgresql' in connection.vendor:
@@ -35,7 +33,9 @@ def semantic_search_games(query: str, limit: int = 20, min_similarity: float = 0
         else:
             results = _sqlite_semantic_search(query_embedding, limit, min_similarity)
         
-        logger.info(f"[SEMANTIC SEARCH] {len(results)} résultats trouvés")
+        logger.info("[SEMANTIC SEARCH] Recherche effectuée", extra={
+            'event': 'search.semantic', 'query': query, 'count': len(results), 'sampled': True,
+        })
         return results
         
     except Exception as e:
@@ -49,25 +49,53 @@ def _postgresql_semantic_search(query_embedding: np.ndarray, limit: int, min_sim
     """
     try:
         with connection.cursor() as cursor:
-            # Utilise l'opérateur de distance cosinus de pgvector
-            sql = """
-                SELECT id, external_id, name, slug, background_image, rating, released, 
-                       genres, platforms, tags, description,
-                       1 - (embedding <=> %s::vector) as similarity_score
-                FROM games 
-                WHERE embedding IS NOT NULL 
-                  AND rating > 0
-                  AND 1 - (embedding <=> %s::vector) >= %s
-                ORDER BY similarity_score DESC
-                LIMIT %s
-            """
+            if quantization_mode() != FLOAT32:
+                # Candidats sur halfvec (index HNSW games_embedding_halfvec_idx), puis
+                # re-score en pleine précision des seuls candidats retenus
+                sql = f"""
+                    WITH candidates AS (
+                        SELECT id FROM games
+                        WHERE embedding IS NOT NULL AND rating > 0
+                        ORDER BY embedding::halfvec({EMBEDDING_DIM}) <=> %s::halfvec({EMBEDDING_DIM})
+                        LIMIT %s
+                    )
+                    SELECT g.id, g.external_id, g.name, g.slug, g.background_image, g.rating, g.released,
+                           g.genres, g.platforms, g.tags, g.description,
+                           1 - (g.embedding <=> %s::vector) as similarity_score
+                    FROM games g JOIN candidates c ON c.id = g.id
+                    WHERE 1 - (g.embedding <=> %s::vector) >= %s
+                    ORDER BY similarity_score DESC
+                    LIMIT %s
+                """
+                params = [
+                    query_embedding.tolist(),
+                    limit * rescore_factor(),
+                    query_embedding.tolist(),
+                    query_embedding.tolist(),
+                    min_similarity,
+                    limit
+                ]
+            else:
+                # Utilise l'opérateur de distance cosinus de pgvector
+                sql = """
+                    SELECT id, external_id, name, slug, background_image, rating, released, 
+                           genres, platforms, tags, description,
+                           1 - (embedding <=> %s::vector) as similarity_score
+                    FROM games 
+                    WHERE embedding IS NOT NULL 
+                      AND rating > 0
+                      AND 1 - (embedding <=> %s::vector) >= %s
+                    ORDER BY similarity_score DESC
+                    LIMIT %s
+                """
+                params = [
+                    query_embedding.tolist(), 
+                    query_embedding.tolist(), 
+                    min_similarity, 
+                    limit
+                ]
             
-            cursor.execute(sql, [
-                query_embedding.tolist(), 
-                query_embedding.tolist(), 
-                min_similarity, 
-                limit
-            ])
+            cursor.execute(sql, params)
             
             results = []
             for row in cursor.fetchall():
@@ -96,32 +124,14 @@ def _postgresql_semantic_search(query_embedding: np.ndarray, limit: int, min_sim
 
 def _sqlite_semantic_search(query_embedding: np.ndarray, limit: int, min_similarity: float) -> List[Dict]:
     """
-    Recherche sémantique pour SQLite (fallback moins optimisé)
+    Recherche sémantique pour SQLite (fallback) : matrice du catalogue en mémoire
+    (éventuellement quantifiée), seuls les jeux retenus sont chargés.
     """
     try:
-        # Récupérer tous les jeux avec embeddings et rating > 0
-        games_with_embeddings = Game.objects.exclude(embedding__isnull=True).filter(rating__gt=0)
-        
-        similarities = []
-        
-        for game in games_with_embeddings:
-            try:
-                game_embedding = np.array(game.embedding)
-                
-                # Calcul de similarité cosinus
-                similarity = np.dot(query_embedding, game_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(game_embedding)
-                )
-                
-                if similarity >= min_similarity:
-                    similarities.append((game, float(similarity)))
-                    
-            except (ValueError, TypeError) as e:
-                logger.warning(f"[SQLITE SEARCH] Embedding invalide pour {game.name}: {e}")
-                continue
-        
-        # Trier par similarité décroissante
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        ranked = score_top_k(query_embedding, limit, rated_only=True)[0]
+        ranked = [(game_id, score) for game_id, score in ranked if score >= min_similarity]
+        games = Game.objects.in_bulk([game_id for game_id, _ in ranked])
+        similarities = [(games[game_id], score) for game_id, score in ranked if game_id in games]
         
         # Convertir en format de réponse
         results = []
@@ -172,7 +182,12 @@ def hybrid_search_games(query: str, limit: int = 20) -> List[Dict]:
         else:
             all_results = semantic_results
         
-        logger.info(f"[HYBRID SEARCH] {len(semantic_results)} sémantiques + {len(all_results) - len(semantic_results)} classiques")
+        logger.info("[HYBRID SEARCH] Recherche effectuée", extra={
+            'event': 'search.hybrid',
+            'semantic': len(semantic_results),
+            'classic': len(all_results) - len(semantic_results),
+            'sampled': True,
+        })
         
         return all_results[:limit]
         
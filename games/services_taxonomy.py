@@ -0,0 +1,104 @@
+"""
+Synchronisation des listes JSON de Game (genres, platforms, tags, stores)
+vers les tables relationnelles indexées.
+"""
+
+from django.db.models import Count, Q
+from django.utils.text import slugify
+from .models import (
+    Genre, Platform, Tag, Store,
+    GameGenre, GamePlatform, GameTag, GameStore
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# champ JSON de Game -> (modèle taxonomie, table de liaison, nom du FK dans la liaison)
+TAXONOMIES = {
+    'genres': (Genre, GameGenre, 'genre'),
+    'platforms': (Platform, GamePlatform, 'platform'),
+    'tags': (Tag, GameTag, 'tag'),
+    'stores': (Store, GameStore, 'store'),
+}
+
+
+def clean_items(items):
+    """Retourne {external_id: item} pour les éléments JSON valides ({id, name})."""
+    cleaned = {}
+    for item in items or []:
+        if isinstance(item, dict) and item.get('id') is not None and item.get('name'):
+            cleaned[item['id']] = item
+    return cleaned
+
+
+def upsert_taxonomy_items(model, items):
+    """Crée ou renomme les entrées de taxonomie et retourne {external_id: pk}."""
+    if not items:
+        return {}
+    model.objects.bulk_create(
+        [
+            model(external_id=ext_id, name=item['name'][:100], slug=slugify(item['name'])[:100])
+            for ext_id, item in items.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['external_id'],
+        update_fields=['name', 'slug'],
+    )
+    return dict(
+        model.objects.filter(external_id__in=list(items)).values_list('external_id', 'id')
+    )
+
+
+def sync_game_taxonomy(game, fields=None):
+    """
+    Aligne les tables de liaison d'un jeu sur ses listes JSON.
+    Ne touche qu'aux liaisons ajoutées ou retirées.
+    """
+    for field in fields or TAXONOMIES:
+        model, through, fk = TAXONOMIES[field]
+        items = clean_items(getattr(game, field))
+        pk_by_external = upsert_taxonomy_items(model, items)
+
+        wanted = set(pk_by_external.values())
+        current = set(
+            through.objects.filter(game_id=game.pk).values_list(f'{fk}_id', flat=True)
+        )
+
+        removed = current - wanted
+        if removed:
+            through.objects.filter(game_id=game.pk, **{f'{fk}_id__in': removed}).delete()
+
+        added = wanted - current
+        if added:
+            links = []
+            for ext_id, pk in pk_by_external.items():
+                if pk not in added:
+                    continue
+                link = through(game_id=game.pk, **{f'{fk}_id': pk})
+                if through is GameStore:
+                    link.url = items[ext_id].get('url')
+                links.append(link)
+            through.objects.bulk_create(links, ignore_conflicts=True)
+
+
+def resolve_items(field, value):
+    """
+    Entrées de taxonomie correspondant à une valeur de filtre : correspondance exacte
+    (insensible à la casse) sur le nom ou le slug, ou sur l'ID RAWG si numérique.
+    """
+    model = TAXONOMIES[field][0]
+    value = str(value).strip()
+    if value.isdigit():
+        return model.objects.filter(external_id=int(value))
+    return model.objects.filter(Q(name__iexact=value) | Q(slug=slugify(value)))
+
+
+def top_taxonomy_counts(field, limit=10):
+    """Comptage des jeux par entrée de taxonomie (agrégat sur la table de liaison)."""
+    model, through, fk = TAXONOMIES[field]
+    return list(
+        model.objects.annotate(games_count=Count(f'game_{field}'))
+        .filter(games_count__gt=0)
+        .order_by('-games_count', 'name')
+        .values_list('name', 'games_count')[:limit]
+    )
@@ -0,0 +1,209 @@
+"""
+Résolution des titres proposés par le LLM vers les jeux du catalogue local.
+
+Index en mémoire (reconstruit au plus une fois par TITLE_INDEX_TTL et par
+processus), interrogé dans cet ordre :
+1. nom normalisé exact (casse, accents, ponctuation, ™/®) ;
+2. trigrammes (similarité de Dice >= TRIGRAM_MIN_SIMILARITY) ;
+3. plus proches voisins par embedding (matrice du catalogue), retenus
+   seulement si leur nom reste proche du titre (EMBEDDING_NAME_MIN_SIMILARITY).
+
+Les correspondances approchées (2 et 3) exigent les mêmes numéros (chiffres
+et chiffres romains) : « FIFA 23 » ne résout pas vers « FIFA 22 », ni
+« Portal 2 » vers « Portal ».
+
+Seuls les titres non résolus partent vers RAWG.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from .models import Game
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+TITLE_INDEX_TTL = 600  # secondes
+TRIGRAM_MIN_SIMILARITY = 0.6
+EMBEDDING_MIN_SIMILARITY = 0.5
+EMBEDDING_NAME_MIN_SIMILARITY = 0.35
+EMBEDDING_CANDIDATES = 5
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_ROMAN_NUMERAL = re.compile(r'^(?=[ivxlc])c{0,3}(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$')
+
+_index = None
+_index_loaded_at = 0.0
+_index_lock = threading.Lock()
+
+
+def normalize_title(name):
+    """'Pokémon™ Sword & Shield' -> 'pokemon sword shield'."""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    return _NON_ALNUM.sub(' ', text.casefold()).strip()
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def sequel_numbers(normalized):
+    """Numéros d'un titre normalisé : 'dark souls iii' -> ('3',), 'fifa 23' -> ('23',)."""
+    numbers = []
+    for token in normalized.split():
+        if token.isdigit():
+            numbers.append(str(int(token)))
+        elif _ROMAN_NUMERAL.match(token):
+            numbers.append(str(roman_to_int(token)))
+    return tuple(numbers)
+
+
+def roman_to_int(token):
+    values = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100}
+    total = 0
+    for current, following in zip(token, token[1:] + ' '):
+        value = values[current]
+        total += -value if values.get(following, 0) > value else value
+    return total
+
+
+def trigram_similarity(a, b):
+    """Coefficient de Dice entre les trigrammes de deux titres normalisés."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return 2 * len(ta & tb) / (len(ta) + len(tb))
+
+
+class TitleIndex:
+    """Noms normalisés -> id de jeu, et index inversé trigramme -> ids."""
+
+    def __init__(self, rows):
+        self.names = {}  # id -> nom normalisé
+        self.exact = {}  # nom normalisé -> id (le mieux noté en cas d'homonymes)
+        self.postings = defaultdict(list)
+        ratings = {}
+        for game_id, name, rating in rows:
+            normalized = normalize_title(name)
+            if not normalized:
+                continue
+            self.names[game_id] = normalized
+            ratings[game_id] = rating or 0
+            current = self.exact.get(normalized)
+            if current is None or ratings[game_id] > ratings[current]:
+                self.exact[normalized] = game_id
+            for gram in trigrams(normalized):
+                self.postings[gram].append(game_id)
+        self.ratings = ratings
+
+    def __len__(self):
+        return len(self.names)
+
+    def match_exact(self, normalized):
+        return self.exact.get(normalized)
+
+    def match_trigram(self, normalized, min_similarity=TRIGRAM_MIN_SIMILARITY):
+        """
+        Candidats = jeux partageant assez de trigrammes (comptage sur l'index
+        inversé), puis similarité exacte sur ces seuls candidats.
+        """
+        grams = trigrams(normalized)
+        if not grams:
+            return None
+        shared = defaultdict(int)
+        for gram in grams:
+            for game_id in self.postings.get(gram, ()):
+                shared[game_id] += 1
+
+        # Dice >= s impose au moins s * |grams| / 2 trigrammes communs
+        floor = min_similarity * len(grams) / 2
+        numbers = sequel_numbers(normalized)
+        best_id, best_score = None, min_similarity
+        for game_id, count in shared.items():
+            if count < floor:
+                continue
+            candidate = self.names[game_id]
+            if sequel_numbers(candidate) != numbers:
+                continue  # autre épisode de la série
+            score = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if score > best_score or (score == best_score and best_id is not None
+                                      and self.ratings[game_id] > self.ratings[best_id]):
+                best_id, best_score = game_id, score
+        return best_id
+
+
+def get_title_index(refresh=False):
+    global _index, _index_loaded_at
+    if not refresh and _index is not None and time.monotonic() - _index_loaded_at < TITLE_INDEX_TTL:
+        return _index
+    with _index_lock:
+        if refresh or _index is None or time.monotonic() - _index_loaded_at >= TITLE_INDEX_TTL:
+            started = time.monotonic()
+            rows = Game.objects.values_list('id', 'name', 'rating').iterator(chunk_size=5000)
+            _index = TitleIndex(rows)
+            _index_loaded_at = time.monotonic()
+            logger.info("Index des titres chargé : %d jeux en %.2fs", len(_index), _index_loaded_at - started)
+    return _index
+
+
+def _match_embeddings(index, titles):
+    """Fallback embeddings pour les titres restants : {titre: id}."""
+    from .inference import encode_texts
+    from .services_vectors import score_top_k
+
+    vectors = encode_texts(list(titles))
+    matches = {}
+    for title, ranked in zip(titles, score_top_k(np.atleast_2d(vectors), EMBEDDING_CANDIDATES)):
+        normalized = normalize_title(title)
+        for game_id, score in ranked:
+            if score < EMBEDDING_MIN_SIMILARITY:
+                break
+            name = index.names.get(game_id)
+            if (name and sequel_numbers(name) == sequel_numbers(normalized)
+                    and trigram_similarity(normalized, name) >= EMBEDDING_NAME_MIN_SIMILARITY):
+                matches[title] = game_id
+                break
+    return matches
+
+
+def resolve_titles(titles, use_embeddings=True):
+    """
+    {titre: Game ou None} pour des titres libres (suggestions du LLM).
+    Une requête in_bulk pour tous les jeux trouvés.
+    """
+    index = get_title_index()
+    resolved, pending = {}, []
+    for title in titles:
+        normalized = normalize_title(title)
+        game_id = index.match_exact(normalized) or index.match_trigram(normalized)
+        if game_id:
+            resolved[title] = game_id
+        elif normalized:
+            pending.append(title)
+
+    if pending and use_embeddings:
+        try:
+            resolved.update(_match_embeddings(index, pending))
+        except Exception as e:
+            logger.warning(f"Résolution par embeddings indisponible: {e}")
+
+    games = Game.objects.in_bulk(set(resolved.values()))
+    return {title: games.get(resolved.get(title)) for title in titles}
+
+
+def game_as_rawg_match(game):
+    """Game local au format d'un résultat de recherche RAWG (champs du quiz)."""
+    return {
+        'id': game.external_id,
+        'name': game.name,
+        'background_image': game.background_image,
+        'rating': game.rating,
+        'released': game.released,
+        'genres': game.genres or [],
+        'platforms': [{'platform': platform} for platform in (game.platforms or [])],
+        'metacritic': game.metacritic,
+    }
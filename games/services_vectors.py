@@ -0,0 +1,222 @@
+"""
+Matrice du catalogue en mémoire pour les calculs de similarité vectorisés.
+
+Les embeddings de tous les jeux sont chargés une fois (ids + matrice
+normalisée + masque des jeux notés) puis réutilisés par le processus pendant
+CATALOG_MATRIX_TTL secondes : un score « utilisateurs x catalogue » devient un
+seul produit matriciel, et le top-k un argpartition au lieu d'un tri complet.
+
+Avec settings.EMBEDDING_QUANTIZATION = float16 ou int8, la matrice est stockée
+compressée (2x / 4x plus légère) : la recherche de candidats se fait sur les
+vecteurs compressés, puis les EMBEDDING_RESCORE_FACTOR x k meilleurs sont
+re-scorés en pleine précision à partir de la base.
+"""
+
+import threading
+import time
+from django.conf import settings
+from .models import Game
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+CATALOG_MATRIX_TTL = 600  # secondes
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2, cf. Game.embedding
+SCORE_CHUNK_ROWS = 8192  # dé-quantification par blocs : pas de copie float32 complète
+
+FLOAT32 = 'float32'
+FLOAT16 = 'float16'
+INT8 = 'int8'
+QUANTIZATION_MODES = (FLOAT32, FLOAT16, INT8)
+
+_catalog = None
+_catalog_loaded_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def quantization_mode():
+    mode = str(getattr(settings, 'EMBEDDING_QUANTIZATION', FLOAT32)).lower()
+    if mode not in QUANTIZATION_MODES:
+        logger.warning("EMBEDDING_QUANTIZATION=%s inconnu, float32 utilisé", mode)
+        return FLOAT32
+    return mode
+
+
+def rescore_factor():
+    return max(1, int(getattr(settings, 'EMBEDDING_RESCORE_FACTOR', 4)))
+
+
+def quantize(matrix, mode):
+    """
+    (données, échelles) pour une matrice float32 normalisée.
+    int8 : quantification scalaire symétrique par ligne, v ~ q * scale.
+    """
+    if mode == FLOAT16:
+        return matrix.astype(np.float16), None
+    if mode == INT8:
+        scale = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+        data = np.clip(np.rint(matrix / scale[:, None]), -127, 127).astype(np.int8)
+        return data, scale.astype(np.float32)
+    return matrix, None
+
+
+class CatalogMatrix:
+    """
+    ids (n,) int64 + vectors (n x d) normalisés (float32, float16 ou int8 + scale)
+    + rated (n,) bool, alignés ligne à ligne.
+    """
+
+    def __init__(self, ids, vectors, rated, scale=None, mode=FLOAT32):
+        self.ids = ids
+        self.vectors = vectors
+        self.rated = rated
+        self.scale = scale
+        self.mode = mode
+        self._positions = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1] if self.vectors.ndim == 2 else 0
+
+    @property
+    def quantized(self):
+        return self.mode != FLOAT32
+
+    @property
+    def positions(self):
+        """id de jeu -> indice de ligne (construit à la demande)."""
+        if self._positions is None:
+            self._positions = {int(game_id): i for i, game_id in enumerate(self.ids)}
+        return self._positions
+
+    def mask_for(self, game_ids):
+        """Indices de lignes des jeux donnés (ignorés s'ils ne sont pas dans la matrice)."""
+        positions = self.positions
+        return np.fromiter((positions[g] for g in game_ids if g in positions), dtype=np.int64)
+
+    def scores(self, queries):
+        """Similarités (q x n) ; approximatives si la matrice est quantifiée."""
+        if not self.quantized:
+            return queries @ self.vectors.T
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_CHUNK_ROWS):
+            block = self.vectors[start:start + SCORE_CHUNK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.scale is not None:
+            scores *= self.scale[None, :]
+        return scores
+
+
+def build_catalog_matrix(mode=None):
+    mode = mode or quantization_mode()
+    rows = Game.objects.exclude(embedding=None).values_list('id', 'embedding', 'rating')
+    ids, vectors, rated = [], [], []
+    for game_id, embedding, rating in rows.iterator(chunk_size=2000):
+        if embedding is None or len(embedding) == 0:
+            continue
+        ids.append(game_id)
+        vectors.append(np.asarray(embedding, dtype=np.float32))
+        rated.append(bool(rating and rating > 0))
+
+    if not vectors:
+        return CatalogMatrix(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=bool))
+
+    matrix = np.vstack(vectors)
+    del vectors
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    data, scale = quantize(matrix, mode)
+    return CatalogMatrix(np.asarray(ids, dtype=np.int64), data, np.asarray(rated), scale=scale, mode=mode)
+
+
+def get_catalog_matrix(refresh=False):
+    """Matrice du catalogue, rechargée au plus une fois par TTL et par processus."""
+    global _catalog, _catalog_loaded_at
+    if not refresh and _catalog is not None and time.monotonic() - _catalog_loaded_at < CATALOG_MATRIX_TTL:
+        return _catalog
+    with _catalog_lock:
+        if refresh or _catalog is None or time.monotonic() - _catalog_loaded_at >= CATALOG_MATRIX_TTL:
+            started = time.monotonic()
+            _catalog = build_catalog_matrix()
+            _catalog_loaded_at = time.monotonic()
+            logger.info(
+                "Matrice catalogue chargée : %d jeux (%s, %.1f Mo) en %.2fs",
+                len(_catalog), _catalog.mode, _catalog.vectors.nbytes / 1e6, _catalog_loaded_at - started,
+            )
+    return _catalog
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+def top_k(scores, k):
+    """
+    Indices des k meilleurs scores par ligne, triés par score décroissant.
+    argpartition (O(n)) puis tri des seuls k gagnants.
+    """
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def full_precision_vectors(game_ids):
+    """Embeddings d'origine (normalisés) des candidats : une requête id__in."""
+    rows = Game.objects.filter(id__in=list(game_ids)).exclude(embedding=None).values_list('id', 'embedding')
+    return {game_id: normalize_rows(embedding) for game_id, embedding in rows}
+
+
+def rescore(queries, candidates, k):
+    """
+    Re-score exact des candidats issus de la matrice quantifiée.
+    `candidates` : par requête, [(game_id, score approché), ...].
+    """
+    vectors = full_precision_vectors({game_id for cands in candidates for game_id, _ in cands})
+    results = []
+    for query, cands in zip(queries, candidates):
+        exact = [(game_id, float(vectors[game_id] @ query)) for game_id, _ in cands if game_id in vectors]
+        exact.sort(key=lambda item: -item[1])
+        results.append(exact[:k])
+    return results
+
+
+def score_top_k(queries, k, exclude_ids=(), rated_only=False, catalog=None, exclude_per_query=None):
+    """
+    Top-k du catalogue pour une ou plusieurs requêtes (q x d) : un produit
+    matriciel, masques d'exclusion, argpartition (+ re-score pleine précision
+    si la matrice est quantifiée).
+    Retourne, par requête, une liste [(game_id, score), ...] triée.
+    """
+    catalog = catalog if catalog is not None else get_catalog_matrix()
+    queries = normalize_rows(np.atleast_2d(queries))
+    if not len(catalog) or queries.shape[1] != catalog.dim:
+        return [[] for _ in range(len(queries))]
+
+    scores = catalog.scores(queries)
+    mask = catalog.mask_for(exclude_ids)
+    if len(mask):
+        scores[:, mask] = -np.inf
+    if rated_only:
+        scores[:, ~catalog.rated] = -np.inf
+    for row, ids in enumerate(exclude_per_query or []):
+        mask = catalog.mask_for(ids)
+        if len(mask):
+            scores[row, mask] = -np.inf
+
+    pool = k * rescore_factor() if catalog.quantized else k
+    winners = top_k(scores, pool)
+    candidates = [
+        [(int(catalog.ids[col]), float(scores[row, col])) for col in cols if np.isfinite(scores[row, col])]
+        for row, cols in enumerate(winners)
+    ]
+    if catalog.quantized:
+        return rescore(queries, candidates, k)
+    return candidates
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import Game
+from .models import Game, UserGame
 from .services_embeddings import generate_embedding_for_game
+from .services_taxonomy import TAXONOMIES, sync_game_taxonomy
+from .services_facets import facet_keys_for, game_facet_keys, update_facets_for_change
+from .services_profiles import update_profile_for_change
 
 @receiver(post_save, sender=Game)
 def update_game_embedding(sender, instance, created, **kwargs):
@@ -11,9 +14,90 @@ def update_game_embedding(sender, instance, created, **kwargs):
                        'esrb_rating', 'rating', 'metacritic', 'playtime', 'released', 'website']
     
     # Si nouveau jeu ou un champ pertinent a changé
-    if created or not instance.embedding:
+    if created or instance.embedding is None or len(instance.embedding) == 0:
         generate_embedding_for_game(instance)
     elif hasattr(instance, '_state') and instance._state.fields_cache:
         # Vérifier si un champ pertinent a changé (nécessite une logique plus complexe)
         # Pour l'instant, on régénère toujours - à optimiser plus tard
         generate_embedding_for_game(instance)
+
+
+@receiver(post_save, sender=Game)
+def update_game_taxonomy(sender, instance, created, update_fields=None, **kwargs):
+    """Alimente les tables genres/plateformes/tags/stores depuis les listes JSON."""
+    if created or update_fields is None:
+        sync_game_taxonomy(instance)
+        return
+
+    # Sauvegarde partielle : ne resynchronise que les listes modifiées
+    fields = [f for f in TAXONOMIES if f in update_fields]
+    if fields:
+        sync_game_taxonomy(instance, fields=fields)
+
+
+# Champs de Game qui alimentent facet_counts
+FACET_FIELDS = {'genres', 'platforms', 'released', 'rating'}
+
+
+@receiver(pre_save, sender=Game)
+def snapshot_game_facets(sender, instance, update_fields=None, **kwargs):
+    """Mémorise la contribution actuelle du jeu aux facettes avant modification."""
+    instance._facet_keys_before = None
+    if update_fields is not None and not FACET_FIELDS.intersection(update_fields):
+        return
+    instance._facet_keys_before = set()
+    if instance._state.adding or not instance.pk:
+        return
+    row = Game.objects.filter(pk=instance.pk).values_list('genres', 'platforms', 'released', 'rating').first()
+    if row:
+        instance._facet_keys_before = facet_keys_for(*row)
+
+
+@receiver(post_save, sender=Game)
+def update_game_facets(sender, instance, **kwargs):
+    """Met à jour incrémentalement facet_counts (uniquement les clés modifiées)."""
+    old_keys = getattr(instance, '_facet_keys_before', None)
+    if old_keys is None:
+        return  # sauvegarde partielle sans champ de facette
+    update_facets_for_change(old_keys, game_facet_keys(instance))
+
+
+@receiver(post_delete, sender=Game)
+def remove_game_facets(sender, instance, **kwargs):
+    update_facets_for_change(game_facet_keys(instance), set())
+
+
+# Champs de UserGame qui alimentent le profil de goût
+PROFILE_FIELDS = {'game', 'status', 'rating'}
+
+
+def _profile_entry(user_game):
+    return (user_game.game_id, user_game.status, user_game.rating)
+
+
+@receiver(pre_save, sender=UserGame)
+def snapshot_user_game_profile(sender, instance, update_fields=None, **kwargs):
+    """Mémorise la contribution actuelle du UserGame au profil avant modification."""
+    instance._profile_entry_before = False  # False : rien à faire
+    if update_fields is not None and not PROFILE_FIELDS.intersection(update_fields):
+        return
+    instance._profile_entry_before = None
+    if instance._state.adding or not instance.pk:
+        return
+    row = UserGame.objects.filter(pk=instance.pk).values_list('game_id', 'status', 'rating').first()
+    if row:
+        instance._profile_entry_before = tuple(row)
+
+
+@receiver(post_save, sender=UserGame)
+def update_user_taste_profile(sender, instance, **kwargs):
+    """Met à jour incrémentalement le profil de goût (somme pondérée des embeddings)."""
+    old = getattr(instance, '_profile_entry_before', None)
+    if old is False:
+        return  # sauvegarde partielle sans champ pertinent
+    update_profile_for_change(instance.user_id, old, _profile_entry(instance))
+
+
+@receiver(post_delete, sender=UserGame)
+def remove_from_taste_profile(sender, instance, **kwargs):
+    update_profile_for_change(instance.user_id, _profile_entry(instance), None)
@@ -0,0 +1,1115 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+import time
+from unittest import mock
+import uuid
+import jwt
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from . import cache_utils, jwks, metrics
+from .management.commands.stub_llm_server import StubLLMHandler
+from .authentication import SupabaseUser, claims_cache, decode_supabase_token
+from .conversation_store import (
+    CacheConversationStore, ConversationLockTimeout, ConversationStore, MemoryConversationStore,
+    get_conversation_store,
+)
+from .fields import PACKED_DTYPE, pack_vector, unpack_vector
+from .models import FacetCount, Game, UserGame, UserRecommendation, UserTasteProfile
+from .services_facets import rebuild_facet_counts
+from .services_profiles import get_profile_centroids, kmeans
+from .services_recommendations import (
+    get_precomputed_recommendations, get_recommendations_for_user, precompute_recommendations,
+)
+from .services_title_resolution import TitleIndex, get_title_index, normalize_title, resolve_titles, sequel_numbers
+from .services_vectors import (
+    EMBEDDING_DIM, FLOAT16, FLOAT32, INT8, CatalogMatrix, build_catalog_matrix, score_top_k, top_k,
+)
+
+
+def fake_encode(texts, normalize=True):
+    """Embeddings déterministes (graine = hash du texte) : pas de modèle chargé dans les tests."""
+    single = isinstance(texts, str)
+    vectors = []
+    for text in ([texts] if single else texts):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], 'little')
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+        vectors.append(vector / np.linalg.norm(vector))
+    return vectors[0] if single else np.vstack(vectors)
+
+
+TEST_JWT_SECRET = "test-secret-" * 4
+
+
+def bearer_headers(user_id, secret=TEST_JWT_SECRET, **claims):
+    """En-tête Authorization d'un jeton HS256 valide une heure."""
+    payload = {'sub': str(user_id), 'exp': int(time.time()) + 3600, **claims}
+    return {'Authorization': f"Bearer {jwt.encode(payload, secret, algorithm='HS256')}"}
+
+
+class FakeEmbeddingsMixin:
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('games.services_embeddings.encode_texts', fake_encode)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+# -------------------------------
+# Résolution des titres du quiz
+# -------------------------------
+SEQUEL_PAIRS = [
+    ("FIFA 23", "FIFA 22"),
+    ("Half-Life 2", "Half-Life"),
+    ("Portal 2", "Portal"),
+    ("Dark Souls III", "Dark Souls II"),
+]
+
+
+class SequelNumbersTests(SimpleTestCase):
+    def test_digits_and_roman_numerals(self):
+        self.assertEqual(sequel_numbers(normalize_title("Dark Souls III")), ('3',))
+        self.assertEqual(sequel_numbers(normalize_title("The Witcher 3: Wild Hunt")), ('3',))
+        self.assertEqual(sequel_numbers(normalize_title("Final Fantasy VII Remake")), ('7',))
+        self.assertEqual(sequel_numbers(normalize_title("Portal")), ())
+
+
+class TitleIndexSequelTests(SimpleTestCase):
+    def test_trigram_match_rejects_other_episode(self):
+        for requested, local in SEQUEL_PAIRS:
+            with self.subTest(requested=requested, local=local):
+                index = TitleIndex([(1, local, 4.0)])
+                self.assertIsNone(index.match_trigram(normalize_title(requested)))
+                # Et dans l'autre sens
+                index = TitleIndex([(1, requested, 4.0)])
+                self.assertIsNone(index.match_trigram(normalize_title(local)))
+
+    def test_trigram_match_picks_same_episode(self):
+        index = TitleIndex([(1, "Dark Souls II", 4.0), (2, "Dark Souls III", 4.5)])
+        self.assertEqual(index.match_trigram(normalize_title("Dark Souls 3")), 2)
+        self.assertEqual(index.match_trigram(normalize_title("Dark Soul III")), 2)
+
+    def test_trigram_match_still_tolerates_typos(self):
+        index = TitleIndex([(1, "The Legend of Zelda: Breath of the Wild", 4.5)])
+        self.assertEqual(index.match_trigram(normalize_title("Legend of Zelda Breath of the Wild")), 1)
+
+
+class ResolveTitlesSequelTests(FakeEmbeddingsMixin, TestCase):
+    def test_sequels_are_left_for_rawg(self):
+        for i, (_, local) in enumerate(SEQUEL_PAIRS):
+            Game.objects.create(external_id=900 + i, name=local, slug=f"local-{i}", rating=4.0)
+        get_title_index(refresh=True)
+
+        resolved = resolve_titles([requested for requested, _ in SEQUEL_PAIRS], use_embeddings=False)
+        self.assertEqual(resolved, {requested: None for requested, _ in SEQUEL_PAIRS})
+
+        exact = resolve_titles(["Half-Life"], use_embeddings=False)
+        self.assertEqual(exact["Half-Life"].name, "Half-Life")
+
+
+# -------------------------------
+# Substituts : nombre de requêtes SQL indépendant de la bibliothèque
+# -------------------------------
+class SubstitutesQueryCountTests(FakeEmbeddingsMixin, TestCase):
+    CATALOG_SIZE = 40
+
+    def setUp(self):
+        super().setUp()
+        self.games = [
+            Game.objects.create(
+                external_id=1000 + i, name=f"Game {i}", slug=f"game-{i}",
+                genres=["Action"] if i % 2 else ["RPG"], rating=3.5,
+            )
+            for i in range(self.CATALOG_SIZE)
+        ]
+
+    def client_for(self, library_size):
+        """Client authentifié dont la bibliothèque contient `library_size` jeux."""
+        user_id = uuid.uuid4()
+        for i, game in enumerate(self.games[:library_size]):
+            UserGame.objects.create(
+                user_id=user_id, game=game,
+                status=UserGame.FAVORITE if i % 3 == 0 else UserGame.LIBRARY,
+            )
+        client = APIClient()
+        client.force_authenticate(user=SupabaseUser(user_id))
+        return client
+
+    def assertConstantQueries(self, url, small=2, large=20):
+        small_client, large_client = self.client_for(small), self.client_for(large)
+        # Caches partagés (matrice du catalogue) chauffés par un autre utilisateur
+        cache.clear()
+        self.client_for(1).get(url)
+
+        with CaptureQueriesContext(connection) as baseline:
+            response = small_client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(len(baseline.captured_queries)):
+            response = large_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_library_recommendations(self):
+        response = self.assertConstantQueries('/api/substitutes_library_fav/')
+        self.assertEqual(response.data['user_library_count'], 20)
+        self.assertTrue(response.data['recommended_substitutes'])
+
+    def test_game_substitutes(self):
+        source = self.games[-1]
+        response = self.assertConstantQueries(f'/api/substitutes/{source.external_id}/')
+        self.assertEqual(response.data['source_game']['id'], source.id)
+        self.assertTrue(response.data['recommended_substitutes'])
+
+
+# -------------------------------
+# Recommandations personnalisées (profil de goût pondéré)
+# -------------------------------
+class RecommendationsForUserTests(FakeEmbeddingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_id = uuid.uuid4()
+        self.favorite, self.wished, self.other = [
+            Game.objects.create(external_id=2000 + i, name=name, slug=f"profile-{i}", rating=4.0)
+            for i, name in enumerate(["Hades", "Celeste", "Stardew Valley"])
+        ]
+
+    def recommendation_query(self):
+        """Vecteur passé à find_similar_games (None si la requête ANN n'a pas lieu)."""
+        with mock.patch('games.services_recommendations.find_similar_games', return_value=[]) as similar:
+            get_recommendations_for_user(self.user_id)
+        if not similar.called:
+            return None, None
+        return np.asarray(similar.call_args.args[0]), similar.call_args.kwargs['exclude_ids']
+
+    def test_query_uses_weighted_profile_not_favorites_only(self):
+        UserGame.objects.create(user_id=self.user_id, game=self.favorite, status=UserGame.FAVORITE)
+        UserGame.objects.create(user_id=self.user_id, game=self.wished, status=UserGame.WISHLIST)
+        self.favorite.refresh_from_db()
+        self.wished.refresh_from_db()
+
+        query, excluded = self.recommendation_query()
+        expected = (2.0 * np.asarray(self.favorite.embedding) + 0.5 * np.asarray(self.wished.embedding)) / 2.5
+        np.testing.assert_allclose(query, expected, rtol=1e-5, atol=1e-6)
+        self.assertEqual(excluded, [self.favorite.id])
+
+    def test_without_favorites_falls_back_to_top_rated(self):
+        UserGame.objects.create(user_id=self.user_id, game=self.wished, status=UserGame.WISHLIST)
+        query, _ = self.recommendation_query()
+        self.assertIsNone(query)
+
+
+# -------------------------------
+# Historique du chatbot : appends concurrents
+# -------------------------------
+class SlowLoadMixin:
+    """Élargit la fenêtre lecture -> écriture d'append() pour rendre la course reproductible."""
+
+    def load(self, user_id):
+        messages = super().load(user_id)
+        time.sleep(0.02)
+        return messages
+
+
+class SlowCacheStore(SlowLoadMixin, CacheConversationStore):
+    pass
+
+
+class SlowMemoryStore(SlowLoadMixin, MemoryConversationStore):
+    pass
+
+
+class ConversationStoreConcurrencyTests(SimpleTestCase):
+    WRITERS = 5
+
+    def assertNoLostTurns(self, store):
+        user_id = uuid.uuid4()
+        threads = [
+            threading.Thread(target=store.append, args=(user_id, {'role': 'user', 'content': f"question {i}"}))
+            for i in range(self.WRITERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        contents = sorted(message['content'] for message in store.load(user_id))
+        self.assertEqual(contents, [f"question {i}" for i in range(self.WRITERS)])
+
+    def test_cache_store_serializes_appends(self):
+        cache.clear()
+        self.assertNoLostTurns(SlowCacheStore())
+
+    def test_memory_store_serializes_appends(self):
+        self.assertNoLostTurns(SlowMemoryStore())
+
+    def test_store_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            ConversationStore()
+
+    async def test_async_appends_are_serialized(self):
+        await cache.aclear()
+        store, user_id = CacheConversationStore(), uuid.uuid4()
+        await asyncio.gather(*(
+            store.aappend(user_id, {'role': 'user', 'content': f"question {i}"})
+            for i in range(self.WRITERS)
+        ))
+        contents = sorted(message['content'] for message in await store.aload(user_id))
+        self.assertEqual(contents, [f"question {i}" for i in range(self.WRITERS)])
+
+    async def test_async_lock_wait_does_not_block_the_loop(self):
+        await cache.aclear()
+        store, user_id = CacheConversationStore(), uuid.uuid4()
+        await cache.aadd(store.lock_key(user_id), 'other-worker', 30)
+
+        append = asyncio.create_task(store.aappend(user_id, {'role': 'user', 'content': "bonjour"}))
+        await asyncio.sleep(0.05)
+        # Le thread partagé de sync_to_async (ORM, authentification) reste disponible
+        self.assertEqual(await asyncio.wait_for(sync_to_async(lambda: 'libre')(), timeout=0.5), 'libre')
+        self.assertFalse(append.done())
+
+        await cache.adelete(store.lock_key(user_id))
+        self.assertEqual(await append, [{'role': 'user', 'content': "bonjour"}])
+
+    async def test_lock_timeout_skips_the_write(self):
+        await cache.aclear()
+        store, user_id = CacheConversationStore(), uuid.uuid4()
+        await cache.aadd(store.lock_key(user_id), 'other-worker', 30)
+        with mock.patch('games.conversation_store.LOCK_WAIT', 0.05):
+            with self.assertRaises(ConversationLockTimeout):
+                await store.aappend(user_id, {'role': 'user', 'content': "perdu ?"})
+            with self.assertRaises(ConversationLockTimeout):
+                await sync_to_async(store.append)(user_id, {'role': 'user', 'content': "perdu ?"})
+        self.assertEqual(await store.aload(user_id), [])
+        self.assertEqual(await cache.aget(store.lock_key(user_id)), 'other-worker')
+
+
+# -------------------------------
+# Quiz : texte utilisateur conservé, cache LLM partagé
+# -------------------------------
+@override_settings(SUPABASE_JWT_SECRET=TEST_JWT_SECRET, LLM_API_KEY='test-key', LLM_CACHE_SEMANTIC=False)
+class QuizSubmitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patches = [
+            mock.patch('games.services_llm_cache.chat_completion', new=mock.AsyncMock(return_value="Hades\nCeleste")),
+            mock.patch('games.views_async.resolve_titles', return_value={}),
+            mock.patch('games.views_async.cached_rawg_match', new=mock.AsyncMock(return_value={})),
+        ]
+        self.llm = patches[0].start()
+        for patcher in patches[1:]:
+            patcher.start()
+        for patcher in patches:
+            self.addCleanup(patcher.stop)
+
+    async def submit(self, answers, user_id=None):
+        return await self.async_client.post(
+            '/api/quiz/submit/', {'answers': answers},
+            content_type='application/json', headers=bearer_headers(user_id or uuid.uuid4()),
+        )
+
+    async def test_answers_differing_in_case_share_the_cache_entry(self):
+        from .views import QUESTIONS
+
+        typed = ["Action RPG", "  PC "] + ["Solo"] * (len(QUESTIONS) - 2)
+        shouted = [answer.upper() for answer in typed]
+
+        user_id = uuid.uuid4()
+        first = await self.submit(typed, user_id)
+        second = await self.submit(shouted)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertFalse(first.json()['cached'])
+        self.assertTrue(second.json()['cached'])
+        self.assertEqual(self.llm.await_count, 1)
+
+        # Le texte saisi (seulement débarrassé des espaces) est rendu tel quel
+        suggestion = first.json()['suggestions'][0]
+        self.assertEqual(suggestion['user_preferences'], ["Action RPG", "PC"] + typed[2:])
+        self.assertIn("Action RPG", suggestion['description'])
+        self.assertIn("['Action RPG', 'PC'", self.llm.await_args.args[0][0]['content'])
+        self.assertEqual(second.json()['suggestions'][0]['user_preferences'][0], "ACTION RPG")
+        stored = await sync_to_async(get_conversation_store().get_quiz_answers)(user_id)
+        self.assertEqual(stored[:2], ["Action RPG", "PC"])
+
+
+# -------------------------------
+# Authentification : cache des claims, une vérification par requête
+# -------------------------------
+@override_settings(SUPABASE_JWT_SECRET=TEST_JWT_SECRET, LLM_API_KEY='')
+class SupabaseTokenTests(TestCase):
+    def setUp(self):
+        claims_cache.clear()
+        self.addCleanup(claims_cache.clear)
+        self.user_id = uuid.uuid4()
+        self.token = bearer_headers(self.user_id, email="player@example.com")['Authorization'][7:]
+
+    def count_decodes(self):
+        patcher = mock.patch('jwt.decode', wraps=jwt.decode)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_claims_cache_hit_skips_signature_check(self):
+        decode = self.count_decodes()
+        self.assertEqual(decode_supabase_token(self.token)['sub'], str(self.user_id))
+        self.assertEqual(decode_supabase_token(self.token)['sub'], str(self.user_id))
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(len(claims_cache), 1)
+
+    def test_expired_entry_is_evicted(self):
+        claims = decode_supabase_token(self.token)
+        with mock.patch('games.authentication.time.time', return_value=claims['exp'] + 1):
+            self.assertIsNone(claims_cache.get(self.token))
+        self.assertEqual(len(claims_cache), 0)
+
+    def forged_token(self):
+        """Jeton valide dont le payload a été remplacé (signature d'origine conservée)."""
+        header, _, signature = self.token.split('.')
+        forged_payload = jwt.utils.base64url_encode(
+            json.dumps({'sub': str(uuid.uuid4()), 'exp': int(time.time()) + 3600}).encode()
+        ).decode()
+        return f"{header}.{forged_payload}.{signature}"
+
+    def test_tampered_token_is_rejected_and_not_cached(self):
+        wrong_key = bearer_headers(self.user_id, secret="not-the-project-secret" * 2)['Authorization'][7:]
+        for forged in (self.forged_token(), wrong_key):
+            with self.subTest(forged=forged):
+                with self.assertRaises(jwt.InvalidTokenError):
+                    decode_supabase_token(forged)
+                response = self.client.get('/api/my-substitutes/', headers={'Authorization': f"Bearer {forged}"})
+                self.assertEqual(response.status_code, 403)  # DRF : pas de WWW-Authenticate -> 403
+        self.assertEqual(len(claims_cache), 0)
+
+    def test_middleware_and_drf_share_one_verification(self):
+        decode = self.count_decodes()
+        response = self.client.get('/api/my-substitutes/', headers={'Authorization': f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(response.wsgi_request.user.id, str(self.user_id))  # posé par le middleware
+
+    def test_rejected_token_is_verified_once_per_request(self):
+        decode = self.count_decodes()
+        response = self.client.get('/api/my-substitutes/', headers={'Authorization': f"Bearer {self.forged_token()}"})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(decode.call_count, 1)
+
+    async def test_async_view_reuses_middleware_claims(self):
+        decode = self.count_decodes()
+        response = await self.async_client.post(
+            '/api/chatbot/', {'question': "Un jeu comme Hades ?"},
+            content_type='application/json', headers={'Authorization': f"Bearer {self.token}"},
+        )
+        self.assertEqual(response.status_code, 500)  # LLM non configuré : l'authentification est passée
+        self.assertEqual(decode.call_count, 1)
+
+
+# -------------------------------
+# cached_call : single-flight, valeur périmée, XFetch
+# -------------------------------
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'gamesub-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedCallTests(SimpleTestCase):
+    KEY = 'test_cached_call'
+    LOCK = f"lock_{KEY}"
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.compute = mock.Mock(return_value='fresh')
+
+    def store(self, value, expires_in, delta=0.5):
+        cache.set(self.KEY, {'value': value, 'expires': time.time() + expires_in, 'delta': delta}, 600)
+
+    def call(self, **kwargs):
+        return cache_utils.cached_call(self.KEY, self.compute, timeout=60, **kwargs)
+
+    def test_miss_computes_once_and_caches(self):
+        self.assertEqual(self.call(), 'fresh')
+        self.assertEqual(self.call(), 'fresh')
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertIsNone(cache.get(self.LOCK))
+
+    def test_single_flight_across_threads(self):
+        def slow():
+            time.sleep(0.1)
+            return 'fresh'
+        self.compute.side_effect = slow
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.call())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['fresh'] * 5)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        self.store('stale', expires_in=-1)
+        cache.add(self.LOCK, 1, 30)
+        self.assertEqual(self.call(), 'stale')
+        self.compute.assert_not_called()
+
+    def test_expired_value_refreshed_by_lock_holder(self):
+        self.store('stale', expires_in=-1)
+        self.assertEqual(self.call(), 'fresh')
+        self.assertEqual(cache.get(self.KEY)['value'], 'fresh')
+
+    def test_failed_refresh_serves_stale_value(self):
+        self.store('stale', expires_in=-1)
+        self.compute.side_effect = RuntimeError("amont indisponible")
+        self.assertEqual(self.call(), 'stale')
+        self.assertIsNone(cache.get(self.LOCK))
+
+    def test_xfetch_refreshes_early_only_near_expiry(self):
+        self.store('cached', expires_in=10, delta=1.0)
+        # ln(1) = 0 : jamais d'anticipation
+        with mock.patch('games.cache_utils.random.random', return_value=1.0):
+            self.assertEqual(self.call(), 'cached')
+        # -delta * ln(1e-6) ~ 13.8 s > 10 s restants : rafraîchissement anticipé
+        with mock.patch('games.cache_utils.random.random', return_value=1e-6):
+            self.assertEqual(self.call(), 'fresh')
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_xfetch_anticipation_grows_with_compute_time(self):
+        now = time.time()
+        entry = {'value': 'cached', 'expires': now + 10, 'delta': 0.1}
+        with mock.patch('games.cache_utils.random.random', return_value=1e-6), \
+                mock.patch('games.cache_utils.time.time', return_value=now):
+            self.assertFalse(cache_utils._should_refresh(entry, beta=1.0))  # ~1.4 s d'avance
+            self.assertTrue(cache_utils._should_refresh({**entry, 'delta': 1.0}, beta=1.0))
+
+    def test_waiter_returns_value_computed_by_lock_holder(self):
+        cache.add(self.LOCK, 1, 30)
+
+        def other_worker_finishes(_):
+            cache_utils._store(self.KEY, 'from-other-worker', 60, 60, 0.1)
+        with mock.patch('games.cache_utils.time.sleep', side_effect=other_worker_finishes):
+            self.assertEqual(self.call(), 'from-other-worker')
+        self.compute.assert_not_called()
+
+    def test_waiter_computes_itself_after_timeout(self):
+        cache.add(self.LOCK, 1, 30)
+        with mock.patch('games.cache_utils.WAIT_TIMEOUT', 0.1), \
+                mock.patch('games.cache_utils.WAIT_INTERVAL', 0.01):
+            started = time.monotonic()
+            self.assertEqual(self.call(), 'fresh')
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_waiter_stops_waiting_when_lock_holder_fails(self):
+        cache.add(self.LOCK, 1, 30)
+        with mock.patch('games.cache_utils.time.sleep', side_effect=lambda _: cache.delete(self.LOCK)):
+            self.assertEqual(self.call(), 'fresh')
+        self.assertEqual(self.compute.call_count, 1)
+
+
+# -------------------------------
+# Facettes : maintenance incrémentale par signals
+# -------------------------------
+ACTION, RPG, INDIE = ({'id': i, 'name': name} for i, name in enumerate(["Action", "RPG", "Indie"], start=1))
+
+
+class FacetCountsTests(FakeEmbeddingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.games = [
+            Game.objects.create(external_id=3000 + i, name=f"Facet {i}", slug=f"facet-{i}", genres=genres, rating=rating)
+            for i, (genres, rating) in enumerate([([ACTION], 4.2), ([ACTION, RPG], 3.1), ([RPG], None)])
+        ]
+
+    def genre_counts(self):
+        facets = self.client.get('/api/games/facets/').json()['facets']
+        return {row['key']: row['count'] for row in facets['genre']}
+
+    def stored_counts(self):
+        return dict(((f, k), n) for f, k, n in FacetCount.objects.filter(count__gt=0).values_list('facet', 'key', 'count'))
+
+    def test_endpoint_reads_counts_maintained_on_create(self):
+        self.assertEqual(self.genre_counts(), {'action': 2, 'rpg': 2})
+        rating = {(f, k): n for (f, k), n in self.stored_counts().items() if f == FacetCount.RATING}
+        self.assertEqual(rating, {('rating', '4'): 1, ('rating', '3'): 1, ('rating', 'unknown'): 1})
+
+    def test_changing_genres_moves_counts(self):
+        game = self.games[1]
+        game.genres = [RPG, INDIE]
+        game.save()
+        self.assertEqual(self.genre_counts(), {'action': 1, 'rpg': 2, 'indie': 1})
+
+        # Sauvegarde partielle : seule la liste modifiée est recomptée
+        game.genres = [INDIE]
+        game.save(update_fields=['genres'])
+        self.assertEqual(self.genre_counts(), {'action': 1, 'rpg': 1, 'indie': 1})
+
+        # Sauvegarde sans champ de facette : comptages inchangés
+        game.name = "Renamed"
+        game.save(update_fields=['name'])
+        self.assertEqual(self.genre_counts(), {'action': 1, 'rpg': 1, 'indie': 1})
+
+    def test_delete_and_rebuild_agree(self):
+        self.games[0].delete()
+        self.assertEqual(self.genre_counts(), {'action': 1, 'rpg': 2})
+        incremental = self.stored_counts()
+        rebuild_facet_counts()
+        self.assertEqual(self.stored_counts(), incremental)
+
+
+# -------------------------------
+# Chatbot en streaming contre le stub LLM (commande stub_llm_server)
+# -------------------------------
+STUB_REPLY = "Essayez Hades puis Dead Cells"
+
+
+class StubLLMServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        handler = type('Handler', (StubLLMHandler,), {'reply': STUB_REPLY, 'delay': 0.0})
+        cls.llm_server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=cls.llm_server.serve_forever, daemon=True).start()
+        cls.llm_settings = override_settings(
+            LLM_BASE_URL=f"http://127.0.0.1:{cls.llm_server.server_port}/v1", LLM_API_KEY='stub',
+        )
+        cls.llm_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.llm_settings.disable()
+        cls.llm_server.shutdown()
+        cls.llm_server.server_close()
+        super().tearDownClass()
+
+
+def parse_sse(body):
+    """[(événement, données JSON)] d'un flux Server-Sent Events."""
+    events = []
+    for block in body.split("\n\n"):
+        if not block.strip():
+            continue
+        event, data = 'message', None
+        for line in block.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data = json.loads(value)
+        events.append((event, data))
+    return events
+
+
+@override_settings(SUPABASE_JWT_SECRET=TEST_JWT_SECRET)
+class ChatbotStreamTests(StubLLMServerMixin, TestCase):
+    async def test_stream_relays_chunks_and_saves_the_turn(self):
+        await cache.aclear()
+        user_id = uuid.uuid4()
+        response = await self.async_client.post(
+            '/api/chatbot/stream/', {'question': "Un roguelike nerveux ?"},
+            content_type='application/json', headers=bearer_headers(user_id),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        # Un message SSE complet par fragment envoyé
+        self.assertTrue(all(chunk.endswith("\n\n") for chunk in chunks))
+        events = parse_sse("".join(chunks))
+
+        deltas = [data['delta'] for event, data in events if event == 'message']
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual("".join(deltas), STUB_REPLY)
+        self.assertEqual(events[-1], ('done', {'answer': STUB_REPLY}))
+
+        history = await get_conversation_store().aload(user_id)
+        self.assertEqual(history, [
+            {'role': 'user', 'content': "Un roguelike nerveux ?"},
+            {'role': 'assistant', 'content': STUB_REPLY},
+        ])
+
+
+# -------------------------------
+# JWKS : jetons asymétriques avec la fixture (commande jwks_fixture)
+# -------------------------------
+def make_jwks_fixture(directory, algorithm):
+    call_command('jwks_fixture', out=str(directory), alg=algorithm, stdout=io.StringIO())
+    return json.loads((Path(directory) / 'jwks.json').read_text())['keys'][0]
+
+
+def fixture_token(directory, user_id):
+    out = io.StringIO()
+    call_command('jwks_fixture', out=str(directory), token=str(user_id), stdout=out)
+    return out.getvalue().strip()
+
+
+class JWKSTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory()
+        root = Path(cls.tmp.name)
+        cls.fixtures = {alg: root / alg.lower() for alg in ('RS256', 'ES256')}
+        cls.rotated = root / 'rotated'
+        cls.public_keys = [make_jwks_fixture(path, alg) for alg, path in cls.fixtures.items()]
+        cls.rotated_key = make_jwks_fixture(cls.rotated, 'ES256')
+        cls.jwks_file = root / 'jwks.json'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.publish(self.public_keys)
+        settings_override = override_settings(
+            SUPABASE_JWKS_URL=self.jwks_file.as_uri(), CACHES=LOCMEM_CACHES, SUPABASE_JWT_SECRET='',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        jwks.key_set.clear()
+        claims_cache.clear()
+        self.addCleanup(jwks.key_set.clear)
+        self.addCleanup(claims_cache.clear)
+
+        # Horloge contrôlée (time.monotonic du module jwks uniquement) et appels à la source comptés
+        self.now = 1000.0
+        clock = mock.patch('games.jwks.time', mock.Mock(monotonic=lambda: self.now))
+        fetch = mock.patch('games.jwks.fetch_jwks', wraps=jwks.fetch_jwks)
+        clock.start()
+        self.fetch = fetch.start()
+        self.addCleanup(clock.stop)
+        self.addCleanup(fetch.stop)
+
+    def publish(self, keys):
+        self.jwks_file.write_text(json.dumps({'keys': keys}))
+
+    def test_rs256_and_es256_tokens_are_accepted(self):
+        for algorithm, directory in self.fixtures.items():
+            with self.subTest(algorithm=algorithm):
+                user_id = uuid.uuid4()
+                token = fixture_token(directory, user_id)
+                self.assertEqual(jwt.get_unverified_header(token)['alg'], algorithm)
+                self.assertEqual(decode_supabase_token(token)['sub'], str(user_id))
+        self.assertEqual(self.fetch.call_count, 1)  # jeu de clés chargé une fois
+
+    def test_tampered_signature_is_rejected(self):
+        header, _, signature = fixture_token(self.fixtures['ES256'], uuid.uuid4()).split('.')
+        forged_payload = jwt.utils.base64url_encode(
+            json.dumps({'sub': str(uuid.uuid4()), 'exp': int(time.time()) + 3600}).encode()
+        ).decode()
+        with self.assertRaises(jwt.InvalidSignatureError):
+            decode_supabase_token(f"{header}.{forged_payload}.{signature}")
+        self.assertEqual(len(claims_cache), 0)
+
+    def test_unknown_kid_triggers_one_refresh(self):
+        decode_supabase_token(fixture_token(self.fixtures['RS256'], uuid.uuid4()))
+        self.assertEqual(self.fetch.call_count, 1)
+
+        # Rotation côté Supabase : nouvelle clé publiée
+        self.publish(self.public_keys + [self.rotated_key])
+        self.now += jwks.JWKS_MIN_REFRESH_INTERVAL
+        rotated_token = fixture_token(self.rotated, uuid.uuid4())
+        self.assertTrue(decode_supabase_token(rotated_token)['sub'])
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_repeated_unknown_kids_are_throttled(self):
+        decode_supabase_token(fixture_token(self.fixtures['RS256'], uuid.uuid4()))
+        self.now += jwks.JWKS_MIN_REFRESH_INTERVAL
+        unknown = fixture_token(self.rotated, uuid.uuid4())  # clé jamais publiée
+
+        for _ in range(5):
+            with self.assertRaises(jwks.JWKSError):
+                decode_supabase_token(unknown)
+        self.assertEqual(self.fetch.call_count, 2)  # un seul rechargement pour les 5 jetons
+
+        self.now += jwks.JWKS_MIN_REFRESH_INTERVAL
+        with self.assertRaises(jwks.JWKSError):
+            decode_supabase_token(unknown)
+        self.assertEqual(self.fetch.call_count, 3)
+
+    def test_failed_fetches_are_throttled(self):
+        self.jwks_file.unlink()
+        token = fixture_token(self.fixtures['ES256'], uuid.uuid4())
+        for _ in range(5):
+            with self.assertRaises(jwks.JWKSError):
+                decode_supabase_token(token)
+        self.assertEqual(self.fetch.call_count, 1)
+
+        # Source rétablie : nouvel essai seulement après l'intervalle minimal
+        self.publish(self.public_keys)
+        with self.assertRaises(jwks.JWKSError):
+            decode_supabase_token(token)
+        self.now += jwks.JWKS_MIN_REFRESH_INTERVAL
+        self.assertTrue(decode_supabase_token(token)['sub'])
+        self.assertEqual(self.fetch.call_count, 2)
+
+
+# -------------------------------
+# Pagination keyset du catalogue (-rating, -id)
+# -------------------------------
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class GameKeysetPaginationTests(FakeEmbeddingsMixin, TestCase):
+    RATINGS = [4.5, 4.5, 4.5, 4.0, None, 3.2, 4.0, None, 4.5, 2.0, None, 3.2, 4.0, 1.5, 4.5, None, 3.2]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for i, rating in enumerate(self.RATINGS):
+            Game.objects.create(external_id=4000 + i, name=f"Page {i}", slug=f"page-{i}", rating=rating)
+
+    def expected_order(self):
+        rows = Game.objects.values_list('id', 'rating')
+        rated = sorted((r for r in rows if r[1] is not None), key=lambda r: (-r[1], -r[0]))
+        unrated = sorted((r for r in rows if r[1] is None), key=lambda r: -r[0])
+        return [game_id for game_id, _ in rated + unrated]
+
+    def test_walk_all_pages_without_duplicates_or_gaps(self):
+        seen, pages = [], 0
+        url = '/api/games/?page_size=4'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertLessEqual(len(data['results']), 4)
+            self.assertEqual(data['count'], len(self.RATINGS))
+            seen += [game['id'] for game in data['results']]
+            url, pages = data['next'], pages + 1
+        self.assertEqual(pages, 5)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen, self.expected_order())
+
+    def test_page_boundary_inside_null_ratings(self):
+        # Taille de page qui coupe le groupe des notes NULL en deux
+        order = self.expected_order()
+        first = self.client.get('/api/games/?page_size=15').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([g['id'] for g in first['results'] + second['results']], order)
+        self.assertIsNone(second['next'])
+
+    def test_forged_or_malformed_cursor_is_rejected(self):
+        cursors = [
+            "pas-du-base64!!",
+            encode_cursor({'rating': 4.5}),  # pas une liste
+            encode_cursor([4.5]),  # mauvais nombre de valeurs
+            encode_cursor(["abc", 1]),  # note non numérique
+            encode_cursor([4.5, "x"]),  # id non entier
+            encode_cursor([4.5, [1]]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/games/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'cursor': ['Invalid cursor']})
+
+
+# -------------------------------
+# Top-k vectorisé (argpartition, exclusions)
+# -------------------------------
+def seeded_vectors(n, seed=0, dim=EMBEDDING_DIM):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class ScoreTopKTests(SimpleTestCase):
+    def setUp(self):
+        self.vectors = seeded_vectors(300, seed=1)
+        self.ids = np.arange(1, 301, dtype=np.int64) * 10
+        rated = np.ones(300, dtype=bool)
+        rated[::7] = False
+        self.catalog = CatalogMatrix(self.ids, self.vectors, rated)
+        self.queries = seeded_vectors(4, seed=2)
+
+    def reference(self, query, k, excluded=(), rated_only=False):
+        """Top-k par tri complet (argsort) : la référence."""
+        scores = self.vectors @ query
+        allowed = ~np.isin(self.ids, list(excluded))
+        if rated_only:
+            allowed &= self.catalog.rated
+        order = [i for i in np.argsort(-scores, kind='stable') if allowed[i]]
+        return [int(self.ids[i]) for i in order[:k]]
+
+    def test_top_k_matches_full_argsort(self):
+        scores = self.queries @ self.vectors.T
+        for k in (1, 5, 37, 300, 500):
+            with self.subTest(k=k):
+                expected = np.argsort(-scores, axis=1, kind='stable')[:, :min(k, 300)]
+                np.testing.assert_array_equal(top_k(scores, k), expected)
+
+    def test_score_top_k_with_global_and_per_query_exclusions(self):
+        excluded = [int(i) for i in self.ids[:40]]
+        per_query = [[int(self.ids[i]) for i in self.reference_indices(q)] for q in range(len(self.queries))]
+        results = score_top_k(
+            self.queries, 10, exclude_ids=excluded, rated_only=True,
+            catalog=self.catalog, exclude_per_query=per_query,
+        )
+        for row, ranked in enumerate(results):
+            with self.subTest(query=row):
+                expected = self.reference(self.queries[row], 10, excluded + per_query[row], rated_only=True)
+                self.assertEqual([game_id for game_id, _ in ranked], expected)
+                scores = [score for _, score in ranked]
+                self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def reference_indices(self, row):
+        """Les 3 meilleurs jeux de la requête, exclus pour elle seule."""
+        return np.argsort(-(self.vectors @ self.queries[row]))[:3]
+
+    def test_dimension_mismatch_returns_empty_lists(self):
+        self.assertEqual(score_top_k(seeded_vectors(2, dim=8), 5, catalog=self.catalog), [[], []])
+
+
+# -------------------------------
+# Matrice quantifiée + re-score pleine précision
+# -------------------------------
+def create_seeded_catalog(n, seed=0, external_offset=5000):
+    """Jeux avec embeddings aléatoires (bulk_create : pas de signal d'embedding)."""
+    vectors = seeded_vectors(n, seed=seed)
+    Game.objects.bulk_create([
+        Game(
+            external_id=external_offset + i, name=f"Seeded {i}", slug=f"seeded-{i}",
+            rating=None if i % 9 == 0 else 3.5, embedding=vectors[i],
+        )
+        for i in range(n)
+    ])
+    return vectors
+
+
+class QuantizedRescoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_seeded_catalog(200, seed=3)
+        cls.queries = seeded_vectors(5, seed=4)
+
+    def test_quantized_top_k_matches_float32(self):
+        reference = score_top_k(self.queries, 10, rated_only=True, catalog=build_catalog_matrix(FLOAT32))
+        for mode in (FLOAT16, INT8):
+            with self.subTest(mode=mode):
+                catalog = build_catalog_matrix(mode)
+                self.assertEqual(catalog.vectors.dtype, np.float16 if mode == FLOAT16 else np.int8)
+                results = score_top_k(self.queries, 10, rated_only=True, catalog=catalog)
+                for expected, ranked in zip(reference, results):
+                    self.assertEqual([game_id for game_id, _ in ranked], [game_id for game_id, _ in expected])
+                    # Scores re-calculés en float32 : pas d'erreur de quantification.
+                    np.testing.assert_allclose(
+                        [score for _, score in ranked], [score for _, score in expected], rtol=0, atol=1e-6,
+                    )
+
+
+# -------------------------------
+# Embeddings binaires (PackedVectorField)
+# -------------------------------
+class PackedVectorFieldTests(FakeEmbeddingsMixin, TestCase):
+    def test_pack_unpack_round_trip(self):
+        vector = seeded_vectors(1, seed=5)[0]
+        packed = pack_vector(vector)
+        self.assertEqual(len(packed), 4 * EMBEDDING_DIM)
+        self.assertEqual(packed, pack_vector(vector.tolist()))
+        np.testing.assert_array_equal(unpack_vector(packed), vector)
+
+    def test_sqlite_blob_round_trip_is_bit_exact(self):
+        vector = seeded_vectors(1, seed=6)[0]
+        game = Game.objects.create(external_id=6000, name="Packed", slug="packed", rating=4.0)
+        Game.objects.filter(id=game.id).update(embedding=vector)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT embedding FROM {Game._meta.db_table} WHERE id = %s", [game.id])
+            raw = cursor.fetchone()[0]
+        self.assertIsInstance(raw, bytes)
+        self.assertEqual(raw, vector.astype(PACKED_DTYPE).tobytes())
+
+        stored = Game.objects.get(id=game.id).embedding
+        self.assertEqual(stored.dtype, np.float32)
+        self.assertEqual(stored.shape, (EMBEDDING_DIM,))
+        np.testing.assert_array_equal(stored, vector)
+
+    def test_null_embedding(self):
+        game = Game.objects.create(external_id=6001, name="Packed null", slug="packed-null", rating=4.0)
+        Game.objects.filter(id=game.id).update(embedding=None)
+        self.assertIsNone(Game.objects.get(id=game.id).embedding)
+
+
+# -------------------------------
+# Profil multi-vecteurs (k-means)
+# -------------------------------
+def two_tastes(per_taste=6, seed=7, noise=0.01):
+    """Deux goûts orthogonaux (axes 0 et 1) bruités : (vecteurs, bases)."""
+    rng = np.random.default_rng(seed)
+    bases = np.zeros((2, EMBEDDING_DIM))
+    bases[0, 0] = bases[1, 1] = 1.0
+    vectors = np.repeat(bases, per_taste, axis=0) + noise * rng.standard_normal((2 * per_taste, EMBEDDING_DIM))
+    return vectors, bases
+
+
+class KMeansTests(SimpleTestCase):
+    def test_two_tastes_give_two_centroids(self):
+        vectors, bases = two_tastes()
+        weights = np.linspace(0.5, 2.0, len(vectors))
+        centroids, cluster_weights = kmeans(vectors, weights, 2)
+
+        self.assertEqual(centroids.shape, (2, EMBEDDING_DIM))
+        np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0)
+        # Chaque base a son centroïde (cosinus proche de 1)
+        similarity = bases @ centroids.T
+        self.assertGreater(similarity.max(axis=1).min(), 0.95)
+        self.assertEqual(sorted(np.argmax(similarity, axis=1)), [0, 1])
+        self.assertAlmostEqual(cluster_weights.sum(), weights.sum())
+
+    def test_deterministic(self):
+        vectors, _ = two_tastes()
+        weights = np.ones(len(vectors))
+        first = kmeans(vectors, weights, 3)
+        second = kmeans(vectors, weights, 3)
+        np.testing.assert_array_equal(first[0], second[0])
+        np.testing.assert_array_equal(first[1], second[1])
+
+    def test_k_capped_by_point_count(self):
+        vectors, _ = two_tastes(per_taste=1)
+        centroids, cluster_weights = kmeans(vectors, [1.0, 1.0], 4)
+        self.assertEqual(len(centroids), 2)
+        np.testing.assert_array_equal(cluster_weights, [1.0, 1.0])
+
+
+class ProfileCentroidsTests(FakeEmbeddingsMixin, TestCase):
+    def test_library_with_two_tastes_gets_two_centroids(self):
+        vectors, bases = two_tastes(per_taste=4)
+        games = Game.objects.bulk_create([
+            Game(external_id=7000 + i, name=f"Taste {i}", slug=f"taste-{i}", rating=4.0, embedding=vector)
+            for i, vector in enumerate(vectors.astype(np.float32))
+        ])
+        user_id = uuid.uuid4()
+        for game in games:
+            UserGame.objects.create(user_id=user_id, game=game, status=UserGame.LIBRARY)
+
+        centroids = get_profile_centroids(user_id)
+        self.assertEqual(len(centroids), 2)
+        self.assertEqual(sum(weight for _, weight in centroids), len(games))
+        similarity = bases @ np.vstack([centroid for centroid, _ in centroids]).T
+        self.assertGreater(similarity.max(axis=1).min(), 0.95)
+
+
+# -------------------------------
+# Recommandations pré-calculées (lot matriciel)
+# -------------------------------
+class PrecomputeRecommendationsTests(FakeEmbeddingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.vectors = create_seeded_catalog(60, seed=8, external_offset=8000)
+        self.games = list(Game.objects.filter(external_id__gte=8000).order_by('external_id'))
+        self.user_id = uuid.uuid4()
+        self.favorite = self.games[1]
+        UserGame.objects.create(user_id=self.user_id, game=self.favorite, status=UserGame.FAVORITE)
+        for game in self.games[2:5]:
+            UserGame.objects.create(user_id=self.user_id, game=game, status=UserGame.LIBRARY)
+
+    def expected_ids(self, limit):
+        """Référence : tri complet des scores cosinus du profil, favoris et jeux non notés exclus."""
+        profile = UserTasteProfile.objects.get(user_id=self.user_id)
+        query = np.asarray(profile.vector_sum) / profile.weight_total
+        scores = self.vectors @ (query / np.linalg.norm(query))
+        allowed = [
+            i for i in np.argsort(-scores, kind='stable')
+            if self.games[i].rating and self.games[i].id != self.favorite.id
+        ]
+        return [self.games[i].id for i in allowed[:limit]]
+
+    def stored(self):
+        return list(UserRecommendation.objects.filter(user_id=self.user_id).order_by('rank').values_list(
+            'rank', 'game_id', 'score'
+        ))
+
+    def test_writes_ranked_rows_without_favorites(self):
+        self.assertEqual(precompute_recommendations([self.user_id], limit=10), 1)
+
+        rows = self.stored()
+        self.assertEqual([rank for rank, _, _ in rows], list(range(10)))
+        self.assertEqual([game_id for _, game_id, _ in rows], self.expected_ids(10))
+        scores = [score for _, _, score in rows]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        unrated = {game.id for game in self.games if not game.rating}
+        self.assertFalse({game_id for _, game_id, _ in rows} & (unrated | {self.favorite.id}))
+
+    def test_rerun_replaces_rows(self):
+        precompute_recommendations([self.user_id], limit=10)
+        precompute_recommendations([self.user_id], limit=5)
+        self.assertEqual([rank for rank, _, _ in self.stored()], list(range(5)))
+
+    def test_new_favorite_hidden_at_read_time(self):
+        precompute_recommendations([self.user_id], limit=10)
+        top = Game.objects.get(id=self.stored()[0][1])
+        UserGame.objects.update_or_create(user_id=self.user_id, game=top, defaults={'status': UserGame.FAVORITE})
+
+        recommended = [rec['id'] for rec in get_precomputed_recommendations(self.user_id, limit=10)]
+        self.assertEqual(len(recommended), 9)
+        self.assertNotIn(top.id, recommended)
+
+    def test_user_without_profile_loses_stale_rows(self):
+        other = uuid.uuid4()
+        UserRecommendation.objects.create(user_id=other, game=self.games[0], rank=0, score=0.5)
+        precompute_recommendations([other])
+        self.assertFalse(UserRecommendation.objects.filter(user_id=other).exists())
+
+
+# -------------------------------
+# Instrumentation par route (/metrics)
+# -------------------------------
+METRICS_TEST_TOKEN = 'metrics-test-token'
+
+
+@override_settings(METRICS_TOKEN=METRICS_TEST_TOKEN)
+class MetricsEndpointTests(FakeEmbeddingsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        Game.objects.create(external_id=9000, name="Metrics", slug="metrics", rating=4.0)
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    def scrape(self, **headers):
+        return self.client.get('/metrics', headers=headers)
+
+    def test_request_is_recorded_and_rendered(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get('/api/games/').status_code, 200)
+        # Les séries sont lues avant le scrape (qui est lui-même instrumenté)
+        self.assertEqual(metrics.REQUEST_DURATION.count('/api/games/', 'GET', '200'), 1)
+        queries = len(captured)
+        self.assertGreaterEqual(queries, 1)
+        self.assertEqual(metrics.REQUEST_DB_QUERIES.sum('/api/games/'), queries)
+
+        response = self.scrape(Authorization=f"Bearer {METRICS_TEST_TOKEN}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        lines = response.content.decode().splitlines()
+
+        labels = 'route="/api/games/",method="GET",status="200"'
+        buckets = [line for line in lines if line.startswith(f'gamesub_request_duration_seconds_bucket{{{labels},')]
+        self.assertEqual(len(buckets), len(metrics.LATENCY_BUCKETS) + 1)
+        self.assertEqual(buckets[-1], f'gamesub_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1')
+        self.assertIn(f'gamesub_request_duration_seconds_count{{{labels}}} 1', lines)
+        self.assertIn(f'gamesub_request_db_queries_sum{{route="/api/games/"}} {queries}', lines)
+        self.assertIn('gamesub_request_db_queries_count{route="/api/games/"} 1', lines)
+
+    def test_token_required(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(Authorization="Bearer wrong-token").status_code, 403)
+        self.assertEqual(self.scrape(Authorization=METRICS_TEST_TOKEN).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_closed_outside_debug(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.scrape().status_code, 200)
@@ -1,13 +1,14 @@
 from django.urls import path
-from . import views
+from . import views, views_async
 
 app_name = 'games'
 
 urlpatterns = [
     # Games
     path('games/', views.GameListView.as_view(), name='game-list'),
+    path('games/facets/', views.game_facets, name='game-facets'),
     path('games/<int:pk>/', views.GameDetailView.as_view(), name='game-detail'),
-    path('search/', views.search_games_api, name='search-games'),
+    path('search/', views_async.search_games_api, name='search-games'),
     path('substitutes/<int:game_id>/', views.get_game_substitutes, name='game-substitutes'),
 
     # User Games & Substitutes
@@ -39,7 +40,7 @@ urlpatterns = [
     path('search/semantic/', views.semantic_search_endpoint, name='semantic-search'),
     path('search/hybrid/', views.hybrid_search_endpoint, name='hybrid-search'),
     path('search/suggestions/', views.search_suggestions_endpoint, name='search-suggestions'),
-    path('search/compare/', views.search_compare_endpoint, name='search-compare'),
+    path('search/compare/', views_async.search_compare_endpoint, name='search-compare'),
     
     # 🚀 AI Adaptive Filters (Revolutionary UX)
     path('search/ai-adaptive/', views.ai_adaptive_search_endpoint, name='ai-adaptive-search'),
@@ -48,7 +49,8 @@ urlpatterns = [
     
     # 🤖 AI User Preferences & Chatbot
     path('quiz/questions/', views.get_quiz_questions, name='quiz-questions'),
-    path('quiz/submit/', views.submit_quiz_answers, name='quiz-submit'),
+    path('quiz/submit/', views_async.submit_quiz_answers, name='quiz-submit'),
     path('chatbot/starters/', views.get_chatbot_starters, name='chatbot-starters'),
-    path('chatbot/', views.chatbot_response, name='chatbot-response'),
+    path('chatbot/', views_async.chatbot_response, name='chatbot-response'),
+    path('chatbot/stream/', views_async.chatbot_stream, name='chatbot-stream'),
 ]
\ No newline at end of file
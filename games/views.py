@@ -2,25 +2,15 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
 from .models import Game, Substitution, UserGame, SearchHistory, UserLibrary
 from .models_profile import UserProfile
 from django.db.models import Count
 from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta
 from decouple import config
 from django.conf import settings
 import logging
 
-# Import conditionnel d'OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OpenAI = None
-    OPENAI_AVAILABLE = False
-
 logger = logging.getLogger(__name__)
 from .serializers import (
     GameSerializer, GameSearchSerializer, SubstitutionSerializer,
@@ -29,9 +19,14 @@ from .serializers import (
     UserLibraryCreateSerializer, AddGameFromAPISerializer
 )
 from .services import RAWGAPIService
+from .pagination import GameKeysetPagination, CreatedKeysetPagination
+from .cache_utils import cached_call, stable_key
+from .filters import filter_catalog, has_catalog_filters, attribute_filters_cache_key
+from .services_facets import catalog_facets, queryset_facets
 from .recommender import recommend_by_library_and_fav, recommend_games_for_game
 from .services_recommendations import (
     get_recommendations_for_user, 
+    get_precomputed_recommendations,
     get_recommendations_for_game,
     get_trending_recommendations
 )
@@ -52,124 +47,47 @@ class GameListView(generics.ListAPIView):
     queryset = Game.objects.all()
     serializer_class = GameSearchSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = GameKeysetPagination  # ?cursor= ; ?page=N reste supporté
 
     def get_queryset(self):
-        # Cache optimisé pour Redis 30MB
-        search = self.request.query_params.get('search')
-        genre = self.request.query_params.get('genre')
-        platform = self.request.query_params.get('platform')
-        
-        cache_key = f"games_{hash(f'{search}_{genre}_{platform}')}"  # Hash pour clé courte
-        queryset = cache.get(cache_key)
-        
-        if queryset is None:
-            queryset = Game.objects.all()
-            
-            if search:
-                queryset = queryset.filter(
-                    Q(name__icontains=search) | Q(description__icontains=search)
-                )
-            if genre:
-                queryset = queryset.filter(genres__icontains=genre)
-            if platform:
-                queryset = queryset.filter(platforms__icontains=platform)
-                
-            queryset = queryset.order_by('-rating')
-            
-            # TTL configurable depuis .env
-            ttl = config('CACHE_TTL_GAMES', default=120, cast=int)
-            cache.set(cache_key, queryset, ttl)
-            
-        return queryset
+        # ?search= + ?genre= / ?platform= / ?tag= : containment jsonb (@>) sur index GIN, multi-valeurs AND/OR.
+        # Pas de cache du queryset : chaque page est une requête keyset bornée (LIMIT n) sur
+        # games_rating_id_idx, et seul le total (COUNT) est mis en cache par la pagination.
+        return filter_catalog(self.request.query_params).order_by('-rating')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets') in ('1', 'true'):
+            response.data['facets'] = get_catalog_facets(request.query_params)
+        return response
+
+
+def get_catalog_facets(params):
+    """Facettes du catalogue (pré-calculées) ou du résultat filtré (agrégats indexés)."""
+    if not has_catalog_filters(params):
+        return catalog_facets()
+
+    search = params.get('search')
+    cache_key = f"facets_{hash(f'{search}_{attribute_filters_cache_key(params)}')}"
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = queryset_facets(filter_catalog(params))
+        cache.set(cache_key, facets, config('CACHE_TTL_GAMES', default=120, cast=int))
+    return facets
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def game_facets(request):
+    """Comptages par genre, plateforme, décennie et tranche de note pour les filtres courants"""
+    return Response({'facets': get_catalog_facets(request.query_params)})
+
 
 class GameDetailView(generics.RetrieveAPIView):
     queryset = Game.objects.all()
     serializer_class = GameSerializer
     permission_classes = [permissions.AllowAny]
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def search_games_api(request):
-    query = request.GET.get('q', '')
-    page = int(request.GET.get('page', 1))
-    genres = request.GET.get('genres')
-    platforms = request.GET.get('platforms')
-    dates = request.GET.get('dates')
-    rating = request.GET.get('rating')
-    ordering = request.GET.get('ordering')
-    
-    if not query:
-        return Response({'error': 'Query parameter required'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    rawg_service = RAWGAPIService()
-    results = rawg_service.search_games(
-        query=query,
-        page=page,
-        genres=genres,
-        platforms=platforms,
-        dates=dates,
-        rating=rating,
-        ordering=ordering
-    )
-    
-    if not results:
-        return Response({'error': 'API request failed'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-    
-    # Sauvegarder les jeux dans la base et filtrer ceux avec rating > 0
-    filtered_results = []
-    for game_data in results.get('results', []):
-        # Sauvegarder le jeu
-        game = rawg_service.save_game_to_db(game_data)
-        
-        # Garder seulement si rating >= 3.0 (qualité minimum)
-        if game and game.rating and game.rating >= 3.0:
-            filtered_results.append(game_data)
-    
-    # Mettre à jour les résultats avec la version filtrée
-    results['results'] = filtered_results
-    results['count'] = len(filtered_results)
-    
-    # Enregistrer la recherche dans l'historique si l'utilisateur est connecté
-    if request.user.is_authenticated:
-        try:
-            filters = {}
-            if genres:
-                filters['genres'] = genres
-            if platforms:
-                filters['platforms'] = platforms
-            if dates:
-                filters['dates'] = dates
-                
-            # Évite les doublons récents et limite l'historique
-            recent_cutoff = timezone.now() - timedelta(minutes=5)
-            existing = SearchHistory.objects.filter(
-                user_id=request.user.id,
-                query=query,
-                created_at__gt=recent_cutoff
-            ).exists()
-            
-            if not existing:
-                SearchHistory.objects.create(
-                    user_id=request.user.id,
-                    query=query,
-                    filters=filters,
-                    results_count=results.get('count', 0)
-                )
-                
-                # Nettoie automatiquement si plus de 100 recherches
-                search_count = SearchHistory.objects.filter(user_id=request.user.id).count()
-                if search_count > 100:
-                    old_searches = SearchHistory.objects.filter(
-                        user_id=request.user.id
-                    ).order_by('created_at')[:search_count-50]
-                    SearchHistory.objects.filter(
-                        id__in=[s.id for s in old_searches]
-                    ).delete()
-        except Exception as e:
-            pass  # Ignorer les erreurs d'historique
-    
-    return Response(results)
-
 # -------------------------------
 # RECOMMANDATIONS - 2 ROUTES DÉDIÉES
 # -------------------------------
@@ -194,21 +112,17 @@ def get_game_substitutes(request, game_id):
     
     # Recommandations basées uniquement sur CE jeu spécifique
     recommended_games = recommend_games_for_game(source_game.id, top_n=5)
-    print(f"[INFO] Mode JEU: Recommandations basees uniquement sur {source_game.name}")
-    print(f"Resultat: {len(recommended_games)} jeux recommandes")
+    logger.info("Substituts servis (mode jeu)", extra={
+        'event': 'substitutes.game',
+        'source_game_id': source_game.id,
+        'count': len(recommended_games),
+        'sampled': True,
+    })
 
-    substitutes_data = []
-    for game in recommended_games:
-        data = GameSerializer(game).data
-        substitutes_data.append(data)
+    substitutes_data = GameSerializer(recommended_games, many=True).data
 
-        # Sauvegarde en base
-        Substitution.objects.get_or_create(
-            user_id=user_id,
-            source_game=source_game,
-            substitute_game=game,
-            defaults={'similarity_score': 0.9}
-        )
+    # Sauvegarde en base : un seul INSERT, les substitutions déjà connues sont ignorées
+    save_substitutions(user_id, source_game, recommended_games, mode='game')
 
     return Response({
         'mode': 'game',
@@ -227,13 +141,15 @@ def get_library_recommendations(request):
     if not user_id:
         return Response({'error': 'Invalid user ID'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Vérifier que l'utilisateur a des jeux dans sa bibliothèque
-    user_games = UserGame.objects.filter(
-        user_id=user_id, 
-        status__in=['library', 'favorite']
-    ).select_related('game')
+    # Bibliothèque chargée une seule fois (jeux inclus) et réutilisée partout
+    library = list(
+        UserGame.objects.filter(
+            user_id=user_id, 
+            status__in=['library', 'favorite']
+        ).select_related('game').order_by('id')
+    )
     
-    if not user_games.exists():
+    if not library:
         return Response({
             'mode': 'library',
             'message': 'No games in library yet. Add some games to get personalized recommendations!',
@@ -242,41 +158,52 @@ def get_library_recommendations(request):
         })
     
     # Recommandations basées sur TOUTE la bibliothèque utilisateur
-    recommended_games = recommend_by_library_and_fav(user=user_id, top_n=8)
+    recommended_games = recommend_by_library_and_fav(user=user_id, top_n=8, library=library)
+    logger.info("Substituts servis (mode bibliothèque)", extra={
+        'event': 'substitutes.library',
+        'library_size': len(library),
+        'count': len(recommended_games),
+        'sampled': True,
+    })
     
-    print(f"[INFO] Mode BIBLIOTHEQUE: Recommandations basees sur {user_games.count()} jeux de l'utilisateur {user_id}")
-    print(f"Resultat: {len(recommended_games)} jeux recommandes")
+    substitutes_data = GameSerializer(recommended_games, many=True).data
     
-    substitutes_data = []
-    for game in recommended_games:
-        data = GameSerializer(game).data
-        substitutes_data.append(data)
-        
-        # Pour la sauvegarde, on utilise le premier jeu de la bibliothèque comme "source"
-        first_library_game = user_games.first().game
-        Substitution.objects.get_or_create(
-            user_id=user_id,
-            source_game=first_library_game,
-            substitute_game=game,
-            mode='user',
-            defaults={'similarity_score': 0.9}
-        )
+    # Pour la sauvegarde, on utilise le premier jeu de la bibliothèque comme "source"
+    save_substitutions(user_id, library[0].game, recommended_games, mode='user')
     
     return Response({
         'mode': 'user',
-        'user_library_count': user_games.count(),
-        'library_games': [GameSerializer(ug.game).data for ug in user_games[:5]],  # Montre les 5 premiers jeux de la biblio
+        'user_library_count': len(library),
+        'library_games': GameSerializer([ug.game for ug in library[:5]], many=True).data,  # Montre les 5 premiers jeux de la biblio
         'recommended_substitutes': substitutes_data,
         'total_recommendations': len(substitutes_data)
     })
 
 
+def save_substitutions(user_id, source_game, games, mode, similarity_score=0.9):
+    """Enregistre les substitutions proposées en un seul INSERT (doublons ignorés)."""
+    Substitution.objects.bulk_create(
+        [
+            Substitution(
+                user_id=user_id,
+                source_game=source_game,
+                substitute_game=game,
+                mode=mode,
+                similarity_score=similarity_score,
+            )
+            for game in games
+        ],
+        ignore_conflicts=True,
+    )
+
+
 # -------------------------------
 # Substitutions
 # -------------------------------
 class SubstitutionListCreateView(generics.ListCreateAPIView):
     serializer_class = SubstitutionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedKeysetPagination
 
     def get_queryset(self):
         user_id = getattr(self.request.user, 'id', None)
@@ -307,6 +234,7 @@ class SubstitutionListCreateView(generics.ListCreateAPIView):
 class UserGameListCreateView(generics.ListCreateAPIView):
     serializer_class = UserGameSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedKeysetPagination
 
     def get_queryset(self):
         user_id = getattr(self.request.user, 'id', None)
@@ -314,23 +242,13 @@ class UserGameListCreateView(generics.ListCreateAPIView):
             return UserGame.objects.none()
             
         status_filter = self.request.query_params.get('status')
-        
-        # Cache optimisé par utilisateur et statut
-        cache_key = f"ug_{user_id}_{hash(status_filter or 'all')}"  # Clé courte
-        queryset = cache.get(cache_key)
-        
-        if queryset is None:
-            # Optimisation: select_related pour éviter les requêtes N+1
-            queryset = UserGame.objects.filter(user_id=user_id).select_related('game')
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
-            queryset = queryset.order_by('-created_at')
-            
-            # TTL configurable
-            ttl = config('CACHE_TTL_USER_GAMES', default=60, cast=int)
-            cache.set(cache_key, queryset, ttl)
-            
-        return queryset
+
+        # Optimisation: select_related pour éviter les requêtes N+1.
+        # Paginé par curseur sur l'index (user_id, created_at, id) : pas de cache du queryset.
+        queryset = UserGame.objects.filter(user_id=user_id).select_related('game')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset.order_by('-created_at')
 
     def perform_create(self, serializer):
         user_id = getattr(self.request.user, 'id', None)
@@ -571,23 +489,24 @@ def user_recommendations(request):
     user_auth = request.user
     user_id = user_auth.id if hasattr(user_auth, 'id') else user_auth.user_id
     
-    # Cache les recommandations pendant 1 heure
-    cache_key = f"recommendations_{user_id}"
-    recommendations = cache.get(cache_key)
+    limit = int(request.GET.get('limit', 10))
     
-    if recommendations is None:
-        limit = int(request.GET.get('limit', 10))
-        
-        # Obtenir recommandations basées sur les favoris
-        recommendations = get_recommendations_for_user(str(user_id), limit=limit)
+    def compute():
+        # Recommandations pré-calculées par le job precompute_recommendations (lecture indexée),
+        # calcul à la demande pour les utilisateurs pas encore couverts
+        recommendations = get_precomputed_recommendations(str(user_id), limit=limit)
+        if not recommendations:
+            # Obtenir recommandations basées sur les favoris
+            recommendations = get_recommendations_for_user(str(user_id), limit=limit)
         
         # Si pas assez de recommandations, ajouter des tendances
         if len(recommendations) < limit:
             trending = get_trending_recommendations(limit - len(recommendations))
             recommendations.extend(trending)
-        
-        # Cache pendant 1 heure
-        cache.set(cache_key, recommendations, timeout=3600)
+        return recommendations
+    
+    # Cache pendant 1 heure (un seul recalcul concurrent, valeur périmée servie entre-temps)
+    recommendations = cached_call(f"recommendations_{user_id}", compute, timeout=3600)
     
     return Response({
         'recommendations': recommendations,
@@ -601,16 +520,14 @@ def game_recommendations(request, game_id):
     """
     Recommandations de jeux similaires à un jeu donné
     """
-    # Cache par jeu pendant 24h (moins volatile)
-    cache_key = f"game_rec_{game_id}"
-    recommendations = cache.get(cache_key)
+    limit = int(request.GET.get('limit', 5))
     
-    if recommendations is None:
-        limit = int(request.GET.get('limit', 5))
-        recommendations = get_recommendations_for_game(game_id, limit=limit)
-        
-        # Cache pendant 24 heures
-        cache.set(cache_key, recommendations, timeout=86400)
+    # Cache par jeu pendant 24h (moins volatile)
+    recommendations = cached_call(
+        f"game_rec_{game_id}_{limit}",
+        lambda: get_recommendations_for_game(game_id, limit=limit),
+        timeout=86400,
+    )
     
     return Response({
         'game_id': game_id,
@@ -625,15 +542,14 @@ def trending_recommendations(request):
     """
     Jeux tendance et récents bien notés
     """
-    cache_key = "trending_games"
-    trending = cache.get(cache_key)
+    limit = int(request.GET.get('limit', 15))
     
-    if trending is None:
-        limit = int(request.GET.get('limit', 15))
-        trending = get_trending_recommendations(limit=limit)
-        
-        # Cache pendant 6 heures (assez volatile)
-        cache.set(cache_key, trending, timeout=21600)
+    # Cache pendant 6 heures (assez volatile)
+    trending = cached_call(
+        f"trending_games_{limit}",
+        lambda: get_trending_recommendations(limit=limit),
+        timeout=21600,
+    )
     
     return Response({
         'trending': trending,
@@ -657,15 +573,12 @@ def semantic_search_endpoint(request):
     limit = int(request.GET.get('limit', 20))
     min_similarity = float(request.GET.get('min_similarity', 0.3))
     
-    # Cache pour optimiser les performances
-    cache_key = f"semantic_search_{hash(f'{query}_{limit}_{min_similarity}')}"
-    results = cache.get(cache_key)
-    
-    if results is None:
-        results = semantic_search_games(query, limit=limit, min_similarity=min_similarity)
-        
-        # Cache pendant 1 heure
-        cache.set(cache_key, results, timeout=3600)
+    # Cache pendant 1 heure ; clé stable entre workers pour que le single-flight soit partagé
+    results = cached_call(
+        stable_key('semantic_search', query, limit, min_similarity),
+        lambda: semantic_search_games(query, limit=limit, min_similarity=min_similarity),
+        timeout=3600,
+    )
     
     return Response({
         'query': query,
@@ -734,46 +647,6 @@ def search_suggestions_endpoint(request):
     })
 
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def search_compare_endpoint(request):
-    """
-    Compare les résultats entre recherche classique et IA
-    Utile pour déboguer et comprendre les différences
-    """
-    query = request.GET.get('q', '').strip()
-    if not query:
-        return Response({'error': 'Query parameter required'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    limit = int(request.GET.get('limit', 10))
-    
-    # Recherche classique (RAWG + base locale)
-    rawg_service = RAWGAPIService()
-    rawg_results = rawg_service.search_games(query, page=1, page_size=limit) or {'results': []}
-    
-    # Recherche sémantique IA
-    semantic_results = semantic_search_games(query, limit=limit, min_similarity=0.2)
-    
-    return Response({
-        'query': query,
-        'classic_search': {
-            'results': rawg_results.get('results', []),
-            'count': len(rawg_results.get('results', [])),
-            'source': 'rawg_api'
-        },
-        'semantic_search': {
-            'results': semantic_results,
-            'count': len(semantic_results),
-            'source': 'ai_embeddings'
-        },
-        'comparison': {
-            'classic_count': len(rawg_results.get('results', [])),
-            'semantic_count': len(semantic_results),
-            'ai_advantage': len(semantic_results) > len(rawg_results.get('results', []))
-        }
-    })
-
-
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def ai_adaptive_search_endpoint(request):
@@ -793,8 +666,6 @@ def ai_adaptive_search_endpoint(request):
         limit = int(data.get('limit', 20))
         min_similarity = float(data.get('min_similarity', 0.3))
         
-        logger.info(f"[AI ADAPTIVE SEARCH] Query: '{query}', Filters: {ai_filters}")
-        
         # Cache intelligent basé sur query + filtres
         cache_key = f"ai_adaptive_{hash(f'{query}_{str(sorted(ai_filters.items()))}_{limit}')}"
         results = cache.get(cache_key)
@@ -910,9 +781,6 @@ QUESTIONS = [
     "Quels genres d'activités apprécies-tu dans un jeu ?"
 ]
 
-USER_RESPONSES = {}
-USER_CONVERSATIONS = {}
-
 QUESTION_STARTERS = [
     "Quel jeu me conseillerais-tu pour...",
     "Comment améliorer mes compétences sur",
@@ -920,21 +788,7 @@ QUESTION_STARTERS = [
     "As-tu des astuces pour...",
 ]
 
-# Client OpenAI configuré pour Hugging Face
-client = None
-if OPENAI_AVAILABLE:
-    try:
-        if hasattr(settings, 'HUGGINGFACE_API_TOKEN') and settings.HUGGINGFACE_API_TOKEN:
-            client = OpenAI(
-                base_url="https://router.huggingface.co/v1",
-                api_key=settings.HUGGINGFACE_API_TOKEN
-            )
-        else:
-            logger.warning("HUGGINGFACE_API_TOKEN non configuré - fonctionnalités IA désactivées")
-    except Exception as e:
-        logger.warning(f"Erreur configuration client IA: {e}")
-else:
-    logger.warning("OpenAI non installé - fonctionnalités IA désactivées")
+# Quiz (soumission) et chatbot : vues asynchrones dans views_async.py
 
 
 @api_view(['GET'])
@@ -944,95 +798,6 @@ def get_quiz_questions(request):
     return Response(QUESTIONS)
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def submit_quiz_answers(request):
-    """Traite les réponses du quiz et génère des suggestions de jeux enrichies avec RAWG"""
-    if not client:
-        return Response({"error": "Service IA non disponible"}, status=500)
-    
-    user_id = request.session.session_key or "anonymous"
-    answers = request.data.get('answers', [])
-    
-    if not answers or len(answers) != len(QUESTIONS):
-        return Response({"error": "Toutes les questions doivent être répondues"}, status=400)
-    
-    USER_RESPONSES[user_id] = answers
-    
-    # Création du prompt pour obtenir des noms de jeux
-    prompt = (
-        f"Basé sur ces préférences: {answers}. "
-        f"Suggère UNIQUEMENT 6 noms de jeux vidéo populaires, un par ligne, "
-        f"sans description, sans tirets, sans numéros. "
-        f"Format: NomDuJeu"
-    )
-    
-    try:
-        completion = client.chat.completions.create(
-            model="deepseek-ai/DeepSeek-V3.1:fireworks-ai",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,
-            temperature=0.7
-        )
-        
-        ai_suggestions = completion.choices[0].message.content.strip()
-        
-        # Parse les noms de jeux
-        game_names = []
-        for line in ai_suggestions.split("\n"):
-            line = line.strip("- • 1234567890.").strip()
-            if line and len(line) > 2:
-                game_names.append(line)
-        
-        # Enrichir avec l'API RAWG
-        rawg_service = RAWGAPIService()
-        enriched_games = []
-        
-        for game_name in game_names[:5]:  # Limite à 5 jeux
-            try:
-                # Recherche dans RAWG
-                rawg_results = rawg_service.search_games(game_name, page_size=1)
-                if rawg_results and rawg_results.get('results'):
-                    game_data = rawg_results['results'][0]
-                    
-                    # Formate les données pour le frontend
-                    enriched_game = {
-                        'name': game_data.get('name', game_name),
-                        'description': f"Recommandé pour vos préférences: {', '.join(answers[:2])}",
-                        'background_image': game_data.get('background_image'),
-                        'rating': game_data.get('rating'),
-                        'released': game_data.get('released'),
-                        'genres': [g['name'] for g in game_data.get('genres', [])[:3]],
-                        'platforms': [p['platform']['name'] for p in game_data.get('platforms', [])[:3]],
-                        'metacritic': game_data.get('metacritic'),
-                        'id': game_data.get('id'),
-                        'external_id': game_data.get('id'),
-                        'user_preferences': answers
-                    }
-                    enriched_games.append(enriched_game)
-                else:
-                    # Fallback si pas trouvé dans RAWG
-                    enriched_games.append({
-                        'name': game_name,
-                        'description': f"Jeu recommandé basé sur vos goûts: {answers[0] if answers else 'personnalisés'}",
-                        'user_preferences': answers
-                    })
-            except Exception as e:
-                logger.warning(f"Erreur enrichissement RAWG pour {game_name}: {e}")
-                # Fallback
-                enriched_games.append({
-                    'name': game_name,
-                    'description': f"Recommandé pour vos préférences gaming",
-                    'user_preferences': answers
-                })
-        
-        return Response({"suggestions": enriched_games})
-        
-    except Exception as e:
-        logger.exception("Erreur génération suggestions IA:")
-        return Response({"error": "Erreur génération IA", "details": str(e)}, status=500)
-
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chatbot_starters(request):
@@ -1040,49 +805,3 @@ def get_chatbot_starters(request):
     return Response(QUESTION_STARTERS)
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def chatbot_response(request):
-    """Chatbot IA spécialisé jeux vidéo"""
-    if not client:
-        return Response({"answer": "Service IA non disponible"}, status=500)
-    
-    user_id = request.session.session_key or "anonymous"
-    question = request.data.get("question", "").strip()
-    
-    if not question:
-        return Response({"answer": "Merci de poser une question."})
-    
-    # Récupère l'historique de conversation
-    conversation = USER_CONVERSATIONS.get(user_id, [])
-    
-    # Ajoute le contexte GameSub si premier message
-    if not conversation:
-        system_prompt = (
-            "Tu es un assistant spécialisé dans les jeux vidéo pour GameSub. "
-            "Réponds de manière concise et pertinente aux questions sur les jeux, "
-            "les recommandations, les astuces. Privilégie des jeux populaires et accessibles."
-        )
-        conversation.append({"role": "system", "content": system_prompt})
-    
-    conversation.append({"role": "user", "content": question})
-    
-    try:
-        completion = client.chat.completions.create(
-            model="deepseek-ai/DeepSeek-V3.1:fireworks-ai",
-            messages=conversation,
-            max_tokens=400,
-            temperature=0.8
-        )
-        
-        bot_message = completion.choices[0].message.content.strip()
-        
-        # Sauvegarde dans l'historique
-        conversation.append({"role": "assistant", "content": bot_message})
-        USER_CONVERSATIONS[user_id] = conversation[-10:]  # Garde seulement les 10 derniers messages
-        
-        return Response({"answer": bot_message})
-        
-    except Exception as e:
-        logger.exception("Erreur chatbot IA:")
-        return Response({"answer": "Erreur serveur, réessayez."}, status=500)
\ No newline at end of file
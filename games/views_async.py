@@ -0,0 +1,429 @@
+"""
+Vues asynchrones (ASGI) des endpoints dominés par l'attente réseau : RAWG et LLM.
+
+Servies par un serveur ASGI (uvicorn GameSub.asgi:application), ces vues
+libèrent la boucle d'événements pendant chaque appel amont : un processus
+tient des centaines d'appels RAWG / LLM en vol au lieu d'un par thread.
+Sous runserver / WSGI elles restent fonctionnelles (exécutées via async_to_sync).
+
+DRF ne gère pas les vues async : async_api_view reproduit ce dont ces vues
+ont besoin (méthodes autorisées, authentification Supabase, réponses JSON).
+"""
+
+import asyncio
+import functools
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from datetime import timedelta
+from rest_framework import exceptions, status
+from rest_framework.utils.encoders import JSONEncoder
+from .authentication import SupabaseAuthentication, bearer_token, claims_cache
+from .models import SearchHistory
+from .services import AsyncRAWGAPIService
+from .services_facets import facets_from_items
+from .services_semantic_search import semantic_search_games
+from .services_llm import (
+    llm_configured, chat_messages, chat_completion, stream_chat_completion, sse_event
+)
+from .conversation_store import ConversationLockTimeout, get_conversation_store
+from .services_llm_cache import cached_chat_completion, cached_rawg_match
+from .services_title_resolution import resolve_titles, game_as_rawg_match
+from .views import QUESTIONS
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUIZ_SUGGESTIONS = 5
+
+
+# -------------------------------
+# Socle : authentification et réponses
+# -------------------------------
+def api_response(data, status=status.HTTP_200_OK):
+    """JsonResponse avec l'encodeur DRF (dates, Decimal, types numpy...)."""
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+async def authenticate_request(request):
+    """
+    Équivalent de SupabaseAuthentication pour les vues async.
+    Retourne (utilisateur ou None, réponse d'erreur ou None).
+    Jeton déjà vérifié par SupabaseJWTMiddleware : claims repris de la requête.
+    Jeton absent du cache des claims : la vérification peut charger le JWKS
+    (réseau, cache Django), elle tourne donc hors de la boucle d'événements.
+    """
+    authentication = SupabaseAuthentication()
+    token = bearer_token(request)
+    try:
+        already_checked = getattr(request, 'supabase_token', None) == token
+        if token and not already_checked and claims_cache.get(token) is None:
+            auth = await sync_to_async(authentication.authenticate)(request)
+        else:
+            auth = authentication.authenticate(request)
+    except exceptions.AuthenticationFailed as e:
+        return None, api_response({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    return (auth[0] if auth else None), None
+
+
+def async_api_view(methods, login_required=False):
+    """
+    @api_view + @permission_classes pour une vue async : 405 hors `methods`,
+    401 si le jeton est invalide (ou absent quand login_required).
+    L'utilisateur authentifié est exposé dans request.api_user (None sinon).
+    """
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return api_response(
+                    {'detail': f'Méthode « {request.method} » non autorisée.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED,
+                )
+            user, error = await authenticate_request(request)
+            if error:
+                return error
+            if login_required and user is None:
+                return api_response(
+                    {'detail': "Informations d'authentification non fournies."},
+                    status=status.HTTP_401_UNAUTHORIZED,
+                )
+            request.api_user = user
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def json_body(request):
+    """Corps JSON de la requête (dict), ou None s'il est invalide."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+# -------------------------------
+# Recherche RAWG
+# -------------------------------
+async def record_search_history(user_id, query, filters, results_count):
+    """Historique de recherche (doublons récents ignorés, 100 entrées max)."""
+    recent_cutoff = timezone.now() - timedelta(minutes=5)
+    existing = await SearchHistory.objects.filter(
+        user_id=user_id,
+        query=query,
+        created_at__gt=recent_cutoff
+    ).aexists()
+    if existing:
+        return
+
+    await SearchHistory.objects.acreate(
+        user_id=user_id,
+        query=query,
+        filters=filters,
+        results_count=results_count
+    )
+
+    # Nettoie automatiquement si plus de 100 recherches
+    search_count = await SearchHistory.objects.filter(user_id=user_id).acount()
+    if search_count > 100:
+        old_ids = [
+            search_id async for search_id in SearchHistory.objects.filter(
+                user_id=user_id
+            ).order_by('created_at').values_list('id', flat=True)[:search_count - 50]
+        ]
+        await SearchHistory.objects.filter(id__in=old_ids).adelete()
+
+
+@async_api_view(['GET'])
+async def search_games_api(request):
+    query = request.GET.get('q', '')
+    page = int(request.GET.get('page', 1))
+    genres = request.GET.get('genres')
+    platforms = request.GET.get('platforms')
+    dates = request.GET.get('dates')
+    rating = request.GET.get('rating')
+    ordering = request.GET.get('ordering')
+
+    if not query:
+        return api_response({'error': 'Query parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    rawg_service = AsyncRAWGAPIService()
+    results = await rawg_service.search_games(
+        query=query,
+        page=page,
+        genres=genres,
+        platforms=platforms,
+        dates=dates,
+        rating=rating,
+        ordering=ordering
+    )
+
+    if not results:
+        return api_response({'error': 'API request failed'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    # Sauvegarder les jeux dans la base et filtrer ceux avec rating > 0
+    filtered_results = []
+    for game_data in results.get('results', []):
+        game = await rawg_service.save_game_to_db(game_data)
+
+        # Garder seulement si rating >= 3.0 (qualité minimum)
+        if game and game.rating and game.rating >= 3.0:
+            filtered_results.append(game_data)
+
+    results['results'] = filtered_results
+    results['count'] = len(filtered_results)
+    if request.GET.get('facets') in ('1', 'true'):
+        # Page RAWG déjà en mémoire : comptage sans requête supplémentaire
+        results['facets'] = facets_from_items(filtered_results)
+
+    # Enregistrer la recherche dans l'historique si l'utilisateur est connecté
+    if request.api_user is not None:
+        filters = {key: value for key, value in (('genres', genres), ('platforms', platforms), ('dates', dates)) if value}
+        try:
+            await record_search_history(request.api_user.id, query, filters, results['count'])
+        except Exception:
+            pass  # Ignorer les erreurs d'historique
+
+    return api_response(results)
+
+
+@async_api_view(['GET'])
+async def search_compare_endpoint(request):
+    """
+    Compare les résultats entre recherche classique et IA
+    Utile pour déboguer et comprendre les différences
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return api_response({'error': 'Query parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    limit = int(request.GET.get('limit', 10))
+
+    # RAWG et recherche sémantique (embeddings + base, synchrone) en parallèle
+    rawg_results, semantic_results = await asyncio.gather(
+        AsyncRAWGAPIService().search_games(query, page=1, page_size=limit),
+        sync_to_async(semantic_search_games)(query, limit=limit, min_similarity=0.2),
+    )
+    rawg_results = rawg_results or {'results': []}
+
+    return api_response({
+        'query': query,
+        'classic_search': {
+            'results': rawg_results.get('results', []),
+            'count': len(rawg_results.get('results', [])),
+            'source': 'rawg_api'
+        },
+        'semantic_search': {
+            'results': semantic_results,
+            'count': len(semantic_results),
+            'source': 'ai_embeddings'
+        },
+        'comparison': {
+            'classic_count': len(rawg_results.get('results', [])),
+            'semantic_count': len(semantic_results),
+            'ai_advantage': len(semantic_results) > len(rawg_results.get('results', []))
+        }
+    })
+
+
+# -------------------------------
+# Quiz & Chatbot IA
+# -------------------------------
+async def enrich_suggestion(rawg_service, game_name, answers, local_game=None):
+    """
+    Suggestion du LLM complétée par le jeu du catalogue local s'il a été
+    résolu, sinon par le premier résultat RAWG (en cache par nom).
+    """
+    try:
+        if local_game is not None:
+            game_data = game_as_rawg_match(local_game)
+        else:
+            game_data = await cached_rawg_match(rawg_service, game_name)
+        if game_data:
+
+            # Formate les données pour le frontend
+            return {
+                'name': game_data.get('name', game_name),
+                'description': f"Recommandé pour vos préférences: {', '.join(answers[:2])}",
+                'background_image': game_data.get('background_image'),
+                'rating': game_data.get('rating'),
+                'released': game_data.get('released'),
+                'genres': [g['name'] for g in (game_data.get('genres') or [])[:3]],
+                'platforms': [p['platform']['name'] for p in (game_data.get('platforms') or [])[:3]],
+                'metacritic': game_data.get('metacritic'),
+                'id': game_data.get('id'),
+                'external_id': game_data.get('id'),
+                'user_preferences': answers
+            }
+        # Fallback si pas trouvé dans RAWG
+        return {
+            'name': game_name,
+            'description': f"Jeu recommandé basé sur vos goûts: {answers[0] if answers else 'personnalisés'}",
+            'user_preferences': answers
+        }
+    except Exception as e:
+        logger.warning(f"Erreur enrichissement RAWG pour {game_name}: {e}")
+        return {
+            'name': game_name,
+            'description': "Recommandé pour vos préférences gaming",
+            'user_preferences': answers
+        }
+
+
+@async_api_view(['POST'], login_required=True)
+async def submit_quiz_answers(request):
+    """Traite les réponses du quiz et génère des suggestions de jeux enrichies avec RAWG"""
+    if not llm_configured():
+        return api_response({"error": "Service IA non disponible"}, status=500)
+
+    data = json_body(request)
+    if data is None:
+        return api_response({"error": "Requête invalide"}, status=400)
+
+    answers = data.get('answers', [])
+
+    if not isinstance(answers, list) or len(answers) != len(QUESTIONS):
+        return api_response({"error": "Toutes les questions doivent être répondues"}, status=400)
+    # Texte de l'utilisateur conservé : la clé du cache LLM est déjà canonique (prompt_key)
+    answers = [str(answer).strip() for answer in answers]
+    if not all(answers):
+        return api_response({"error": "Toutes les questions doivent être répondues"}, status=400)
+
+    await get_conversation_store().asave_quiz_answers(request.api_user.id, answers)
+
+    # Création du prompt pour obtenir des noms de jeux
+    prompt = (
+        f"Basé sur ces préférences: {answers}. "
+        f"Suggère UNIQUEMENT 6 noms de jeux vidéo populaires, un par ligne, "
+        f"sans description, sans tirets, sans numéros. "
+        f"Format: NomDuJeu"
+    )
+
+    try:
+        # Réponse en cache pour un prompt identique (ou quasi identique si LLM_CACHE_SEMANTIC)
+        ai_suggestions, source = await cached_chat_completion(
+            [{"role": "user", "content": prompt}],
+            max_tokens=150,
+            temperature=0.7
+        )
+
+        # Parse les noms de jeux
+        game_names = []
+        for line in ai_suggestions.split("\n"):
+            line = line.strip("- • 1234567890.").strip()
+            if line and len(line) > 2:
+                game_names.append(line)
+
+        # Titres déjà au catalogue résolus en mémoire ; RAWG seulement pour les autres
+        game_names = game_names[:QUIZ_SUGGESTIONS]
+        try:
+            local_games = await sync_to_async(resolve_titles)(game_names)
+        except Exception as e:
+            logger.warning(f"Résolution locale des titres échouée: {e}")
+            local_games = {}
+
+        # Enrichir avec l'API RAWG : les recherches restantes partent en même temps
+        rawg_service = AsyncRAWGAPIService()
+        enriched_games = await asyncio.gather(*(
+            enrich_suggestion(rawg_service, game_name, answers, local_games.get(game_name))
+            for game_name in game_names
+        ))
+
+        return api_response({"suggestions": list(enriched_games), "cached": source != 'llm'})
+
+    except Exception as e:
+        logger.exception("Erreur génération suggestions IA:")
+        return api_response({"error": "Erreur génération IA", "details": str(e)}, status=500)
+
+
+async def save_chat_turn(store, user_id, question, answer):
+    """Ajoute le tour à l'historique ; conversation verrouillée trop longtemps : tour non enregistré."""
+    try:
+        await store.aappend(
+            user_id,
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer},
+        )
+    except ConversationLockTimeout:
+        logger.warning("Historique de %s verrouillé, tour non enregistré", user_id)
+
+
+@async_api_view(['POST'], login_required=True)
+async def chatbot_response(request):
+    """Chatbot IA spécialisé jeux vidéo"""
+    if not llm_configured():
+        return api_response({"answer": "Service IA non disponible"}, status=500)
+
+    data = json_body(request)
+    if data is None:
+        return api_response({"answer": "Requête invalide."}, status=400)
+
+    question = str(data.get("question", "")).strip()
+
+    if not question:
+        return api_response({"answer": "Merci de poser une question."})
+
+    # Historique de l'utilisateur (déjà borné par le budget de tokens) + contexte GameSub
+    store = get_conversation_store()
+    user_id = request.api_user.id
+    conversation = chat_messages(await store.aload(user_id), question)
+
+    try:
+        bot_message = await chat_completion(conversation)
+
+        # Sauvegarde dans l'historique
+        await save_chat_turn(store, user_id, question, bot_message)
+
+        return api_response({"answer": bot_message})
+
+    except Exception:
+        logger.exception("Erreur chatbot IA:")
+        return api_response({"answer": "Erreur serveur, réessayez."}, status=500)
+
+
+@async_api_view(['POST'], login_required=True)
+async def chatbot_stream(request):
+    """
+    Chatbot IA en streaming (Server-Sent Events) : les fragments de la réponse
+    sont relayés pendant la génération.
+
+    Événements : data {"delta": "..."} par fragment, puis event "done"
+    {"answer": "..."} ou event "error" {"answer": "..."}.
+    """
+    if not llm_configured():
+        return api_response({"answer": "Service IA non disponible"}, status=500)
+
+    data = json_body(request)
+    if data is None:
+        return api_response({"answer": "Requête invalide."}, status=400)
+    question = str(data.get("question", "")).strip()
+    if not question:
+        return api_response({"answer": "Merci de poser une question."})
+
+    store = get_conversation_store()
+    user_id = request.api_user.id
+    conversation = chat_messages(await store.aload(user_id), question)
+
+    async def events():
+        parts = []
+        try:
+            async for delta in stream_chat_completion(conversation):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+        except Exception:
+            logger.exception("Erreur chatbot IA (streaming):")
+            yield sse_event({"answer": "Erreur serveur, réessayez."}, event="error")
+            return
+
+        bot_message = "".join(parts).strip()
+        await save_chat_turn(store, user_id, question, bot_message)
+        yield sse_event({"answer": bot_message}, event="done")
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # pas de mise en tampon par nginx
+    return response
@@ -3,10 +3,16 @@
 """
 Script pour demarrer Django avec un port dynamique
 """
+import argparse
 import socket
 import subprocess
 import sys
 import os
+import tempfile
+import time
+
+SIDECAR_SOCKET = os.path.join(tempfile.gettempdir(), 'gamesub-embeddings.sock')
+SIDECAR_START_TIMEOUT = 120  # secondes (chargement + chauffe du modele)
 
 def is_port_available(port):
     """Vérifie si un port est disponible"""
@@ -26,8 +32,53 @@ def find_available_port(start_port=8000):
         port += 1
     raise Exception(f"Aucun port disponible trouvé entre {start_port} et {start_port + 100}")
 
+def start_sidecar(socket_path):
+    """
+    Lance le sidecar d'inference (modele d'embeddings charge une seule fois,
+    partage par les workers) et attend que son socket soit pret.
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    process = subprocess.Popen([sys.executable, 'manage.py', 'inference_sidecar', '--socket', socket_path])
+    deadline = time.monotonic() + SIDECAR_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if os.path.exists(socket_path):
+            print(f"[DJANGO] Sidecar d'inference pret sur {socket_path}")
+            return process
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    print("[DJANGO] Sidecar d'inference indisponible, modele charge par Django")
+    process.terminate()
+    return None
+
 def main():
+    parser = argparse.ArgumentParser(description="Demarre Django sur le premier port libre")
+    parser.add_argument(
+        '--preload',
+        action='store_true',
+        help="Charge les modeles IA au demarrage (PRELOAD_AI_MODELS) plutot qu'a la premiere requete"
+    )
+    parser.add_argument(
+        '--no-sidecar',
+        action='store_true',
+        help="N'utilise pas le sidecar d'inference (modele d'embeddings charge par Django)"
+    )
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    if args.preload:
+        env['PRELOAD_AI_MODELS'] = 'True'
+
+    sidecar = None
     try:
+        # Sidecar d'inference (sockets Unix : pas sous Windows)
+        if not args.no_sidecar and hasattr(socket, 'AF_UNIX'):
+            socket_path = env.get('EMBEDDING_SIDECAR_SOCKET') or SIDECAR_SOCKET
+            sidecar = start_sidecar(socket_path)
+            if sidecar:
+                env['EMBEDDING_SIDECAR_SOCKET'] = socket_path
+
         # Trouve un port disponible
         port = find_available_port(8000)
         print(f"[DJANGO] Demarrage sur le port {port}")
@@ -37,13 +88,17 @@ def main():
             f.write(str(port))
         
         # Demarre Django
-        subprocess.run([sys.executable, 'manage.py', 'runserver', str(port)], check=True)
+        subprocess.run([sys.executable, 'manage.py', 'runserver', str(port)], check=True, env=env)
         
     except KeyboardInterrupt:
         print("\n[DJANGO] Arret du serveur")
     except Exception as e:
         print(f"[DJANGO] Erreur: {e}")
         sys.exit(1)
+    finally:
+        if sidecar:
+            sidecar.terminate()
+            sidecar.wait()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file